@@ -0,0 +1,114 @@
+"""
+A stand-in for the parts of bitcoind's RPC interface the indexes use.
+Blocks are lists of decoded transactions; block hashes are derived from
+the height and a fork tag so a reorg can be simulated by replacing the
+tail of the chain.
+"""
+
+import binascii
+from jsonrpc import JSONRPCException
+from base58 import hash160_to_address
+from signer import serialize, serialize_outputs
+from txparser import decode_tx
+
+def tx(txid, inputs, outputs):
+    # inputs: ["txid:n", ...], outputs: [(address, value), ...]
+    vin = []
+    for i in inputs:
+        t,n = i.split(":")
+        vin.append({"txid": t, "vout": int(n)})
+    if not vin:
+        vin = [{"coinbase": "00"}]
+    vout = []
+    for n,(address,value) in enumerate(outputs):
+        spk = {"type": "pubkeyhash", "addresses": [address]}
+        if address is None:
+            spk = {"type": "nulldata"}
+        vout.append({"n": n, "value": value, "scriptPubKey": spk})
+    return {"txid": txid, "vin": vin, "vout": vout}
+
+def address(name):
+    # A real address standing in for a short name
+    return hash160_to_address(name.ljust(20, "\0"))
+
+def rawtx(inputs, outputs):
+    # Like tx(), but a real transaction, for code that decodes raw
+    # transactions itself: the outputs pay address(name), the txid is
+    # its hash and the raw transaction is kept under 'hex'
+    vin = [(i.split(":")[0], int(i.split(":")[1])) for i in inputs]
+    if not vin:
+        vin = [("00"*32, 0xffffffff)]
+    raw = binascii.hexlify(serialize(vin, serialize_outputs(
+        [(address(a), long(round(v * 1e8))) for a,v in outputs]), [""]*len(vin)))
+    t = decode_tx(raw)
+    t['hex'] = raw
+    return t
+
+class FakeNode(object):
+    def __init__(self, blocks, verbose_blocks=True):
+        self.blocks = []
+        self.verbose_blocks = verbose_blocks
+        self.calls = []
+        for txs in blocks:
+            self.mine(txs)
+
+    def mine(self, txs, fork=""):
+        self.blocks.append((fork + ("%064x" % len(self.blocks))[len(fork):], txs))
+
+    def reorg(self, height, blocks, fork="f"):
+        del self.blocks[height:]
+        for txs in blocks:
+            self.mine(txs, fork)
+
+    def getblockcount(self):
+        self.calls.append("getblockcount")
+        return len(self.blocks) - 1
+
+    def getblockhash(self, height):
+        self.calls.append("getblockhash")
+        if not 0 <= height < len(self.blocks):
+            raise JSONRPCException({"code": -8, "message": "Block height out of range"})
+        return self.blocks[height][0]
+
+    def getblock(self, blockhash, verbosity=1):
+        self.calls.append("getblock")
+        for height,(h,txs) in enumerate(self.blocks):
+            if h == blockhash:
+                block = {"hash": h, "height": height, "tx": [t['txid'] for t in txs]}
+                if height > 0:
+                    block["previousblockhash"] = self.blocks[height-1][0]
+                if verbosity == 2 and self.verbose_blocks:
+                    block["tx"] = txs
+                elif verbosity not in (1, True):
+                    raise JSONRPCException({"code": -1, "message": "Expected type bool"})
+                return block
+        raise JSONRPCException({"code": -5, "message": "Block not found"})
+
+    def getrawtransaction(self, txid):
+        for h,txs in self.blocks:
+            for t in txs:
+                if t['txid'] == txid:
+                    return t.get('hex', "raw:" + txid)
+        raise JSONRPCException({"code": -5, "message": "No such transaction"})
+
+    def decoderawtransaction(self, raw):
+        for h,txs in self.blocks:
+            for t in txs:
+                if t.get('hex', "raw:" + t['txid']) == raw:
+                    return t
+
+    def gettx(self, txid):
+        for h,txs in self.blocks:
+            for t in txs:
+                if t['txid'] == txid:
+                    return t
+
+    def batch(self, calls):
+        self.calls.append("batch")
+        results = []
+        for call in calls:
+            try:
+                results.append((getattr(self, call[0])(*call[1:]), None))
+            except JSONRPCException, e:
+                results.append((None, e.error))
+        return results
@@ -0,0 +1,51 @@
+import unittest, binascii
+import base58
+
+# (hex, base58) pairs from Bitcoin Core's base58_encode_decode.json
+Vectors = [("", ""),
+           ("61", "2g"),
+           ("626262", "a3gV"),
+           ("636363", "aPEr"),
+           ("73696d706c792061206c6f6e6720737472696e67", "2cFupjhnEsSn59qHXstmK2ffpLv2"),
+           ("00eb15231dfceb60925886b67d065299925915aeb172c06647", "1NS17iag9jJgTHD1VXjvLCEnZuQ3rJDE9L"),
+           ("516b6fcd0f", "ABnLTmg"),
+           ("bf4f89001e670274dd", "3SEo3LWLoPntC"),
+           ("572e4794", "3EFU7m"),
+           ("ecac89cad93923c02321", "EJDM8drfXA6uyA"),
+           ("10c8511e", "Rt5zm"),
+           ("00000000000000000000", "1111111111")]
+
+# The addresses of private key 1, uncompressed and compressed
+Addresses = [("1EHNa6Q4Jz2uvNExL497mE43ikXhwF6kZm", "91b24bf9f5288532960ac687abb035127b1d28a5"),
+             ("1BgGZ9tcN4rm9KBzDn7KprQz87SZ26SAMH", "751e76e8199196d454941c45d1b3a323f1433bd6")]
+
+class TestBase58(unittest.TestCase):
+
+    def test_Encode(self):
+        for h, s in Vectors:
+            self.assertEquals(base58.b58encode(binascii.unhexlify(h)), s)
+
+    def test_Decode(self):
+        for h, s in Vectors:
+            self.assertEquals(base58.b58decode(s), binascii.unhexlify(h))
+
+    def test_DecodeLength(self):
+        self.assertEquals(base58.b58decode("2g", 2), None)
+        self.assertEquals(base58.b58decode("2g", 1), "a")
+
+    def test_DecodeInvalid(self):
+        self.assertRaises(ValueError, base58.b58decode, "0OIl")
+
+    def test_Addresses(self):
+        for a, h in Addresses:
+            self.assertEquals(base58.address_to_hash160(a), binascii.unhexlify(h))
+            self.assertEquals(base58.base58_check_encode(binascii.unhexlify(h)), a)
+
+    def test_BadChecksum(self):
+        self.assertRaises(ValueError, base58.address_to_hash160, "1EHNa6Q4Jz2uvNExL497mE43ikXhwF6kZn")
+
+    def test_Batch(self):
+        addrs = [a for a, h in Addresses]*2
+        hashes = base58.addresses_to_hash160s(addrs)
+        self.assertEquals(hashes, [binascii.unhexlify(h) for a, h in Addresses]*2)
+        self.assertEquals(base58.hash160s_to_addresses(hashes), addrs)
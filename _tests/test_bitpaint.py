@@ -0,0 +1,301 @@
+import unittest, os, sys, tempfile, shutil, time
+import jsonrpc, bitpaint, bulk
+from blockchaininfo import BlockchainInfo
+from chainindex import ChainIndex
+from txstore import TxStore
+from txparser import TxParseError
+from _tests.fakenode import FakeNode, address, rawtx, tx
+
+# A painted coin rooted at r0:0, split in s1 and again in t2; the
+# change of the fee input f0:0 in t1 stays uncolored
+Blocks = [
+    [tx("r0", [], [("1A", 10.0)]), tx("f0", [], [("1W", 1.0)])],
+    [tx("s1", ["r0:0"], [("1B", 4.0), ("1C", 6.0)])],
+    [tx("t1", ["s1:0", "f0:0"], [("1D", 4.0), ("1W", 0.9)]),
+     tx("t2", ["s1:1"], [("1E", 3.0), ("1F", 3.0)])],
+    [tx("u1", ["t2:1"], [("1G", 3.0)])],
+]
+
+def raw_blocks():
+    # Blocks like Blocks, with real transactions; returns them and
+    # the outpoint the coin starts at
+    r0 = rawtx([], [("A", 10.0)])
+    f0 = rawtx([], [("W", 1.0)])
+    s1 = rawtx([r0['txid']+":0"], [("B", 4.0), ("C", 6.0)])
+    t1 = rawtx([s1['txid']+":0", f0['txid']+":0"], [("D", 4.0), ("W", 0.9)])
+    t2 = rawtx([s1['txid']+":1"], [("E", 3.0), ("F", 3.0)])
+    u1 = rawtx([t2['txid']+":1"], [("G", 3.0)])
+    return [[r0, f0], [s1], [t1, t2], [u1]], r0['txid']+":0"
+
+class AsyncStub(object):
+    # Puts the interface of jsonrpc.AsyncServiceProxy or AsyncHTTPClient
+    # in front of a blocking object: calls return finished Futures
+    def __init__(self, target):
+        self.target = target
+
+    def __getattr__(self, name):
+        method = getattr(self.target, name)
+        def call(*args):
+            future = jsonrpc.Future()
+            try:
+                future.set_result(method(*args))
+            except Exception:
+                future.set_exception(sys.exc_info())
+            return future
+        return call
+
+class FakeSite(object):
+    # A stand-in for blockchain.info serving the fake node's chain, as
+    # the transport behind a BlockchainInfo. It also knows the
+    # transactions in extra, which the node does not.
+    def __init__(self, node):
+        self.node = node
+        self.extra = []
+        self.requests = []
+
+    def index(self):
+        txs = [t for h,block in self.node.blocks for t in block] + self.extra
+        return txs, dict((t['txid'], n + 1) for n,t in enumerate(txs))
+
+    def bctx(self, t, index):
+        return {"hash": t['txid'], "tx_index": index[t['txid']], "ver": 1,
+                "inputs": [{"prev_out": {"tx_index": index[i['txid']], "n": i['vout']}}
+                           for i in t['vin'] if 'txid' in i],
+                "out": [{"addr": o['scriptPubKey']['addresses'][0], "value": long(round(o['value'] * 1e8))}
+                        for o in t['vout']]}
+
+    def get(self, url):
+        self.requests.append(url)
+        path = url.split("/", 3)[3]
+        txs, index = self.index()
+        if path.startswith("rawtx/"):
+            key = path[len("rawtx/"):]
+            for t in txs:
+                if key in (t['txid'], str(index[t['txid']])):
+                    return jsonrpc.dumps(self.bctx(t, index))
+            raise jsonrpc.HTTPError(url, 404, "Transaction not found")
+        addr = path[len("address/"):].split("?")[0]
+        paid = set()
+        found = []
+        for t in txs:
+            touches = False
+            for i in t['vin']:
+                if 'txid' in i and i['txid']+":"+str(i['vout']) in paid:
+                    touches = True
+            for o in t['vout']:
+                if o['scriptPubKey']['addresses'][0] == addr:
+                    paid.add(t['txid']+":"+str(o['n']))
+                    touches = True
+            if touches:
+                found.append(self.bctx(t, index))
+        return jsonrpc.dumps({"address": addr, "txs": found})
+
+class TraceTest(unittest.TestCase):
+    # Points bitpaint at a fake node, and optionally a chain index,
+    # with a transaction store and a blockchain.info stand-in
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.saved = (bitpaint.sp, bitpaint.txstore, bitpaint.chainindex, bitpaint.bcinfo,
+                      bitpaint.asp, bitpaint.ahttp)
+
+    def tearDown(self):
+        bitpaint.txstore.close()
+        bitpaint.bcinfo.close()
+        (bitpaint.sp, bitpaint.txstore, bitpaint.chainindex, bitpaint.bcinfo,
+         bitpaint.asp, bitpaint.ahttp) = self.saved
+        shutil.rmtree(self.dir)
+
+    def use(self, blocks, index=True, fill=True, rate=0, start=0):
+        # With fill, the transaction store starts out holding every
+        # transaction on the chain; the index covers blocks from start
+        self.node = FakeNode(blocks)
+        self.site = FakeSite(self.node)
+        bitpaint.sp = self.node
+        bitpaint.asp = AsyncStub(self.node)
+        bitpaint.ahttp = AsyncStub(self.site)
+        bitpaint.bcinfo = BlockchainInfo(self.site, os.path.join(self.dir, "bcinfo"),
+                                         "http://bcinfo.test", rate=rate)
+        bitpaint.chainindex = None
+        if index:
+            bitpaint.chainindex = ChainIndex(os.path.join(self.dir, "chainindex"))
+            bitpaint.chainindex.sync(self.node, start)
+        bitpaint.txstore = TxStore(os.path.join(self.dir, "txstore"))
+        if fill:
+            for txs in blocks:
+                for t in txs:
+                    bitpaint.txstore.put(t['txid'], t)
+
+
+class TestTrace(TraceTest):
+
+    def test_Holders(self):
+        self.use(Blocks)
+        self.assertEquals(bitpaint.get_current_holders("r0:0"),
+                          [("1D", 4.0, "t1:0"), ("1E", 3.0, "t2:0"), ("1G", 3.0, "u1:0")])
+
+    def test_IndexFromLaterHeight(self):
+        # r0 and s1 predate the index, so their spends come from the
+        # address history
+        self.use(Blocks, start=2)
+        expected = [("1D", 4.0, "t1:0"), ("1E", 3.0, "t2:0"), ("1G", 3.0, "u1:0")]
+        self.assertEquals(bitpaint.get_current_holders("r0:0"), expected)
+        self.assertEquals(jsonrpc.run(bitpaint.async_get_current_holders("r0:0")), expected)
+        self.assertTrue(self.site.requests)
+
+    def test_ConcurrentTraceMatchesSerial(self):
+        self.use(Blocks)
+        serial = bitpaint.get_current_holders("r0:0")
+        for jobs in (2, 4, 8):
+            self.assertEquals(bitpaint.get_current_holders("r0:0", jobs), serial)
+
+    def test_ResumeFromHolders(self):
+        self.use(Blocks)
+        self.assertEquals(list(bitpaint.iter_holders_from(["s1:1"], 4)),
+                          [("1E", 3.0, "t2:0"), ("1G", 3.0, "u1:0")])
+
+    def test_CoinAtLaterInput(self):
+        # The coin enters s1 second, after a fee input, and carries on
+        # in the output its own input colors
+        blocks = [[tx("r0", [], [("1A", 10.0)]), tx("f0", [], [("1W", 1.0)])],
+                  [tx("s1", ["f0:0", "r0:0"], [("1W", 0.9), ("1B", 10.0)])]]
+        self.use(blocks)
+        expected = [("1B", 10.0, "s1:1")]
+        self.assertEquals(bitpaint.get_current_holders("r0:0"), expected)
+        self.assertEquals(bitpaint.get_current_holders("r0:0", 4), expected)
+        self.assertEquals(jsonrpc.run(bitpaint.async_get_current_holders("r0:0")), expected)
+
+    def test_BulkTransferFromSeveralSources(self):
+        # Both halves of a split coin are spent by one planned bulk
+        # transfer; each input colors its own transfers and change
+        groups = bulk.group([("1B:s1:0", "1X", 400000000), ("1C:s1:1", "1Y", 500000000)])
+        [(inputs, outputs)] = bulk.plan(groups, {("s1", 0, "1B"): 400000000, ("s1", 1, "1C"): 600000000})
+        b1 = tx("b1", ["%s:%d" % i[:2] for i in inputs], [(a, v / 1e8) for a,v in outputs])
+        self.use([[tx("r0", [], [("1A", 10.0)])], [tx("s1", ["r0:0"], [("1B", 4.0), ("1C", 6.0)])], [b1]])
+        expected = [("1X", 4.0, "b1:0"), ("1Y", 5.0, "b1:1"), ("1C", 1.0, "b1:2")]
+        self.assertEquals(bitpaint.get_current_holders("r0:0"), expected)
+        self.assertEquals(bitpaint.get_current_holders("r0:0", 4), expected)
+        self.assertEquals(jsonrpc.run(bitpaint.async_get_current_holders("r0:0")), expected)
+
+    def test_LongChain(self):
+        # Far more hops than a recursive trace could follow
+        hops = sys.getrecursionlimit() * 2
+        chain = [tx("%064x" % 0, [], [("1A", 10.0)])]
+        for n in range(1, hops + 1):
+            chain.append(tx("%064x" % n, ["%064x:0" % (n - 1)], [("1A", 10.0)]))
+        self.use([chain[n:n+500] for n in range(0, len(chain), 500)])
+        self.assertEquals(bitpaint.get_current_holders("%064x:0" % 0), [("1A", 10.0, "%064x:0" % hops)])
+        self.assertEquals(bitpaint.get_current_holders("%064x:0" % 0, 4), [("1A", 10.0, "%064x:0" % hops)])
+
+
+class TestAsyncTrace(TraceTest):
+
+    def test_FetchesFromNode(self):
+        blocks, root = raw_blocks()
+        self.use(blocks, fill=False)
+        expected = [(address("D"), 4.0, blocks[2][0]['txid']+":0"),
+                    (address("E"), 3.0, blocks[2][1]['txid']+":0"),
+                    (address("G"), 3.0, blocks[3][0]['txid']+":0")]
+        self.assertEquals(jsonrpc.run(bitpaint.async_get_current_holders(root)), expected)
+        self.assertEquals(bitpaint.get_current_holders(root), expected)
+
+    def test_WithoutChainIndex(self):
+        blocks, root = raw_blocks()
+        self.use(blocks, index=False, fill=False)
+        serial = bitpaint.get_current_holders(root)
+        self.assertEquals(len(serial), 3)
+        self.assertEquals(jsonrpc.run(bitpaint.async_get_current_holders(root)), serial)
+
+    def test_SideBySide(self):
+        blocks, root = raw_blocks()
+        self.use(blocks, index=False, fill=False)
+        s1 = blocks[1][0]['txid']
+        results = jsonrpc.run([bitpaint.async_get_current_holders(root),
+                               bitpaint.async_get_current_holders(s1+":1")])
+        self.assertEquals(results[0][1:], results[1])
+
+    def test_FallsBackToBlockchainInfo(self):
+        blocks, root = raw_blocks()
+        self.use(blocks, fill=False)
+        missing = rawtx([], [("Z", 1.0)])
+        self.site.extra.append(missing)
+        tx = jsonrpc.run(bitpaint.async_gettx(missing['txid']))
+        self.assertEquals(tx['vout'][0]['scriptPubKey']['addresses'], [address("Z")])
+        self.assertEquals(bitpaint.txstore.get(missing['txid']), tx)
+
+    def test_BlockchainInfoCacheAndLimit(self):
+        blocks, root = raw_blocks()
+        self.use(blocks, index=False, fill=False, rate=20)
+        start = time.time()
+        for n in range(3):
+            jsonrpc.run(bitpaint.async_getaddresstxs(address("B")))
+        # Waiting for the limit leaves the event loop free for others
+        ticked = []
+        def tick():
+            yield jsonrpc.sleep(0.01)
+            ticked.append(time.time())
+        jsonrpc.run([bitpaint.async_getaddresstxs(address(a)) for a in "CDE"] + [tick()])
+        self.assertEquals(len(self.site.requests), 4)
+        self.assertTrue(time.time() - start >= 0.15)
+        self.assertTrue(ticked[0] - start < 0.1)
+
+    def test_Unspent(self):
+        blocks, root = raw_blocks()
+        self.use(blocks, index=False, fill=False)
+        unspent = jsonrpc.run(bitpaint.async_get_unspent(address("W")))
+        self.assertEquals(unspent, [{'tx_hash': blocks[2][0]['txid'], 'tx_output_n': 1, 'value': 90000000}])
+        self.assertEquals(bitpaint.get_unspent(address("W")), unspent)
+
+
+class TestUnspentOutputs(unittest.TestCase):
+
+    def unspent(self, txs):
+        return [(u['tx_hash'], u['tx_output_n'], u['value'])
+                for u in bitpaint.unspent_outputs("1A", [t['txid'] for t in txs], txs)]
+
+    def test_SpentWithinHistory(self):
+        txs = [tx("a", [], [("1A", 1.0), ("1B", 2.0)]),
+               tx("b", ["a:0"], [("1C", 0.5), ("1A", 0.4)])]
+        self.assertEquals(self.unspent(txs), [("b", 1, 40000000)])
+
+    def test_FundedFromOutside(self):
+        # z is not in the history: spending z:0 says nothing about 1A,
+        # and d:0 stays unspent however it was funded
+        txs = [tx("c", [], [("1A", 1.0)]),
+               tx("d", ["z:0", "c:0"], [("1A", 1.5)])]
+        self.assertEquals(self.unspent(txs), [("d", 0, 150000000)])
+
+    def test_Repeated(self):
+        t = tx("e", [], [("1A", 1.0), (None, 0.0)])
+        self.assertEquals(self.unspent([t, t]), [("e", 0, 100000000)])
+
+
+class TestFetch(TraceTest):
+
+    def test_BatchFallsBackToBlockchainInfo(self):
+        blocks, root = raw_blocks()
+        self.use(blocks, fill=False)
+        missing = rawtx([], [("Z", 1.0)])
+        self.site.extra.append(missing)
+        txids = [blocks[1][0]['txid'], missing['txid']]
+        txs = bitpaint.gettxs(txids)
+        self.assertEquals([t['txid'] for t in txs], txids)
+        self.assertEquals(jsonrpc.run(bitpaint.async_gettxs(txids)), txs)
+        self.assertEquals(self.site.requests, ["http://bcinfo.test/rawtx/" + missing['txid']])
+
+    def test_BatchParseErrorsPropagate(self):
+        blocks, root = raw_blocks()
+        blocks[0][0]['hex'] = blocks[0][0]['hex'][:-8]
+        self.use(blocks, fill=False)
+        txids = [blocks[0][0]['txid'], blocks[0][1]['txid']]
+        self.assertRaises(TxParseError, bitpaint.gettxs, txids)
+        self.assertRaises(TxParseError, jsonrpc.run, bitpaint.async_gettxs(txids))
+        self.assertEquals(self.site.requests, [])
+
+    def test_ParseErrorsPropagate(self):
+        blocks, root = raw_blocks()
+        blocks[0][0]['hex'] = "00" + blocks[0][0]['hex']
+        self.use(blocks, fill=False)
+        self.assertRaises(TxParseError, bitpaint.gettx, blocks[0][0]['txid'])
+        self.assertRaises(TxParseError, jsonrpc.run, bitpaint.async_gettx(blocks[0][0]['txid']))
+        self.assertEquals(self.site.requests, [])
@@ -0,0 +1,115 @@
+import unittest, os, tempfile, shutil, struct, hashlib, binascii
+import blkfile
+from chainindex import ChainIndex
+
+# Block files are built from serialized transactions paying to
+# pay-to-pubkey-hash scripts; blocks carry regtest difficulty bits
+
+def dsha256(v):
+    return hashlib.sha256(hashlib.sha256(v).digest()).digest()
+
+def script(n):
+    return "\x76\xa9\x14" + chr(n)*20 + "\x88\xac"
+
+def rawtx(inputs, outputs, tag=""):
+    # inputs: [(txid hex, n)], empty for a coinbase; outputs: [(script, satoshis)]
+    s = struct.pack("<i", 1)
+    if not inputs:
+        s += "\x01" + "\0"*32 + "\xff\xff\xff\xff" + chr(len(tag) + 1) + "\x01" + tag + "\xff\xff\xff\xff"
+    else:
+        s += chr(len(inputs))
+        for txid, n in inputs:
+            s += binascii.unhexlify(txid)[::-1] + struct.pack("<I", n) + "\0" + "\xff\xff\xff\xff"
+    s += chr(len(outputs))
+    for spk, value in outputs:
+        s += struct.pack("<q", value) + chr(len(spk)) + spk
+    return s + struct.pack("<I", 0)
+
+def txid(raw):
+    return binascii.hexlify(dsha256(raw)[::-1])
+
+def block(prev, txs, nonce=0):
+    header = (struct.pack("<i", 1) + binascii.unhexlify(prev)[::-1] + "\0"*32 +
+              struct.pack("<III", 0, 0x207fffff, nonce))
+    data = header + chr(len(txs)) + "".join(txs)
+    return binascii.hexlify(dsha256(header)[::-1]), data
+
+def record(data, magic=blkfile.RegTestMagic):
+    return magic + struct.pack("<I", len(data)) + data
+
+class TestBlkFile(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.blocks = os.path.join(self.dir, "blocks")
+        os.mkdir(self.blocks)
+        self.index = ChainIndex(os.path.join(self.dir, "chainindex"))
+        # Genesis pays 1 BTC; block 1 spends it; block 2 spends the
+        # change. A stale block 2 with the same parent, found after it,
+        # is also stored.
+        self.cb0 = rawtx([], [(script(1), 100000000)], "g")
+        self.h0, b0 = block(blkfile.NullHash, [self.cb0])
+        self.cb1 = rawtx([], [(script(2), 5000000000)], "a")
+        self.t1 = rawtx([(txid(self.cb0), 0)], [(script(3), 30000000), (script(4), 69990000)])
+        self.h1, b1 = block(self.h0, [self.cb1, self.t1])
+        self.cb2 = rawtx([], [(script(2), 5000000000)], "b")
+        self.t2 = rawtx([(txid(self.t1), 1)], [(script(5), 69980000)])
+        self.h2, b2 = block(self.h1, [self.cb2, self.t2])
+        self.stale = rawtx([], [(script(6), 5000000000)], "c")
+        self.hs, bs = block(self.h1, [self.stale], nonce=1)
+        # Out of order over two files, the second preallocated with zeros
+        self.write("blk00000.dat", record(b1) + record(b0))
+        self.write("blk00001.dat", record(b2) + record(bs) + "\0"*64)
+        self.chain = [self.h0, self.h1, self.h2]
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, data):
+        f = open(os.path.join(self.blocks, name), "wb")
+        f.write(data)
+        f.close()
+
+    def ingest(self):
+        return blkfile.ingest(self.index, self.blocks, magic=blkfile.RegTestMagic)
+
+    def test_IndexesBestChain(self):
+        self.assertEquals(self.ingest(), 2)
+        self.assertEquals([self.index.blockhash(h) for h in range(3)], self.chain)
+        self.assertEquals(self.index.spentby(txid(self.cb0) + ":0"), txid(self.t1))
+        self.assertEquals(self.index.spentby(txid(self.t1) + ":1"), txid(self.t2))
+        self.assertEquals(self.index.spentby(txid(self.t1) + ":0"), None)
+        self.assertEquals(self.index.output(txid(self.t1) + ":0")[0], 30000000)
+        self.assertEquals(self.index.output(txid(self.stale) + ":0"), None)
+
+    def test_MostWorkWinsOverFirstSeen(self):
+        # Extending the stale block makes its branch the best chain
+        h3, b3 = block(self.hs, [rawtx([], [(script(7), 5000000000)], "d")])
+        self.write("blk00002.dat", record(b3))
+        self.assertEquals(self.ingest(), 3)
+        self.assertEquals(self.index.blockhash(2), self.hs)
+        self.assertEquals(self.index.spentby(txid(self.t1) + ":1"), None)
+
+    def test_ResumesAndRollsBack(self):
+        self.ingest()
+        h3, b3 = block(self.hs, [rawtx([], [(script(7), 5000000000)], "d")])
+        self.write("blk00002.dat", record(b3))
+        self.ingest()
+        self.assertEquals(self.index.height, 3)
+        self.assertEquals(self.index.blockhash(2), self.hs)
+        self.assertEquals(self.index.spentby(txid(self.t1) + ":1"), None)
+        self.assertEquals(self.index.spentby(txid(self.cb0) + ":0"), txid(self.t1))
+
+    def test_AddressesAndValues(self):
+        self.ingest()
+        value, address = self.index.output(txid(self.t2) + ":0")
+        self.assertEquals(value, 69980000)
+        self.assertTrue(address.startswith("1"))
+
+    def test_BadMagic(self):
+        self.write("blk00002.dat", record("x"*100, blkfile.MainMagic))
+        self.assertRaises(blkfile.BlockFileError, self.ingest)
+
+    def test_ObfuscatedFiles(self):
+        self.write("xor.dat", "\x01"*8)
+        self.assertRaises(blkfile.BlockFileError, self.ingest)
@@ -0,0 +1,138 @@
+import unittest, os, tempfile, shutil, threading, time
+import jsonrpc
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+from blockchaininfo import BlockchainInfo, RateLimit
+
+# A stand-in for blockchain.info with transactions 1 to 20, each
+# spending from the one before it
+def rawtx(n):
+    return {"hash": "%064x" % n, "tx_index": n, "ver": 1,
+            "inputs": n > 1 and [{"prev_out": {"tx_index": n - 1, "n": 0}}] or [],
+            "out": [{"addr": "1A", "value": 100000000 - n}]}
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        time.sleep(self.server.delay)
+        if self.path.startswith('/rawtx/'):
+            t = self.path[len('/rawtx/'):]
+            n = len(t) == 64 and int(t, 16) or int(t)
+            body = jsonrpc.dumps(rawtx(n))
+        elif self.path.startswith('/address/'):
+            body = jsonrpc.dumps({"txs": [rawtx(n) for n in (15, 16)]})
+        else:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class TestBlockchainInfo(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "bcinfo")
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.server.requests = []
+        self.server.delay = 0
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.01,))
+        self.thread.daemon = True
+        self.thread.start()
+        self.url = "http://127.0.0.1:%d" % self.server.server_address[1]
+        self.transport = jsonrpc.HTTPTransport(8, timeout=5)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.dir)
+
+    def client(self, **kw):
+        kw.setdefault('rate', 0)
+        return BlockchainInfo(self.transport, self.path, self.url, **kw)
+
+    def test_ResolvesOnce(self):
+        bc = self.client()
+        tx = bc.rawtx("%064x" % 5)
+        self.assertEquals(bc.prevout_txids(tx), ["%064x" % 4])
+        self.assertEquals(bc.hashes([4, 3, 4]), ["%064x" % 4, "%064x" % 3, "%064x" % 4])
+        self.assertEquals(self.server.requests, ["/rawtx/%064x" % 5, "/rawtx/4", "/rawtx/3"])
+        bc.close()
+        # The map outlives the client
+        bc = self.client()
+        self.assertEquals(bc.hashes([3, 4, 5]), ["%064x" % n for n in (3, 4, 5)])
+        self.assertEquals(len(self.server.requests), 3)
+
+    def test_LearnsFromAddresses(self):
+        bc = self.client()
+        bc.address("1A")
+        self.assertEquals(bc.known([15, 16, 17]), {15: "%064x" % 15, 16: "%064x" % 16})
+        bc.address("1A")
+        self.assertEquals(self.server.requests, ["/address/1A?format=json"])
+        self.assertEquals(bc.stats(), {'bcinfo_requests': 1, 'bcinfo_hits': 1})
+
+    def test_AddressesExpire(self):
+        bc = self.client(max_age=0)
+        bc.address("1A")
+        bc.address("1A")
+        self.assertEquals(len(self.server.requests), 2)
+
+    def test_Parallel(self):
+        self.server.delay = 0.1
+        bc = self.client(jobs=8)
+        start = time.time()
+        self.assertEquals(bc.hashes(range(1, 9)), ["%064x" % n for n in range(1, 9)])
+        self.assertTrue(time.time() - start < 0.5)
+        self.assertEquals(len(self.server.requests), 8)
+
+    def test_RateLimit(self):
+        bc = self.client(rate=20, jobs=8)
+        start = time.time()
+        bc.hashes(range(1, 7))
+        self.assertTrue(time.time() - start >= 0.25)
+
+    def test_Async(self):
+        bc = self.client()
+        client = jsonrpc.AsyncHTTPClient()
+        tx = jsonrpc.run(bc.async_rawtx(client, "%064x" % 5))
+        self.assertEquals(tx, bc.rawtx("%064x" % 5))
+        self.assertEquals(bc.known([5]), {5: "%064x" % 5})
+        jsonrpc.run(bc.async_address(client, "1A"))
+        self.assertEquals(bc.address("1A")['txs'][0]['hash'], "%064x" % 15)
+        self.assertEquals(self.server.requests, ["/rawtx/%064x" % 5, "/address/1A?format=json"])
+
+    def test_AsyncRateLimit(self):
+        bc = self.client(rate=20)
+        client = jsonrpc.AsyncHTTPClient()
+        start = time.time()
+        # The limit is shared with the blocking lookups
+        jsonrpc.run([bc.async_rawtx(client, n) for n in range(1, 4)])
+        bc.hashes([4, 5, 6])
+        self.assertTrue(time.time() - start >= 0.25)
+        self.assertEquals(len(self.server.requests), 6)
+
+    def test_Errors(self):
+        bc = self.client()
+        self.assertRaises(jsonrpc.HTTPError, bc.get, self.url + "/missing")
+
+    def test_RateLimitSpacing(self):
+        limit = RateLimit(100)
+        start = time.time()
+        for n in range(6):
+            limit.wait()
+        self.assertTrue(time.time() - start >= 0.05)
+        self.assertEquals(RateLimit(0).interval, 0)
@@ -0,0 +1,70 @@
+import unittest, os, tempfile, shutil
+import bulk, coloring
+
+A = "1EHNa6Q4Jz2uvNExL497mE43ikXhwF6kZm"
+B = "1BgGZ9tcN4rm9KBzDn7KprQz87SZ26SAMH"
+
+class TestBulk(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, data):
+        path = os.path.join(self.dir, name)
+        f = open(path, "w")
+        f.write(data)
+        f.close()
+        return path
+
+    def test_ReadCSVAndJSON(self):
+        expected = [(A + ":" + "aa"*32 + ":1", B, 10000), (A + ":" + "bb"*32 + ":0", A, 123456789)]
+        csv = self.write("t.csv", "from,to,amount\n%s,%s,0.0001\n\n%s,%s,1.23456789\n" % (
+            expected[0][0], B, expected[1][0], A))
+        self.assertEquals(bulk.read_transfers(csv), expected)
+        jsonl = self.write("t.jsonl", '{"from": "%s", "to": "%s", "amount": 0.0001}\n'
+                                      '{"from": "%s", "to": "%s", "amount": "1.23456789"}\n' % (
+            expected[0][0], B, expected[1][0], A))
+        self.assertEquals(bulk.read_transfers(jsonl), expected)
+
+    def test_PreciseAmounts(self):
+        # More significant digits than str() keeps for a float
+        self.assertEquals(bulk.satoshis(12345.12345678), 1234512345678)
+        self.assertEquals(bulk.satoshis(20999999.99999999), 2099999999999999)
+        jsonl = self.write("t.jsonl", '{"from": "%s:%s:0", "to": "%s", "amount": 12345.12345678}\n' % (
+            A, "aa"*32, B))
+        self.assertEquals(bulk.read_transfers(jsonl)[0][2], 1234512345678)
+
+    def test_BadAmounts(self):
+        self.assertEquals(bulk.satoshis(0.1), 10000000)
+        self.assertRaises(bulk.TransferError, bulk.satoshis, "0.000000001")
+        self.assertRaises(bulk.TransferError, bulk.satoshis, "0")
+        self.assertRaises(bulk.TransferError, bulk.satoshis, "x")
+        path = self.write("t.csv", "%s:%s,%s,1\n" % (A, "aa"*32, B))
+        self.assertRaises(bulk.TransferError, bulk.read_transfers, path)
+
+    def test_ColoredChange(self):
+        transfers = [(A + ":t1:1", B, 100), (A + ":t2:0", B, 300), (A + ":t1:1", A, 200)]
+        groups = bulk.group(transfers)
+        values = {("t1", 1, A): 500, ("t2", 0, A): 300}
+        txs = bulk.plan(groups, values)
+        self.assertEquals(txs, [([("t1", 1, A), ("t2", 0, A)],
+                                 [(B, 100), (A, 200), (A, 200), (B, 300)])])
+        # Each input colors exactly its own transfers
+        inputs, outputs = txs[0]
+        self.assertEquals(coloring.color([values[i] for i in inputs], [v for a, v in outputs]), [0, 0, 0, 1])
+        values[("t2", 0, A)] = 299
+        self.assertRaises(bulk.TransferError, bulk.plan, groups, values)
+
+    def test_SizeBounded(self):
+        transfers = [(A + ":t%d:0" % (n // 10), B, 1000) for n in range(5000)]
+        groups = bulk.group(transfers)
+        values = dict((s, 10000) for s in groups)
+        txs = bulk.plan(groups, values, max_size=20000)
+        self.assertTrue(len(txs) > 1)
+        self.assertEquals(sum([i for i, o in txs], []), groups.keys())
+        for inputs, outputs in txs:
+            self.assertTrue(bulk.tx_size(inputs, outputs) + bulk.InputSize + 34 <= 20000)
+        self.assertRaises(bulk.TransferError, bulk.plan, groups, values, max_size=500)
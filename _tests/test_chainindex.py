@@ -0,0 +1,96 @@
+import unittest, os, tempfile, shutil
+from chainindex import ChainIndex
+from _tests.fakenode import FakeNode, tx
+
+class TestChainIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "chainindex")
+        self.node = FakeNode([
+            [tx("a0", [], [("1A", 50.0)])],
+            [tx("b0", [], [("1B", 50.0)]), tx("b1", ["a0:0"], [("1C", 20.0), ("1D", 30.0)])],
+            [tx("c0", [], [("1B", 50.0)]), tx("c1", ["b1:1", "b0:0"], [("1E", 80.0)])],
+        ])
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_SpentBy(self):
+        index = ChainIndex(self.path)
+        self.assertEquals(index.sync(self.node), 2)
+        self.assertEquals(index.spentby("a0:0"), "b1")
+        self.assertEquals(index.spentby("b1:1"), "c1")
+        self.assertEquals(index.spentby("b0:0"), "c1")
+        self.assertEquals(index.spentby("b1:0"), None)
+
+    def test_ResumesFromIndexedHeight(self):
+        index = ChainIndex(self.path)
+        index.sync(self.node)
+        self.node.mine([tx("d0", [], [("1F", 50.0)]), tx("d1", ["b1:0"], [("1G", 20.0)])])
+        index = ChainIndex(self.path)
+        self.assertEquals(index.height, 2)
+        self.node.calls = []
+        index.sync(self.node)
+        self.assertEquals(self.node.calls.count("getblock"), 1)
+        self.assertEquals(index.spentby("b1:0"), "d1")
+
+    def test_StartHeight(self):
+        index = ChainIndex(self.path)
+        index.sync(self.node, start_height=2)
+        self.assertEquals(index.spentby("a0:0"), None)
+        self.assertEquals(index.spentby("b1:1"), "c1")
+
+    def test_OldNodeWithoutVerboseBlocks(self):
+        self.node.verbose_blocks = False
+        index = ChainIndex(self.path)
+        index.sync(self.node)
+        self.assertEquals(index.spentby("b1:1"), "c1")
+
+    def test_Outputs(self):
+        index = ChainIndex(self.path)
+        index.sync(self.node)
+        self.assertEquals(index.output("b1:1"), (3000000000L, "1D"))
+        self.assertEquals(index.output("zz:0"), None)
+
+    def test_Unspent(self):
+        index = ChainIndex(self.path)
+        index.sync(self.node)
+        self.assertEquals(list(index.unspent("1B")), [("c0:0", 5000000000L)])
+        self.node.mine([tx("d%d" % n, [], [("1B", 1.0)]) for n in range(5)])
+        index.sync(self.node)
+        self.assertEquals([o for o, v in index.unspent("1B", chunk=2)], ["c0:0"] + ["d%d:0" % n for n in range(5)])
+        self.assertEquals(list(index.unspent("1Z")), [])
+
+    def test_Reorg(self):
+        index = ChainIndex(self.path)
+        index.sync(self.node)
+        self.node.reorg(2, [[tx("e0", [], [("1B", 50.0)]), tx("e1", ["b1:0"], [("1H", 20.0)])],
+                            [tx("f0", [], [("1B", 50.0)])]])
+        self.assertEquals(index.sync(self.node), 3)
+        self.assertEquals(index.spentby("b1:1"), None)
+        self.assertEquals(index.spentby("b0:0"), None)
+        self.assertEquals(index.spentby("b1:0"), "e1")
+        self.assertEquals(index.output("c1:0"), None)
+        self.assertEquals(index.output("e1:0"), (2000000000L, "1H"))
+        self.assertEquals(index.blockhash(2), self.node.getblockhash(2))
+
+    def test_ReorgOnlyFetchesNewBlocks(self):
+        index = ChainIndex(self.path)
+        index.sync(self.node)
+        self.node.reorg(2, [[tx("e0", [], [("1B", 50.0)])]])
+        self.node.calls = []
+        index.sync(self.node)
+        self.assertEquals(self.node.calls.count("getblock"), 1)
+
+    def test_ReorgToShorterChainDuringSync(self):
+        index = ChainIndex(self.path)
+        def progress(height, tip):
+            if height == 1:
+                self.node.reorg(1, [[tx("g0", [], [("1B", 50.0)]), tx("g1", ["a0:0"], [("1J", 50.0)])]])
+        self.assertEquals(index.sync(self.node, progress=progress), 1)
+        self.assertEquals(index.height, 1)
+        self.assertEquals(index.spentby("a0:0"), "g1")
+        self.assertEquals(index.output("b1:0"), None)
+        self.assertEquals(index.blockhash(1), self.node.getblockhash(1))
+        self.assertEquals(index.blockhash(2), None)
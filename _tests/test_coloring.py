@@ -0,0 +1,77 @@
+import unittest, random
+import coloring
+
+def reference(input_values, output_values):
+    # The rule as bitpaint first implemented it, one output at a time
+    output_belongs_to_input = [-1]*len(output_values)
+    current_color_number = -1
+    current_color_total = 0
+    current_color_max = -1
+    for i in range(len(output_values)):
+        output_value = output_values[i]
+        while current_color_total+output_value > current_color_max:
+            current_color_number += 1
+            current_color_total = 0
+            if current_color_number >= len(input_values): return output_belongs_to_input
+            current_color_max = input_values[current_color_number]
+        output_belongs_to_input[i] = current_color_number
+        current_color_total += output_value
+    return output_belongs_to_input
+
+def random_tx(rnd, max_inputs=4, max_outputs=7):
+    inputs = [rnd.choice([0, 1, 546, 10**5, 10**8]) + rnd.randrange(10**6)
+              for n in range(rnd.randrange(0, max_inputs + 1))]
+    outputs = [rnd.choice([0, 546, rnd.randrange(2*10**6)]) for n in range(rnd.randrange(0, max_outputs + 1))]
+    return inputs, outputs
+
+class TestColoring(unittest.TestCase):
+
+    def test_Examples(self):
+        self.assertEquals(coloring.color([5, 5], [2, 3, 5]), [0, 0, 1])
+        # An output that does not fit skips to the next input
+        self.assertEquals(coloring.color([5, 5], [2, 4, 1]), [0, 1, 1])
+        self.assertEquals(coloring.color([5], [6, 1]), [-1, -1])
+        self.assertEquals(coloring.color([], [1]), [-1])
+        self.assertEquals(coloring.color([3], []), [])
+        self.assertEquals(coloring.color([3, 0, 2], [0, 3, 0, 2]), [0, 0, 0, 2])
+
+    def test_NoFloatDrift(self):
+        # 0.1 + 0.2 > 0.3 in floating point
+        self.assertEquals(coloring.color([30000000], [10000000, 20000000]), [0, 0])
+
+    def test_MatchesReference(self):
+        rnd = random.Random(1)
+        for n in range(2000):
+            inputs, outputs = random_tx(rnd)
+            self.assertEquals(coloring.color(inputs, outputs), reference(inputs, outputs))
+
+    def test_ManyOutputsMatchReference(self):
+        # Enough outputs per input to take the bisecting path
+        rnd = random.Random(2)
+        for n in range(300):
+            inputs, outputs = random_tx(rnd, 6, 60)
+            self.assertEquals(coloring.color(inputs, outputs), reference(inputs, outputs))
+
+    def test_ColorMany(self):
+        rnd = random.Random(3)
+        txs = [random_tx(rnd) for n in range(500)] + [random_tx(rnd, 6, 60) for n in range(100)]
+        rnd.shuffle(txs)
+        expected = [reference(i, o) for i, o in txs]
+        self.assertEquals(coloring.color_many(txs), expected)
+        self.assertEquals(coloring.color_many([]), [])
+
+    def test_ColorManyWithoutNumPy(self):
+        rnd = random.Random(4)
+        txs = [random_tx(rnd) for n in range(100)] + [random_tx(rnd, 6, 60) for n in range(20)]
+        numpy, coloring.numpy = coloring.numpy, None
+        try:
+            self.assertEquals(coloring.color_many(txs), [reference(i, o) for i, o in txs])
+        finally:
+            coloring.numpy = numpy
+
+    def test_Payout(self):
+        # A few inputs each paying for a run of small outputs, with some
+        # left over and an output too large for the next input
+        outputs = [1000 + n for n in range(40)]
+        inputs = [sum(outputs[:10]) + 5, sum(outputs[10:20]), 500]
+        self.assertEquals(coloring.color(inputs, outputs), [0]*10 + [1]*10 + [-1]*20)
@@ -0,0 +1,25 @@
+import unittest
+import consolidate
+from bulk import InputSize
+
+A = "1EHNa6Q4Jz2uvNExL497mE43ikXhwF6kZm"
+B = "1BgGZ9tcN4rm9KBzDn7KprQz87SZ26SAMH"
+
+class TestConsolidate(unittest.TestCase):
+
+    def test_SizeBounded(self):
+        utxos = [("%064x" % n, n % 3, A, 100000) for n in range(1200)]
+        txs = list(consolidate.plan(iter(utxos), B, 10000))
+        self.assertEquals(sum([i for i, v, f in txs], []), [u[:3] for u in utxos])
+        for inputs, value, fee in txs:
+            size = 10 + 34 + InputSize*len(inputs)
+            self.assertTrue(size <= consolidate.MaxTxSize)
+            self.assertEquals(fee, 10000 * ((size + 999) // 1000))
+            self.assertEquals(value + fee, 100000*len(inputs))
+        self.assertEquals([len(i) for i, v, f in txs], [555, 555, 90])
+
+    def test_SkipsUneconomicalOutputs(self):
+        utxos = [("a", 0, A, 1000), ("b", 0, A, 100000), ("c", 0, A, 1799)]
+        self.assertEquals(list(consolidate.plan(utxos, B, 10000)), [([("b", 0, A)], 90000, 10000)])
+        self.assertEquals(list(consolidate.plan(utxos[:1], B, 0)), [([("a", 0, A)], 1000, 0)])
+        self.assertEquals(list(consolidate.plan([], B, 10000)), [])
@@ -0,0 +1,70 @@
+import unittest, threading
+from feepool import FeePool
+
+def unspent(txid, vout, amount, script="76a914751e76e8199196d454941c45d1b3a323f1433bd688ac"):
+    return {"txid": txid, "vout": vout, "amount": amount, "scriptPubKey": script}
+
+class FakeWallet(object):
+    def __init__(self, utxos):
+        self.utxos = utxos
+        self.calls = 0
+
+    def listunspent(self, minconf=1):
+        self.calls += 1
+        return list(self.utxos)
+
+class TestFeePool(unittest.TestCase):
+
+    def setUp(self):
+        self.wallet = FakeWallet([unspent("a", 0, 0.5), unspent("b", 1, 0.001), unspent("c", 0, 0.01),
+                                  unspent("d", 0, 1.0, "a914" + "75"*20 + "87"), unspent("e", 2, 0.002)])
+        self.pool = FeePool(self.wallet, lambda outpoint: outpoint == "e:2")
+
+    def test_SmallestThatCovers(self):
+        u = self.pool.reserve(200000)
+        self.assertEquals(u[:2], ("c", 0))
+        self.assertEquals(u[2], "1BgGZ9tcN4rm9KBzDn7KprQz87SZ26SAMH")
+        self.assertEquals(u[3], 1000000)
+        self.assertEquals(self.pool.reserve(200000)[:2], ("a", 0))
+        self.assertEquals(self.pool.reserve(200000), None)
+        self.assertEquals(self.pool.reserve(100)[:2], ("b", 1))
+        self.assertEquals(self.pool.reserve(100), None)
+
+    def test_LoadsOnce(self):
+        self.pool.reserve(100)
+        self.pool.reserve(100)
+        self.assertEquals(self.wallet.calls, 1)
+
+    def test_ReleaseAndSpent(self):
+        u = self.pool.reserve(100)
+        self.pool.release(u)
+        self.assertEquals(self.pool.reserve(100), u)
+        self.pool.spent(u)
+        # Still listed by the wallet, but not handed out again
+        self.pool.refresh()
+        self.assertEquals(self.pool.reserve(100)[:2], ("c", 0))
+        self.wallet.utxos = [x for x in self.wallet.utxos if x["txid"] != "b"]
+        self.pool.refresh()
+        self.assertEquals(self.pool.used, set())
+
+    def test_RefreshMerges(self):
+        u = self.pool.reserve(100)
+        self.wallet.utxos.append(unspent("f", 0, 0.0005))
+        self.pool.refresh()
+        self.assertEquals(self.pool.reserve(100)[:2], ("f", 0))
+        self.pool.release(u)
+        self.assertEquals(self.pool.reserve(100), u)
+
+    def test_ConcurrentReservations(self):
+        self.wallet.utxos = [unspent("%064x" % n, 0, 0.001) for n in range(200)]
+        taken = []
+        def worker():
+            for n in range(50):
+                taken.append(self.pool.reserve(1000))
+        self.pool.refresh()
+        threads = [threading.Thread(target=worker) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEquals(len(set(taken)), 200)
@@ -0,0 +1,65 @@
+import unittest, random
+import payout
+
+class FakeWallet(object):
+    def __init__(self, fail=()):
+        self.requests = []
+        self.fail = fail
+
+    def batch(self, calls):
+        self.requests.append(calls)
+        results = []
+        for method, account, amounts in calls:
+            if len(results) + sum(len(r) for r in self.requests[:-1]) in self.fail:
+                results.append((None, {"code": -6, "message": "Insufficient funds"}))
+            else:
+                results.append(("%064x" % len(amounts), None))
+        return results
+
+class TestPayout(unittest.TestCase):
+
+    def test_ApportionIsExact(self):
+        self.assertEquals(payout.apportion(100, [1, 1, 1]), [34, 33, 33])
+        self.assertEquals(payout.apportion(10, [5, 3, 2]), [5, 3, 2])
+        self.assertEquals(payout.apportion(7, [1, 2]), [2, 5])
+        rnd = random.Random(1)
+        for n in range(200):
+            weights = [rnd.randrange(1, 10**8) for k in range(rnd.randrange(1, 50))]
+            total = rnd.randrange(10**10)
+            shares = payout.apportion(total, weights)
+            self.assertEquals(sum(shares), total)
+            for w, s in zip(weights, shares):
+                self.assertTrue(abs(s - float(total)*w/sum(weights)) < 1)
+
+    def test_AggregatesByAddress(self):
+        holdings = [("1A", 10, "t:0"), ("1B", 30, "t:1"), ("1A", 20, "u:0")]
+        self.assertEquals(payout.aggregate(holdings), [("1A", 30), ("1B", 30)])
+        payouts, dust = payout.plan(100000, holdings)
+        self.assertEquals(payouts, [("1A", 50000), ("1B", 50000)])
+        self.assertEquals(dust, [])
+
+    def test_DustIsLeftOut(self):
+        holdings = [("1A", 1000000, "t:0"), ("1B", 1, "t:1"), ("1C", 999, "t:2")]
+        payouts, dust = payout.plan(100000, holdings)
+        self.assertEquals(payouts, [("1A", 100000)])
+        self.assertEquals(dust, ["1B", "1C"])
+        self.assertEquals(payout.plan(100, holdings), ([], ["1A", "1B", "1C"]))
+
+    def test_Batches(self):
+        payouts = [("1%05d" % n, 1000) for n in range(10000)] + [("bc1q" + "q"*38, 1000), ("3A", 1000)]
+        txs = payout.batches(payouts)
+        self.assertEquals(sum(txs, []), payouts)
+        limit = payout.MaxTxSize - payout.InputReserve
+        for b in txs:
+            self.assertTrue(payout.TxOverhead + sum(payout.output_size(a) for a, v in b) <= limit)
+        self.assertEquals(len(txs), 4)
+        self.assertEquals(payout.batches([]), [])
+
+    def test_Send(self):
+        wallet = FakeWallet(fail=(2,))
+        txs = [[("1A", 100000000)], [("1B", 1), ("1C", 2)], [("1D", 3)]]
+        results = payout.send(wallet, "dividends", txs, calls_per_request=2)
+        self.assertEquals(len(wallet.requests), 2)
+        self.assertEquals(wallet.requests[0][0], ("sendmany", "dividends", {"1A": 1.0}))
+        self.assertEquals(wallet.requests[0][1][2], {"1B": 1e-08, "1C": 2e-08})
+        self.assertEquals([err is None for txid, err in results], [True, True, False])
@@ -0,0 +1,31 @@
+import unittest, binascii
+from ripemd160 import RIPEMD160, ripemd160, hash160
+
+# From the RIPEMD-160 reference page
+Vectors = [("", "9c1185a5c5e9fc54612808977ee8f548b2258d31"),
+           ("abc", "8eb208f7e05d987a9b044a8e98c6b087f15a0bfc"),
+           ("message digest", "5d0689ef49d2fae572b881b123a85ffa21595f36"),
+           ("abcdbcdecdefdefgefghfghighijhijkijkljklmklmnlmnomnopnopq",
+            "12a053384a9c0c88e405a06c27dcf49ada62eb2b"),
+           ("1234567890"*8, "9b752e45573d4b39f4dbd3323cab82bf63326bfb")]
+
+class TestRIPEMD160(unittest.TestCase):
+
+    def test_PurePython(self):
+        for m, h in Vectors:
+            self.assertEquals(binascii.hexlify(RIPEMD160(m).digest()), h)
+
+    def test_Update(self):
+        r = RIPEMD160("abcdbcdecdefdefgefghfghighij")
+        r.update("hijkijkljklmklmnlmnomnopnopq")
+        self.assertEquals(binascii.hexlify(r.digest()), Vectors[3][1])
+        self.assertEquals(binascii.hexlify(r.digest()), Vectors[3][1])
+
+    def test_Ripemd160(self):
+        for m, h in Vectors:
+            self.assertEquals(binascii.hexlify(ripemd160(m)), h)
+
+    def test_Hash160(self):
+        # The compressed public key of private key 1
+        pubkey = binascii.unhexlify("0279be667ef9dcbbac55a06295ce870b07029bfcdb2dce28d959f2815b16f81798")
+        self.assertEquals(binascii.hexlify(hash160(pubkey)), "751e76e8199196d454941c45d1b3a323f1433bd6")
@@ -0,0 +1,81 @@
+import unittest, binascii, hashlib, struct
+import signer
+from txparser import decode_tx, dsha256, segwit_decode, segwit_address
+
+# Private key 1, in both forms
+Uncompressed = "5HpHagT65TZzG1PH3CSu63k8DbpvD8s5ip4nEB3kEsreAnchuDf"
+Compressed = "KwDiBf89QgGbjEhKnhXJuH7LrciVrZi3qYjgd9M7rFU73sVHnoWn"
+
+class TestSigner(unittest.TestCase):
+
+    def test_Keys(self):
+        key = signer.Key(Uncompressed)
+        self.assertEquals((key.secret, key.compressed), (1, False))
+        self.assertEquals(key.address(), "1EHNa6Q4Jz2uvNExL497mE43ikXhwF6kZm")
+        key = signer.Key(Compressed)
+        self.assertEquals((key.secret, key.compressed), (1, True))
+        self.assertEquals(key.address(), "1BgGZ9tcN4rm9KBzDn7KprQz87SZ26SAMH")
+        self.assertEquals(signer.encode_wif(1, False), Uncompressed)
+        self.assertEquals(signer.encode_wif(1), Compressed)
+        self.assertRaises(signer.SignerError, signer.Key, Compressed[:-1] + "x")
+
+    def test_Multiply(self):
+        self.assertEquals(signer.multiply(1), signer.G)
+        self.assertEquals(signer.multiply(signer.N - 1), (signer.G[0], signer.P - signer.G[1]))
+        self.assertEquals(signer.multiply(6), signer.multiply(3, signer.multiply(2)))
+
+    def test_RFC6979(self):
+        # Private key 1 signing sha256("Satoshi Nakamoto")
+        digest = hashlib.sha256("Satoshi Nakamoto").digest()
+        self.assertEquals(signer.nonce(1, digest),
+                          0x8f8a276c19f4149656b280621e358cce24f5f52542772691ee69063b74f15d15)
+        sig = signer.sign(1, digest)
+        self.assertEquals(binascii.hexlify(sig),
+                          "3045022100934b1ea10a4b3c1757e2b0c017d0b6143ce3c9a7e6a4a49860d7a6ab210ee3d8"
+                          "02202442ce9d2b916064108014783e923ec36b49743e2ffa1c4496f01a512aafd9e5")
+        self.assertTrue(signer.verify(signer.Key(Compressed).pubkey, digest, sig))
+        self.assertFalse(signer.verify(signer.Key(Compressed).pubkey, dsha256("x"), sig))
+
+    def test_LowS(self):
+        for n in range(20):
+            r, s = signer.der_decode(signer.sign(n + 2, dsha256(str(n))))
+            self.assertTrue(s <= signer.N // 2)
+
+    def test_SignTx(self):
+        ring = signer.KeyRing([Uncompressed, Compressed])
+        inputs = [("11"*32, 0, "1EHNa6Q4Jz2uvNExL497mE43ikXhwF6kZm"),
+                  ("22"*32, 3, "1BgGZ9tcN4rm9KBzDn7KprQz87SZ26SAMH")]
+        p2wpkh = segwit_address("bc", 0, "\x75"*20)
+        outputs = [("1BgGZ9tcN4rm9KBzDn7KprQz87SZ26SAMH", 1000), (p2wpkh, 2000),
+                   ("1BgGZ9tcN4rm9KBzDn7KprQz87SZ26SAMH", 3000)]
+        raw = signer.sign_tx(inputs, outputs, ring)
+        self.assertEquals(raw, signer.sign_tx(inputs, outputs, ring))
+        tx = decode_tx(raw)
+        self.assertEquals([(i['txid'], i['vout']) for i in tx['vin']], [("11"*32, 0), ("22"*32, 3)])
+        self.assertEquals([o['scriptPubKey']['addresses'][0] for o in tx['vout']], [a for a, v in outputs])
+        self.assertEquals([o['value'] for o in tx['vout']], [0.00001, 0.00002, 0.00003])
+        # Each signature covers the transaction with only its own
+        # input's previous script filled in
+        outs = signer.serialize_outputs(outputs)
+        for n, i in enumerate(tx['vin']):
+            script = binascii.unhexlify(i['scriptSig']['hex'])
+            sig, pubkey = script[1:1+ord(script[0])], script[2+ord(script[0]):]
+            self.assertEquals(sig[-1], "\x01")
+            key = ring.get(inputs[n][2])
+            self.assertEquals(pubkey, key.pubkey)
+            unsigned = [""]*2
+            unsigned[n] = signer.p2pkh_script(key.hash160)
+            digest = dsha256(signer.serialize(inputs, outs, unsigned) + struct.pack("<I", 1))
+            self.assertTrue(signer.verify(pubkey, digest, sig[:-1]))
+
+    def test_MissingKey(self):
+        self.assertRaises(signer.SignerError, signer.sign_tx,
+                          [("11"*32, 0, "1EHNa6Q4Jz2uvNExL497mE43ikXhwF6kZm")], [], signer.KeyRing())
+
+    def test_SegwitDecode(self):
+        self.assertEquals(segwit_decode("BC1QW508D6QEJXTDG4Y5R3ZARVARY0C5XW7KV8F3T4"),
+                          ("bc", 0, binascii.unhexlify("751e76e8199196d454941c45d1b3a323f1433bd6")))
+        program = "\x79"*32
+        self.assertEquals(segwit_decode(segwit_address("tb", 1, program)), ("tb", 1, program))
+        self.assertRaises(ValueError, segwit_decode, "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t5")
+        self.assertRaises(ValueError, segwit_decode, "bc1qW508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4")
@@ -0,0 +1,86 @@
+import unittest, os, tempfile, shutil
+from statestore import StateStore
+
+class TestStateStore(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "state")
+        self.s = StateStore(self.path)
+
+    def tearDown(self):
+        self.s.close()
+        shutil.rmtree(self.dir)
+
+    def test_Assets(self):
+        self.s.add_asset("gold", "aa:0")
+        self.s.add_asset("silver", "bb:1")
+        self.assertEquals(self.s.assets(), ["gold", "silver"])
+        self.assertEquals(self.s.root_tx("silver"), "bb:1")
+        self.assertTrue(self.s.has_asset("gold"))
+        self.assertFalse(self.s.has_asset("lead"))
+        self.assertRaises(KeyError, self.s.root_tx, "lead")
+
+    def test_SetHoldingsReplacesInOrder(self):
+        self.s.add_asset("gold", "aa:0")
+        self.s.set_holdings("gold", [("A1", 5, "cc:0"), ("A2", 3, "cc:1")])
+        self.s.set_holdings("gold", [("A3", 2, "dd:1"), ("A1", 6, "dd:0")])
+        self.assertEquals(self.s.holdings("gold"), [("A3", 2, "dd:1"), ("A1", 6, "dd:0")])
+        self.assertTrue(self.s.index().is_colored("dd:0"))
+        self.assertFalse(self.s.index().is_colored("cc:0"))
+
+    def test_FailedUpdateKeepsHoldings(self):
+        self.s.add_asset("gold", "aa:0")
+        self.s.set_holdings("gold", [("A1", 5, "cc:0")])
+        # A repeated position cannot be stored
+        self.assertRaises(Exception, self.s.set_holdings, "gold", [("A2", 1, "dd:0"), None])
+        self.assertEquals(self.s.holdings("gold"), [("A1", 5, "cc:0")])
+
+    def test_MyHoldings(self):
+        self.s.add_asset("gold", "aa:0")
+        self.s.add_asset("silver", "bb:0")
+        self.s.set_holdings("silver", [("A1", 1, "ee:0")])
+        self.s.set_holdings("gold", [("A2", 2, "cc:0"), ("A1", 3, "cc:1")])
+        self.s.add_holding_address("A1", "K1")
+        self.assertEquals(self.s.holding_addresses(), ["A1"])
+        self.assertEquals(self.s.private_keys(), {"A1": "K1"})
+        self.assertEquals(self.s.index().holdings_of(self.s.holding_addresses()),
+                          [("gold", "A1", 3, "cc:1"), ("silver", "A1", 1, "ee:0")])
+
+    def test_MigrateIsRepeatable(self):
+        self.s.add_asset("gold", "aa:0")
+        self.s.set_holdings("gold", [("A1", 5, "cc:0")])
+        assets = [("gold", "aa:0", [("A9", 1, "zz:0")]), ("silver", "bb:0", [("A2", 4, "ff:0")])]
+        self.s.migrate(assets, [("A1", "K1")])
+        self.s.migrate(assets, [("A1", "K2")])
+        self.assertEquals(self.s.assets(), ["gold", "silver"])
+        self.assertEquals(self.s.holdings("gold"), [("A1", 5, "cc:0")])
+        self.assertEquals(self.s.holdings("silver"), [("A2", 4, "ff:0")])
+        self.assertEquals(self.s.private_keys(), {"A1": "K1"})
+
+    def test_SurvivesReopen(self):
+        self.s.add_asset("gold", "aa:0")
+        self.s.set_holdings("gold", [("A1", 5, "cc:0")])
+        self.s.close()
+        self.s = StateStore(self.path)
+        self.assertEquals(self.s.holdings("gold"), [("A1", 5, "cc:0")])
+
+    def test_Index(self):
+        self.s.add_asset("gold", "aa:0")
+        self.s.add_asset("silver", "bb:0")
+        self.s.set_holdings("silver", [("A1", 1, "ee:0")])
+        self.s.set_holdings("gold", [("A2", 2, "cc:0"), ("A1", 3, "cc:1")])
+        index = self.s.index()
+        self.assertTrue(index.is_colored("cc:1"))
+        self.assertFalse(index.is_colored("aa:0"))
+        self.assertEquals(index.holdings_of(["A1"]), [("gold", "A1", 3, "cc:1"), ("silver", "A1", 1, "ee:0")])
+        self.assertEquals(index.holdings_of(["A2", "A9"]), [("gold", "A2", 2, "cc:0")])
+        self.assertEquals(index.holdings_of(["A1", "A2"]), [("gold", "A2", 2, "cc:0"), ("gold", "A1", 3, "cc:1"),
+                                                             ("silver", "A1", 1, "ee:0")])
+        self.assertEquals(index.by_address["A1"], [(1, "gold", 3, "cc:1"), (2, "silver", 1, "ee:0")])
+
+    def test_HoldingsIndexes(self):
+        names = [r[0] for r in self.s.query("SELECT name FROM sqlite_master WHERE type = 'index' "
+                                            "AND tbl_name = 'holdings'")]
+        self.assertTrue("holdings_address" in names)
+        self.assertTrue("holdings_outpoint" in names)
@@ -0,0 +1,81 @@
+import unittest, binascii, hashlib, struct
+import txparser
+from txparser import decode_tx, script_pubkey, TxParseError
+
+# The first transaction between two people, in block 170
+Tx170 = ("0100000001c997a5e56e104102fa209c6a852dd90660a20b2d9c352423edce25857fcd3704000000004847"
+         "304402204e45e16932b8af514961a1d3a1a25fdf3f4f7732e9d624c6c61548ab5fb8cd410220181522ec8e"
+         "ca07de4860a4acdd12909d831cc56cbbac4622082221a8768d1d0901ffffffff0200ca9a3b000000004341"
+         "04ae1a62fe09c5f51b13905f07f06b99a2f7159b2225f374cd378d71302fa28414e7aab37397f554a7df5f"
+         "142c21c1b7303b8a0626f1baded5c72a704f7e6cd84cac00286bee0000000043410411db93e1dcdb8a016b"
+         "49840f8c53bc1eb68a382e97b1482ecad7b148a6909a5cb2e0eaddfb84ccf9744464f82e160bfa9b8b64f9"
+         "d4c03f999b8643f656b412a3ac00000000")
+
+# The public key and hash160 of private key 1
+PubKey = "0279be667ef9dcbbac55a06295ce870b07029bfcdb2dce28d959f2815b16f81798"
+Hash160 = "751e76e8199196d454941c45d1b3a323f1433bd6"
+
+def dsha256(v):
+    return hashlib.sha256(hashlib.sha256(v).digest()).digest()
+
+class TestTxParser(unittest.TestCase):
+
+    def test_Tx170(self):
+        tx = decode_tx(Tx170)
+        self.assertEquals(tx['txid'], "f4184fc596403b9d638783cf57adfe4c75c605f6356fbc91338530e9831e9e16")
+        self.assertEquals(tx['hash'], tx['txid'])
+        self.assertEquals((tx['version'], tx['locktime'], tx['size'], tx['vsize']), (1, 0, 275, 275))
+        self.assertEquals(tx['vin'][0]['txid'], "0437cd7f8525ceed2324359c2d0ba26006d92d856a9c20fa0241106ee5a597c9")
+        self.assertEquals(tx['vin'][0]['vout'], 0)
+        self.assertEquals(tx['vin'][0]['sequence'], 4294967295)
+        self.assertEquals([o['value'] for o in tx['vout']], [10.0, 40.0])
+        self.assertEquals([o['n'] for o in tx['vout']], [0, 1])
+        self.assertEquals([o['scriptPubKey']['type'] for o in tx['vout']], ['pubkey', 'pubkey'])
+        self.assertEquals([o['scriptPubKey']['addresses'] for o in tx['vout']],
+                          [["1Q2TWHE3GMdB6BZKafqwxXtWAWgFt5Jvm3"], ["12cbQLTFMXRnSzktFkuoG3eHoMeFtpTu3S"]])
+
+    def test_Segwit(self):
+        script = binascii.unhexlify("0014" + Hash160)
+        body = ("\x01" + "\x11"*32 + struct.pack("<I", 1) + "\x00" + struct.pack("<I", 0xfffffffe) +
+                "\x01" + struct.pack("<q", 12345) + chr(len(script)) + script)
+        witness = "\x02" + "\x03abc" + "\x01d"
+        stripped = struct.pack("<i", 2) + body + struct.pack("<I", 7)
+        full = struct.pack("<i", 2) + "\x00\x01" + body + witness + struct.pack("<I", 7)
+        tx = decode_tx(binascii.hexlify(full))
+        self.assertEquals(tx['txid'], binascii.hexlify(dsha256(stripped)[::-1]))
+        self.assertEquals(tx['hash'], binascii.hexlify(dsha256(full)[::-1]))
+        self.assertEquals(tx['size'], len(full))
+        self.assertEquals(tx['vsize'], (len(stripped)*3 + len(full) + 3)//4)
+        self.assertEquals(tx['vin'][0]['txinwitness'], ["616263", "64"])
+        self.assertEquals(tx['vin'][0]['txid'], "11"*32)
+        self.assertEquals(tx['vin'][0]['vout'], 1)
+        self.assertEquals(tx['vout'][0]['value'], 0.00012345)
+        self.assertEquals(tx['vout'][0]['scriptPubKey']['addresses'], ["bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4"])
+        self.assertEquals(tx['locktime'], 7)
+
+    def test_Coinbase(self):
+        raw = ("01000000" "01" + "00"*32 + "ffffffff" "03" "010203" "ffffffff"
+               "01" + "00f2052a01000000" "00" "00000000")
+        tx = decode_tx(raw)
+        self.assertEquals(tx['vin'], [{'coinbase': "010203", 'sequence': 4294967295}])
+        self.assertEquals(tx['vout'][0]['value'], 50.0)
+        self.assertEquals(tx['vout'][0]['scriptPubKey']['type'], 'nonstandard')
+
+    def test_ScriptTypes(self):
+        spk = script_pubkey(binascii.unhexlify("76a914" + Hash160 + "88ac"))
+        self.assertEquals((spk['type'], spk['addresses']), ('pubkeyhash', ["1BgGZ9tcN4rm9KBzDn7KprQz87SZ26SAMH"]))
+        spk = script_pubkey(binascii.unhexlify("a914" + Hash160 + "87"))
+        self.assertEquals(spk['type'], 'scripthash')
+        self.assertTrue(spk['addresses'][0].startswith("3"))
+        spk = script_pubkey(binascii.unhexlify("5121" + PubKey + "21" + PubKey + "52ae"))
+        self.assertEquals((spk['type'], spk['reqSigs']), ('multisig', 1))
+        self.assertEquals(spk['addresses'], ["1BgGZ9tcN4rm9KBzDn7KprQz87SZ26SAMH"]*2)
+        spk = script_pubkey(binascii.unhexlify("6a0568656c6c6f"))
+        self.assertEquals(spk['type'], 'nulldata')
+        self.assertFalse('addresses' in spk)
+        spk = script_pubkey(binascii.unhexlify("76a914" + Hash160 + "88ac"), txparser.TestNet)
+        self.assertTrue(spk['addresses'][0][0] in "mn")
+
+    def test_Truncated(self):
+        self.assertRaises(TxParseError, decode_tx, Tx170[:-10])
+        self.assertRaises(TxParseError, decode_tx, Tx170 + "00")
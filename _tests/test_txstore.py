@@ -0,0 +1,81 @@
+import unittest, os, tempfile, shutil
+from txstore import TxStore
+
+class TestTxStore(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "txstore")
+        self.loaded = []
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def loader(self, txid):
+        self.loaded.append(txid)
+        return {'txid': txid, 'vout': [{'value': 0.01, 'n': 0}]}
+
+    def test_FetchLoadsOnce(self):
+        s = TxStore(self.path)
+        tx = s.fetch("aa", self.loader)
+        self.assertEquals(tx['txid'], "aa")
+        self.assertEquals(s.fetch("aa", self.loader), tx)
+        self.assertEquals(self.loaded, ["aa"])
+        self.assertEquals(s.stats()['misses'], 1)
+        self.assertEquals(s.stats()['hits'], 1)
+        s.close()
+
+    def test_SurvivesReopen(self):
+        s = TxStore(self.path)
+        s.fetch("aa", self.loader)
+        s.close()
+        s = TxStore(self.path)
+        self.assertEquals(s.fetch("aa", self.loader)['vout'][0]['value'], 0.01)
+        self.assertEquals(self.loaded, ["aa"])
+        self.assertEquals(s.stats()['disk_hits'], 1)
+        s.close()
+
+    def test_EvictsLeastRecentlyUsed(self):
+        s = TxStore(self.path, max_entries=2, memory_entries=1)
+        s.fetch("aa", self.loader)
+        s.fetch("bb", self.loader)
+        s.get("aa")
+        s.fetch("cc", self.loader)
+        self.assertEquals(s.stats()['entries'], 2)
+        self.assertEquals(s.stats()['evictions'], 1)
+        s.memory.clear()
+        self.assertEquals(s.get("bb"), None)
+        self.assertNotEquals(s.get("aa"), None)
+        s.close()
+
+    def test_MemoryLayerIsBounded(self):
+        s = TxStore(self.path, memory_entries=1)
+        s.fetch("aa", self.loader)
+        s.fetch("bb", self.loader)
+        self.assertEquals(s.memory.keys(), ["bb"])
+        s.close()
+
+    def test_MemoryHitsCountAsUse(self):
+        s = TxStore(self.path, max_entries=2, memory_entries=2, touch_batch=10)
+        s.fetch("aa", self.loader)
+        s.fetch("bb", self.loader)
+        # Only ever a memory hit, but still more recent than bb on disk
+        s.get("aa")
+        s.fetch("cc", self.loader)
+        s.memory.clear()
+        self.assertEquals(s.get("bb"), None)
+        self.assertNotEquals(s.get("aa"), None)
+        s.close()
+
+    def test_TouchesWrittenOnClose(self):
+        s = TxStore(self.path, memory_entries=2)
+        s.fetch("aa", self.loader)
+        s.fetch("bb", self.loader)
+        s.get("aa")
+        s.close()
+        s = TxStore(self.path, max_entries=1)
+        s.evict()
+        s.memory.clear()
+        self.assertEquals(s.get("bb"), None)
+        self.assertNotEquals(s.get("aa"), None)
+        s.close()
@@ -0,0 +1,109 @@
+"""
+base58.py
+~~~~~~~~~
+Base58 and base58check encoding, as used for Bitcoin addresses and
+private keys.
+
+Numbers are converted ten digits at a time, so most of the arithmetic
+is done on machine-sized integers rather than longs, and the batch
+functions convert each distinct address only once.
+"""
+
+import binascii, hashlib
+
+b58chars = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+b58values = dict((c, i) for i, c in enumerate(b58chars))
+# 58**10 is the largest power of 58 that fits in 63 bits
+chunk = 10
+chunkbase = 58**chunk
+# Every pair of digits, so encoding takes one divmod per two digits
+b58pairs = [a + b for a in b58chars for b in b58chars]
+
+def b58encode(v):
+    # Encode a byte string; each leading zero byte becomes a '1'
+    n = v and long(binascii.hexlify(v), 16) or 0
+    chars = []
+    while n:
+        n, r = divmod(n, chunkbase)
+        r = int(r)
+        for i in range(chunk/2):
+            r, d = divmod(r, 58*58)
+            chars.append(b58pairs[d])
+    pad = len(v) - len(v.lstrip('\0'))
+    chars.reverse()
+    return b58chars[0]*pad + ''.join(chars).lstrip(b58chars[0])
+
+def b58decode(v, length=None):
+    # Decode v into a byte string. Returns None if length is given and
+    # the result has a different length.
+    n = 0
+    start = 0
+    end = len(v) % chunk or chunk
+    while start < len(v):
+        r = 0
+        for c in v[start:end]:
+            try:
+                r = r*58 + b58values[c]
+            except KeyError:
+                raise ValueError("Invalid base58 character %r" % (c,))
+        n = n*58**(end-start) + r
+        start, end = end, end+chunk
+    if n:
+        h = '%x' % n
+        result = binascii.unhexlify(len(h) % 2 and '0' + h or h)
+    else:
+        result = ''
+    pad = len(v) - len(v.lstrip(b58chars[0]))
+    result = '\0'*pad + result
+    if length is not None and len(result) != length:
+        return None
+    return result
+
+def checksum(v):
+    return hashlib.sha256(hashlib.sha256(v).digest()).digest()[:4]
+
+def b58encode_check(v):
+    return b58encode(v + checksum(v))
+
+def b58decode_check(v):
+    # Decode a base58check string and return its payload, version byte
+    # included; raises ValueError if the checksum does not match
+    result = b58decode(v)
+    if len(result) < 4 or checksum(result[:-4]) != result[-4:]:
+        raise ValueError("Invalid base58check checksum: %s" % (v,))
+    return result[:-4]
+
+def base58_check_encode(payload, version=0):
+    # Encode payload (such as a hash160) with a version byte; version 0
+    # gives a pay-to-pubkey-hash address
+    return b58encode_check(chr(version) + payload)
+
+def address_to_hash160(addr):
+    # The 20-byte hash an address pays to
+    payload = b58decode_check(addr)
+    if len(payload) != 21:
+        raise ValueError("Invalid address length: %s" % (addr,))
+    return payload[1:]
+
+def hash160_to_address(h, version=0):
+    return base58_check_encode(h, version)
+
+def addresses_to_hash160s(addrs):
+    # address_to_hash160 for many addresses, converting each distinct
+    # address once
+    seen = {}
+    result = []
+    for a in addrs:
+        if a not in seen:
+            seen[a] = address_to_hash160(a)
+        result.append(seen[a])
+    return result
+
+def hash160s_to_addresses(hashes, version=0):
+    seen = {}
+    result = []
+    for h in hashes:
+        if h not in seen:
+            seen[h] = base58_check_encode(h, version)
+        result.append(seen[h])
+    return result
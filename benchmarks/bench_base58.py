@@ -0,0 +1,63 @@
+#!/usr/bin/env python2
+
+"""
+bench_base58.py
+~~~~~~~~~~~~~~~
+Compare base58 against the decoder bitpaint used to carry, on a batch
+of addresses, and time encoding, checked decoding and the batch
+conversions with repeated addresses.
+
+Usage: python2 benchmarks/bench_base58.py [repeat]
+"""
+
+import os, sys, timeit, hashlib
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import base58
+
+__b58chars = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+__b58base = len(__b58chars)
+
+def legacy_b58decode(v, length):
+    """ decode v into a string of len bytes
+    """
+    long_value = 0L
+    for (i, c) in enumerate(v[::-1]):
+        long_value += __b58chars.find(c) * (__b58base**i)
+    result = ''
+    while long_value >= 256:
+        div, mod = divmod(long_value, 256)
+        result = chr(mod) + result
+        long_value = div
+    result = chr(long_value) + result
+    nPad = 0
+    for c in v:
+        if c == __b58chars[0]: nPad += 1
+        else: break
+    result = chr(0)*nPad + result
+    if length is not None and len(result) != length:
+        return None
+    return result
+
+def hash160s(n):
+    return [hashlib.new('sha1', str(i)).digest() for i in range(n)]
+
+def bench(name, fn, repeat):
+    t = min(timeit.repeat(fn, number=1, repeat=repeat))
+    print "  %-22s %10.2f ms" % (name, t * 1000)
+    return t
+
+if __name__ == '__main__':
+    repeat = len(sys.argv) > 1 and int(sys.argv[1]) or 5
+    hashes = hash160s(10000)
+    addrs = [base58.hash160_to_address(h) for h in hashes]
+    for a in addrs:
+        assert legacy_b58decode(a, 25) == base58.b58decode(a, 25)
+    print "%d addresses" % len(addrs)
+    old = bench("legacy b58decode", lambda: [legacy_b58decode(a, 25) for a in addrs], repeat)
+    new = bench("b58decode", lambda: [base58.b58decode(a, 25) for a in addrs], repeat)
+    print "  speedup                %10.1fx" % (old / new)
+    bench("address_to_hash160", lambda: [base58.address_to_hash160(a) for a in addrs], repeat)
+    bench("hash160_to_address", lambda: [base58.hash160_to_address(h) for h in hashes], repeat)
+    # Inputs of a transaction often share a few addresses
+    repeated = addrs[:100]*100
+    bench("addresses_to_hash160s", lambda: base58.addresses_to_hash160s(repeated), repeat)
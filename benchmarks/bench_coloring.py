@@ -0,0 +1,71 @@
+#!/usr/bin/env python2
+
+"""
+bench_coloring.py
+~~~~~~~~~~~~~~~~~
+Time the coloring rule on a block's worth of ordinary transactions and
+on a batch of dividend payouts: the float loop bitpaint used to run per
+transaction, coloring.color per transaction, and coloring.color_many on
+the whole batch (with NumPy if it is installed).
+
+Usage: python2 benchmarks/bench_coloring.py [repeat]
+"""
+
+import os, sys, timeit, random
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import coloring
+
+def legacy_match_outputs_to_inputs(input_values, output_values):
+    output_belongs_to_input = [-1]*len(output_values)
+    current_color_number = -1
+    current_color_total = 0.0
+    current_color_max = -1
+    for i in range(len(output_values)):
+        output_value = output_values[i]
+        while current_color_total+output_value > current_color_max:
+            current_color_number += 1
+            current_color_total = 0.0
+            if current_color_number >= len(input_values): return output_belongs_to_input
+            current_color_max = input_values[current_color_number]
+        output_belongs_to_input[i] = current_color_number
+        current_color_total += output_value
+    return output_belongs_to_input
+
+def block(ntx=3000, seed=1):
+    # Mostly small transactions, with a few large payouts
+    rnd = random.Random(seed)
+    txs = []
+    for n in range(ntx):
+        nin = rnd.random() < 0.02 and 50 or rnd.randrange(1, 4)
+        nout = rnd.random() < 0.02 and 500 or rnd.randrange(1, 4)
+        outputs = [rnd.randrange(546, 10**7) for k in range(nout)]
+        total = sum(outputs)
+        inputs = [total // nin + rnd.randrange(10**5) for k in range(nin)]
+        txs.append((inputs, outputs))
+    return txs
+
+def payouts(ntx=20, seed=2):
+    # Dividend payouts: a few inputs paying a few thousand holders
+    rnd = random.Random(seed)
+    txs = []
+    for n in range(ntx):
+        outputs = [rnd.randrange(546, 10**6) for k in range(2000)]
+        inputs = [sum(outputs[k:k+500]) for k in range(0, 2000, 500)]
+        txs.append((inputs, outputs))
+    return txs
+
+def bench(name, fn, repeat):
+    t = min(timeit.repeat(fn, number=1, repeat=repeat))
+    print "  %-12s %10.2f ms" % (name, t * 1000)
+    return t
+
+if __name__ == '__main__':
+    repeat = len(sys.argv) > 1 and int(sys.argv[1]) or 5
+    for txs in block(), payouts():
+        floats = [([v / 1e8 for v in i], [v / 1e8 for v in o]) for i, o in txs]
+        print "%d transactions, %d outputs%s" % (len(txs), sum(len(o) for i, o in txs),
+                                              coloring.numpy is None and " (no NumPy)" or "")
+        old = bench("legacy", lambda: [legacy_match_outputs_to_inputs(i, o) for i, o in floats], repeat)
+        bench("color", lambda: [coloring.color(i, o) for i, o in txs], repeat)
+        new = bench("color_many", lambda: coloring.color_many(txs), repeat)
+        print "  speedup      %10.1fx" % (old / new)
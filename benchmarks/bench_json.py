@@ -0,0 +1,101 @@
+#!/usr/bin/env python2
+
+"""
+bench_json.py
+~~~~~~~~~~~~~
+Compare jsonrpc.json against the legacy implementation on RPC-shaped
+payloads. Decoding is timed on a getblock reply with many txids, a
+decoderawtransaction reply with many inputs and outputs, and a
+getrawtransaction reply carrying a large hex string. Encoding is timed
+on sendmany, createrawtransaction and signrawtransaction requests.
+
+Usage: python2 benchmarks/bench_json.py [repeat]
+"""
+
+import os, sys, timeit
+from cStringIO import StringIO
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import jsonrpc, legacy_json
+
+def txid(i):
+    return ("%064x" % (i * 0x9e3779b97f4a7c15))[-64:]
+
+def getblock_reply(ntx=2000):
+    block = {"hash": txid(1), "confirmations": 12, "size": 499812, "height": 250000,
+             "version": 2, "merkleroot": txid(2), "time": 1375533383, "nonce": 4188722571L,
+             "bits": "1a00c4e4", "difficulty": 37392766.13868842,
+             "previousblockhash": txid(3), "nextblockhash": txid(4),
+             "tx": [txid(i) for i in range(ntx)]}
+    return jsonrpc.dumps({"result": block, "error": None, "id": "jsonrpc"})
+
+def decoderawtransaction_reply(nin=200, nout=200):
+    vin = []
+    for i in range(nin):
+        vin.append({"txid": txid(i), "vout": i % 4, "sequence": 4294967295L,
+                    "scriptSig": {"asm": "30440220" + "ab"*68 + " 02" + "cd"*32,
+                                  "hex": "47304402" + "ab"*70 + "21" + "cd"*33}})
+    vout = []
+    for i in range(nout):
+        vout.append({"value": 0.01 * (i + 1), "n": i,
+                     "scriptPubKey": {"asm": "OP_DUP OP_HASH160 " + "ef"*20 + " OP_EQUALVERIFY OP_CHECKSIG",
+                                      "hex": "76a914" + "ef"*20 + "88ac", "reqSigs": 1,
+                                      "type": "pubkeyhash",
+                                      "addresses": ["1KRavVCsvaLi7ZzktHSCE3hPUvhPDhQKhz"]}})
+    tx = {"txid": txid(5), "version": 1, "locktime": 0, "vin": vin, "vout": vout}
+    return jsonrpc.dumps({"result": tx, "error": None, "id": "jsonrpc"})
+
+def getrawtransaction_reply(size=100000):
+    return jsonrpc.dumps({"result": "01000000" + "ab"*size, "error": None, "id": "jsonrpc"})
+
+def address(i):
+    return "1" + ("%033x" % (i * 0x9e3779b97f4a7c15))[-33:]
+
+def amount(i):
+    # Amounts with at most 8 decimals, which both encoders print exactly
+    return (i * 7919 % 10**8) / 1e8
+
+def sendmany_request(nout=10000):
+    payouts = dict((address(i), amount(i)) for i in range(nout))
+    return {"method": "sendmany", "params": ["dividends", payouts], "id": "jsonrpc"}
+
+def createrawtransaction_request(nin=500, nout=500):
+    inputs = [{"txid": txid(i), "vout": i % 4} for i in range(nin)]
+    outputs = dict((address(i), amount(i)) for i in range(nout))
+    return {"method": "createrawtransaction", "params": [inputs, outputs], "id": "jsonrpc"}
+
+def signrawtransaction_request(nin=500):
+    tx = "01000000" + "ab"*(nin*41 + 500*34)
+    inputs = [{"txid": txid(i), "vout": i % 4, "scriptPubKey": "76a914" + "ef"*20 + "88ac"}
+              for i in range(nin)]
+    keys = ["5" + ("%050x" % (i * 0x9e3779b97f4a7c15))[-50:] for i in range(nin)]
+    return {"method": "signrawtransaction", "params": [tx, inputs, keys], "id": "jsonrpc"}
+
+def dump_to_buffer(obj):
+    jsonrpc.dump(obj, StringIO())
+
+def bench(name, fn, payload, repeat):
+    t = min(timeit.repeat(lambda: fn(payload), number=1, repeat=repeat))
+    print "  %-8s %10.2f ms" % (name, t * 1000)
+    return t
+
+if __name__ == '__main__':
+    repeat = len(sys.argv) > 1 and int(sys.argv[1]) or 5
+    payloads = [("getblock", getblock_reply()),
+                ("decoderawtransaction", decoderawtransaction_reply()),
+                ("getrawtransaction", getrawtransaction_reply())]
+    for name, payload in payloads:
+        assert jsonrpc.loads(payload) == legacy_json.loads(payload)
+        print "%s (%d bytes)" % (name, len(payload))
+        old = bench("legacy", legacy_json.loads, payload, repeat)
+        new = bench("loads", jsonrpc.loads, payload, repeat)
+        print "  speedup  %10.1fx" % (old / new)
+    requests = [("sendmany", sendmany_request()),
+                ("createrawtransaction", createrawtransaction_request()),
+                ("signrawtransaction", signrawtransaction_request())]
+    for name, request in requests:
+        assert jsonrpc.dumps(request) == legacy_json.dumps(request)
+        print "%s (%d bytes)" % (name, len(jsonrpc.dumps(request)))
+        old = bench("legacy", legacy_json.dumps, request, repeat)
+        new = bench("dumps", jsonrpc.dumps, request, repeat)
+        bench("dump", dump_to_buffer, request, repeat)
+        print "  speedup  %10.1fx" % (old / new)
@@ -7,7 +7,7 @@ Analyze the Bitcoin blockchain to track and manage "colored coins" which
 are distinguished based on their origin.
 
 Caution:
- - Private keys are stored in plaintext in your configuration file.
+ - Private keys are stored in plaintext in your state store.
  - The ordering-based approach hasn't been tested much yet and might
    be incompatible with other kinds of colored coins.
  - Small coin amounts may be seen as dust by the blockchain, and
@@ -25,31 +25,54 @@ Based on code published by bitfair at https://bitcointalk.org/index.php?topic=11
 
 # Import libraries
 from optparse import OptionParser
-import ConfigParser, jsonrpc, urllib2, os, binascii
+from multiprocessing.pool import ThreadPool
+import ConfigParser, jsonrpc, os, itertools, time, httplib, socket
+from txstore import TxStore
+from blockchaininfo import BlockchainInfo
+from chainindex import ChainIndex
+import bulk, coloring, consolidate, payout, signer
+import blkfile
+from statestore import StateStore
+from feepool import FeePool
+from txparser import decode_tx
 
 ### Start: Generic helpers
 def JSONtoAmount(value):
     return long(round(value * 1e8))
 def AmountToJSON(amount):
     return float(amount / 1e8)
+# Fee per 1000 bytes when none is given
+DefaultFeePerKB = 0.0001
 ### End: Generic helpers
 
 ### Start: Create/Read Config
-# Here we create a configuration file if one does not exist already.
-# User is asked for details about his bitcoind so the script can connect.
+# The config file is read and the connections and stores opened by
+# setup(), so the module can be imported without a bitcoind to talk to.
 config_file = "bitpaint.conf"
 basic_bitpaint_conf = """[bitcoind]
 rpchost = %s
 rpcport = %s
 rpcuser = %s
 rpcpwd = %s
-
-[HoldingAddresses]
-addresses =
-private_keys =
 """
-# If the config file does not exists, ask user for details and write one
-if not os.path.exists(config_file):
+config = None
+bitcoind_connection_string = None
+http = None
+sp = None
+bcinfo = None
+txstore = None
+chainindex = None
+state = None
+
+def configGetDefault(section, item, default):
+    # Get an optional setting from the config file
+    if config.has_option(section, item):
+        return config.get(section, item)
+    return default
+
+def create_config():
+    # Ask the user for details about his bitcoind so the script can
+    # connect, and write them to a new config file
     print "Configuration file bitpaint.conf not found. Creating one..."
     host = raw_input("bitcoind rpc host (default: 127.0.0.1): ")
     if len(host) == 0: host = "127.0.0.1"
@@ -61,21 +84,54 @@ if not os.path.exists(config_file):
     f.write(basic_bitpaint_conf % (host,port,user,pwd))
     f.close()
 
-# Parse the config file
-reserved_sections = ['bitcoind', 'HoldingAddresses']
-config = ConfigParser.ConfigParser()
-config.read(config_file)
-rpchost = config.get('bitcoind', 'rpchost')
-rpcport = config.get('bitcoind', 'rpcport')
-rpcuser = config.get('bitcoind', 'rpcuser')
-rpcpwd  = config.get('bitcoind', 'rpcpwd')
-
-# Connect to bitcoind
-if len(rpcuser) == 0 and len(rpcpwd) == 0:
-    bitcoind_connection_string = "http://%s:%s" % (rpchost,rpcport)
-else:
-    bitcoind_connection_string = "http://%s:%s@%s:%s" % (rpcuser,rpcpwd,rpchost,rpcport)
-sp = jsonrpc.ServiceProxy(bitcoind_connection_string)
+def setup():
+    # Read the config file, creating one if it does not exist, connect
+    # to bitcoind and open the stores
+    global config, bitcoind_connection_string, http, sp, bcinfo, txstore, chainindex, state, asp, ahttp
+    if not os.path.exists(config_file):
+        create_config()
+
+    # Parse the config file
+    config = ConfigParser.ConfigParser()
+    config.read(config_file)
+    rpchost = config.get('bitcoind', 'rpchost')
+    rpcport = config.get('bitcoind', 'rpcport')
+    rpcuser = config.get('bitcoind', 'rpcuser')
+    rpcpwd  = config.get('bitcoind', 'rpcpwd')
+
+    # Connect to bitcoind
+    if len(rpcuser) == 0 and len(rpcpwd) == 0:
+        bitcoind_connection_string = "http://%s:%s" % (rpchost,rpcport)
+    else:
+        bitcoind_connection_string = "http://%s:%s@%s:%s" % (rpcuser,rpcpwd,rpchost,rpcport)
+    # One pool of keep-alive connections per host, shared by the bitcoind
+    # proxy and the blockchain.info lookups
+    http = jsonrpc.HTTPTransport(int(configGetDefault('bitcoind', 'rpcconnections', '4')),
+                                 float(configGetDefault('bitcoind', 'rpctimeout', '30')))
+    sp = jsonrpc.ServiceProxy(bitcoind_connection_string, transport=http)
+    asp = jsonrpc.AsyncServiceProxy(bitcoind_connection_string)
+    ahttp = jsonrpc.AsyncHTTPClient()
+
+    # blockchain.info, for address histories and transactions bitcoind
+    # does not have
+    bcinfo = BlockchainInfo(http, configGetDefault('bitcoind', 'bcinfo', 'bitpaint.bcinfo'),
+                            rate=float(configGetDefault('bitcoind', 'bcinfo_rate', '5')),
+                            jobs=int(configGetDefault('bitcoind', 'bcinfo_jobs', '4')))
+
+    # Open the transaction store shared by all runs
+    txstore = TxStore(configGetDefault('bitcoind', 'txstore', 'bitpaint.txstore'),
+                      int(configGetDefault('bitcoind', 'txstore_size', '100000')))
+
+    # The chain index is only used once a path is configured for it, as
+    # building it means walking every block from chainindex_start
+    if config.has_option('bitcoind', 'chainindex'):
+        chainindex = ChainIndex(config.get('bitcoind', 'chainindex'))
+    else:
+        chainindex = None
+
+    # Painted coins, their holders and our holding addresses
+    state = StateStore(configGetDefault('bitcoind', 'statestore', 'bitpaint.state'))
+    migrate_config()
 
 ### End: Create/Read Config
 
@@ -91,103 +147,87 @@ def configListGet(section, item):
     if l != []: l.remove('')
     return l
 
-def configListSet(section, item, data):
-    datastring='\n'+'\n'.join(data)
-    config.set(section, item, datastring)
-
-def configListAppendValue(section, item, value):
-    data=configListGet(section, item)
-    data.append(value)
-    configListSet(section, item, data)
-
-def configListRemoveValue(section, item, value):
-    data=configListGet(section, item).remove(value)
-    configListSet(section, item, data)
+def migrate_config():
+    # Earlier versions kept painted coins and holding addresses as
+    # lists in the config file. Move them to the state store and
+    # leave only the connection settings behind.
+    sections = [s for s in config.sections() if s != 'bitcoind']
+    if len(sections) == 0:
+        return
+    assets = []
+    holding_addresses = []
+    for s in sections:
+        if s == 'HoldingAddresses':
+            holding_addresses = zip(configListGet(s, 'addresses'), configListGet(s, 'private_keys'))
+            continue
+        holdings = zip(configListGet(s, 'holders'),
+                       [JSONtoAmount(float(a)) for a in configListGet(s, 'amounts')],
+                       configListGet(s, 'txid'))
+        assets.append((s, configListGet(s, 'root_tx')[0], holdings))
+    state.migrate(assets, holding_addresses)
+    for s in sections:
+        config.remove_section(s)
+    config.write(open(config_file,'w'))
+    print "Moved %d painted coins and %d holding addresses from %s to %s" % (
+        len(assets), len(holding_addresses), config_file, state.path)
 
 ### End: Config list helper functions
 
 ### Start: Transaction code
-def bc_address_to_hash_160(addr):
-    bytes = b58decode(addr, 25)
-    return bytes[1:21]
-
-__b58chars = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
-__b58base = len(__b58chars)
-
-def b58decode(v, length):
-    """ decode v into a string of len bytes
-    """
-    long_value = 0L
-    for (i, c) in enumerate(v[::-1]):
-        long_value += __b58chars.find(c) * (__b58base**i)
-    result = ''
-    while long_value >= 256:
-        div, mod = divmod(long_value, 256)
-        result = chr(mod) + result
-        long_value = div
-    result = chr(long_value) + result
-    nPad = 0
-    for c in v:
-        if c == __b58chars[0]: nPad += 1
-        else: break
-    result = chr(0)*nPad + result
-    if length is not None and len(result) != length:
-        return None
-    return result
-
-def makek():
-    # Create a dictionary with address as key and private-key
-    # as value
-    a = configListGet('HoldingAddresses','addresses')
-    p = configListGet('HoldingAddresses','private_keys')
-    k = {}
-    for a in zip(a,p):
-        k[a[0]] = a[1]
-    return k
+keyring = None
+
+def get_keyring():
+    # The private keys of our holding addresses, loaded once
+    global keyring
+    if keyring is None:
+        keyring = signer.KeyRing(state.private_keys().values())
+    return keyring
+
+fee_pool = None
+
+def get_fee_pool():
+    # The wallet's uncolored outputs, for paying fees, loaded once
+    global fee_pool
+    if fee_pool is None:
+        fee_pool = FeePool(sp, lambda outpoint: get_holdings_index().is_colored(outpoint))
+    return fee_pool
 
 def maketx(inputs, outputs, send=False):
     # Create a transaction, sign it - possibly send it - but
     # in either case return the raw hex
     # inputs: [('a7813e20045b2f2caf612c589adc7e985029167106a300b6a7157084c26967f5', 1, '1PPgZP53BrcG7hyXdWT9fugewmxL1H8LS3'),...]
     # outputs: [('1KRavVCsvaLi7ZzktHSCE3hPUvhPDhQKhz', 8000000),...]
-    ip = []
-    for txid,vout,_ in inputs:
-        ip.append({"txid": txid, "vout": vout})
-    op = {}
-    for addr,amnt in outputs:
-        op[addr] = AmountToJSON(amnt)
-    tx = sp.createrawtransaction(ip,op)
-    k = makek()
-    ip = []
-    pkeys = []
-    for txid,vout,addr in inputs:
-        ip.append({"txid": txid, "vout": vout, "scriptPubKey": '76a914'+bc_address_to_hash_160(addr).encode('hex')+'88ac'})
-        if addr in k:
-            pkeys.append(k[addr])
-        else:
-            pkeys.append(sp.dumpprivkey(addr))
-    final_t = sp.signrawtransaction(tx,ip,pkeys)
+    k = get_keyring()
+    for _,_,addr in inputs:
+        if addr not in k:
+            k.add(sp.dumpprivkey(addr))
+    tx = signer.sign_tx(inputs, outputs, k)
     if send:
         sp.sendrawtransaction(tx)
     else:
-        print final_t['hex']
-    return final_t['hex']
+        print tx
+    return tx
 
 ### End: Transaction code
 
 ### Start: Blockchain Inspection/Traversion code
 def translate_bctx_to_bitcoindtx(tx_bc):
+    return bctx_to_bitcoindtx(tx_bc, bcinfo.prevout_txids(tx_bc))
+
+def bctx_to_bitcoindtx(tx_bc, prevout_txids):
+    # Build a bitcoind-style transaction from a blockchain.info one,
+    # given the txids its inputs spend from
     tx = {}
     tx['locktime'] = 0
     tx['txid'] = tx_bc['hash']
     tx['version'] = tx_bc['ver']
     tx['vin'] = []
     tx['vout'] = []
-    for i in tx_bc['inputs']:
+    for i,prevout_txid in zip(tx_bc['inputs'], prevout_txids):
         v = {}
         v['scriptSig'] = {'asm': '', 'hex': ''}
         v['sequence'] = 4294967295
-        v['txid'] = jsonrpc.loads(urllib2.urlopen("http://blockchain.info/rawtx/%s" % (i['prev_out']['tx_index'],)).read())['hash']
+        v['txid'] = prevout_txid
         v['vout'] = i['prev_out']['n']
         tx['vin'].append(v)
     for i in range(len(tx_bc['out'])):
@@ -204,28 +244,68 @@ def translate_bctx_to_bitcoindtx(tx_bc):
         tx['vout'].append(v)
     return tx
 
+# Failures to get an answer from bitcoind, as opposed to answers that
+# turn out to be wrong
+RPCErrors = (jsonrpc.JSONRPCException, jsonrpc.HTTPError, httplib.HTTPException, socket.error)
+
 def gettx(txid):
+    # Get the information of a single transaction, from the
+    # transaction store if it has been seen before
+    return txstore.fetch(txid, fetchtx)
+
+def fetchtx(txid):
     # Get the information of a single transaction, using
-    # the bitcoind API
+    # the bitcoind API and decoding it locally
     try:
         tx_raw = sp.getrawtransaction(txid)
-        tx = sp.decoderawtransaction(tx_raw)
-    except:
+    except RPCErrors:
         print "Error getting transaction "+txid+" details from bitcoind, trying blockchain.info"
-        print "http://blockchain.info/rawtx/%s" % (txid,)
-        tx_bc = jsonrpc.loads(urllib2.urlopen("http://blockchain.info/rawtx/%s" % (txid,)).read())
-        tx = translate_bctx_to_bitcoindtx(tx_bc)
-    return tx
-
+        tx_bc = bcinfo.rawtx(txid)
+        return translate_bctx_to_bitcoindtx(tx_bc)
+    return decode_tx(tx_raw)
+
+def gettxs(txids):
+    # Get the information of several transactions at once. Those
+    # not in the transaction store are fetched with one batched
+    # getrawtransaction call.
+    txs = {}
+    missing = []
+    for txid in txids:
+        if txid in txs: continue
+        txs[txid] = txstore.get(txid)
+        if txs[txid] is None:
+            missing.append(txid)
+    if missing:
+        try:
+            results = sp.batch([("getrawtransaction", t) for t in missing])
+        except RPCErrors:
+            results = []
+        for txid,(tx_raw,err) in zip(missing, results):
+            if err is None:
+                txs[txid] = decode_tx(tx_raw)
+                txstore.put(txid, txs[txid])
+        # Anything bitcoind could not provide goes through the
+        # one-at-a-time path, which falls back to blockchain.info
+        for txid in missing:
+            if txs[txid] is None:
+                txs[txid] = gettx(txid)
+    return [txs[txid] for txid in txids]
+
+addresstxs_memo = None
 def getaddresstxs(address):
     # Get all transactions associated with an address.
     # Uses blockchain.info to get this, bitcoind API
     # apparently has no equivalent function.
-    address_url="http://blockchain.info/address/"+address+"?format=json"
-    address_info = jsonrpc.loads(urllib2.urlopen(address_url).read())
+    # While addresstxs_memo is a dictionary, each address
+    # is only looked up once.
+    if addresstxs_memo is not None and address in addresstxs_memo:
+        return addresstxs_memo[address]
+    address_info = bcinfo.address(address)
     tx_list = []
     for tx in address_info['txs']:
         tx_list.append(tx['hash'])
+    if addresstxs_memo is not None:
+        addresstxs_memo[address] = tx_list
     return tx_list
 
 def getholderschange(txid):
@@ -236,17 +316,42 @@ def getholderschange(txid):
     new_holders = []
     old_holders = []
     for i in tx['vin']:
-        old_holders.append(i['txid']+":"+str(i['vout']))
+        if 'txid' in i:
+            old_holders.append(i['txid']+":"+str(i['vout']))
     for o in tx['vout']:
         new_holders.append((o['scriptPubKey']['addresses'][0], o['value']))
     return new_holders, old_holders
 
+def index_progress(height, tip):
+    if height % 1000 == 0 or height == tip:
+        print "Indexed block %d of %d" % (height, tip)
+
+def update_chain_index():
+    # Bring the chain index up to bitcoind's tip, rolling back
+    # any blocks a reorg has replaced
+    start = int(configGetDefault('bitcoind', 'chainindex_start', '0'))
+    return chainindex.sync(sp, start, index_progress)
+
+def import_block_files(blocksdir):
+    # Build the chain index from bitcoind's block files, which
+    # is much faster than fetching every block over RPC
+    start = int(configGetDefault('bitcoind', 'chainindex_start', '0'))
+    return blkfile.ingest(chainindex, blocksdir, start_height=start, progress=index_progress)
+
+def index_covers(tx_out):
+    # The chain index only knows every spend of an output it saw created;
+    # older outputs (before chainindex_start) or newer ones (past the
+    # indexed tip) need the address history instead
+    return chainindex is not None and chainindex.output(tx_out) is not None
+
 def spentby(tx_out):
     # Return the id of the transaction which spent the given txid/#
     # if single_input is true, it only returns if the tx_out was used as a single
     # input to the transaction.
     # This is because it is not possible to follow a colored coin across a transaction
     # with multiple inputs
+    if index_covers(tx_out):
+        return chainindex.spentby(tx_out)
     tid = tx_out.split(":")
     tx = gettx(tid[0])
     address = tx['vout'][int(tid[1])]['scriptPubKey']['addresses'][0]
@@ -259,75 +364,130 @@ def spentby(tx_out):
     return None
 
 def match_outputs_to_inputs(input_values, output_values):
-    output_belongs_to_input = [-1]*len(output_values)
-    current_color_number = -1
-    current_color_total = 0.0
-    current_color_max = -1
-    for i in range(len(output_values)):
-        output_value = output_values[i]
-        while current_color_total+output_value > current_color_max:
-            current_color_number += 1
-            current_color_total = 0.0
-            if current_color_number >= len(input_values): return output_belongs_to_input
-            current_color_max = input_values[current_color_number]
-        output_belongs_to_input[i] = current_color_number
-        current_color_total += output_value
-    return output_belongs_to_input
+    # Color the outputs by the ordering-based rule, on exact
+    # satoshi amounts (see coloring.py)
+    return coloring.color([JSONtoAmount(v) for v in input_values],
+                          [JSONtoAmount(v) for v in output_values])
+
+def getprevoutvalues(vin):
+    # Get the values of the outputs spent by a transaction's inputs,
+    # from the chain index where it has them and from the previous
+    # transactions otherwise
+    values = [None]*len(vin)
+    if chainindex is not None:
+        for n in range(len(vin)):
+            o = chainindex.output(vin[n]['txid']+":"+str(vin[n]['vout']))
+            if o is not None:
+                values[n] = AmountToJSON(o[0])
+    missing = [n for n in range(len(vin)) if values[n] is None]
+    for n,tx in zip(missing, gettxs([vin[n]['txid'] for n in missing])):
+        values[n] = tx['vout'][vin[n]['vout']]['value']
+    return values
 
 def get_relevant_outputs(tx_data,prevout_txid):
-    global lost_track
+    return color_outputs(tx_data, prevout_txid, getprevoutvalues(tx_data['vin']))
+
+def color_outputs(tx_data, prevout_txid, prevout_values):
+    # Given the values of a transaction's inputs, return the outputs
+    # that carry on the color of the input spending prevout_txid
     relevant_outputs = []
-    input_values = []
     output_values = []
-    input_colors = [-1]*len(tx_data['vin'])
+    color = -1
     for pon in range(len(tx_data['vin'])):
         po = tx_data['vin'][pon]
-        p_tid = po['txid']+":"+str(po['vout'])
-        if p_tid == prevout_txid:
-            input_colors[pon] = 0
-        po_data = gettx(po['txid'])
-        input_values.append(po_data['vout'][po['vout']]['value'])
-    for pon in range(len(tx_data['vin'])):
-        p_tid = po['txid']+":"+str(po['vout'])
-        if p_tid in lost_track:
-            po_data = gettx(po['txid'])
-            input_values[input_colors.index(0)] += po_data['vout'][po['vout']]['value']
-            input_values[pon] = 0
-            lost_track.remove(p_tid)
+        if 'txid' in po and po['txid']+":"+str(po['vout']) == prevout_txid:
+            color = pon
+            break
+    if color < 0:
+        return relevant_outputs
     for o in tx_data['vout']:
         output_values.append(o['value'])
-    output_colors = match_outputs_to_inputs(input_values, output_values)
+    output_colors = match_outputs_to_inputs(prevout_values, output_values)
     for o in range(len(output_colors)):
-        if output_colors[o] == 0:
+        if output_colors[o] == color:
             relevant_outputs.append(tx_data['txid']+":"+str(o))
     return relevant_outputs
 
-def rec(prevout_txid, root_tx):
-    holder_list = []
-    spent_by = spentby(prevout_txid)
-    txid,n = prevout_txid.split(":")
-    if spent_by is None:
-        tx_data = gettx(txid)
-        o = tx_data['vout'][int(n)]
-        holder_list.append((o['scriptPubKey']['addresses'][0],o['value'],prevout_txid))
-        return holder_list
-    tx_data = gettx(spent_by)
-    relevant_outputs = get_relevant_outputs(tx_data,prevout_txid)
-    if len(relevant_outputs) == 0:
-        lost_track.append(spent_by)
-    for ro in relevant_outputs:
-        hl = rec(ro,root_tx)
-        for h in hl:
-            holder_list.append(h)
-    return holder_list
-
-lost_track = []
-def get_current_holders(root_tx_out):
+class Prefetcher(object):
+    # Expands the branches of a trace ahead of the trace itself on a
+    # pool of worker threads. Only the spender of each output is handed
+    # back; the transactions fetched along the way land in the
+    # transaction store, where the (serial) trace then finds them, so
+    # the result is exactly that of a serial trace.
+    def __init__(self, jobs):
+        self.pool = ThreadPool(jobs)
+        self.pending = {}
+
+    def submit(self, prevout_txid):
+        if prevout_txid not in self.pending:
+            self.pending[prevout_txid] = self.pool.apply_async(self.expand, (prevout_txid,))
+
+    def expand(self, prevout_txid):
+        spent_by = spentby(prevout_txid)
+        try:
+            if spent_by is None:
+                gettx(prevout_txid.split(":")[0])
+                return spent_by
+            for ro in get_relevant_outputs(gettx(spent_by), prevout_txid):
+                self.submit(ro)
+        except:
+            # Whatever went wrong will be met again by the trace itself
+            pass
+        return spent_by
+
+    def spentby(self, prevout_txid):
+        result = self.pending.pop(prevout_txid, None)
+        if result is None:
+            return spentby(prevout_txid)
+        return result.get()
+
+    def close(self):
+        self.pool.terminate()
+
+def iter_current_holders(root_tx_out, jobs=1):
+    # Yield the current holders of the "colored coin" with the given
+    # root (a string with txid+":"+n_output) as (address, value, txid:n)
+    # in the order a depth-first trace reaches them. Outputs still to be
+    # followed are kept on an explicit stack, so memory grows with the
+    # frontier of the trace rather than the length of its history.
+    # With jobs > 1, independent branches are fetched concurrently.
+    return iter_holders_from([root_tx_out], jobs)
+
+def iter_holders_from(frontier, jobs=1):
+    # Like iter_current_holders, but resumes a trace from a list of
+    # outputs known to have held the coin, such as the holders found by
+    # an earlier trace, so only what happened since is followed
+    stack = list(reversed(frontier))
+    prefetch = None
+    if jobs > 1:
+        prefetch = Prefetcher(jobs)
+        for tx_out in frontier:
+            prefetch.submit(tx_out)
+    try:
+        while stack:
+            prevout_txid = stack.pop()
+            if prefetch is not None:
+                spent_by = prefetch.spentby(prevout_txid)
+            else:
+                spent_by = spentby(prevout_txid)
+            if spent_by is None:
+                txid,n = prevout_txid.split(":")
+                o = gettx(txid)['vout'][int(n)]
+                yield (o['scriptPubKey']['addresses'][0],o['value'],prevout_txid)
+                continue
+            relevant_outputs = get_relevant_outputs(gettx(spent_by),prevout_txid)
+            stack.extend(reversed(relevant_outputs))
+            if prefetch is not None:
+                for ro in relevant_outputs:
+                    prefetch.submit(ro)
+    finally:
+        if prefetch is not None:
+            prefetch.close()
+
+def get_current_holders(root_tx_out, jobs=1):
     # Get the current holders of the "colored coin" with
     # the given root (a string with txid+":"+n_output)
-    global lost_track
-    lost_track = []
-    return rec(root_tx_out,root_tx_out)
+    return list(iter_current_holders(root_tx_out, jobs))
 
 def get_unspent(addr):
     # Get the unspent transactions for an address
@@ -337,131 +497,252 @@ def get_unspent(addr):
     #return d['unspent_outputs']
     # * Start of blockchain.info bug workaround:
     txs = getaddresstxs(addr)
-    received = []
-    sent = []
-    for txid in txs:
-        tx = gettx(txid)
+    return unspent_outputs(addr, txs, gettxs(txs))
+    # * End of blockchain.info bug workaround
+
+def unspent_outputs(addr, txids, txs):
+    # Return the outputs paying to addr in the given transactions
+    # that none of them spends, in blockchain.info's unspent format.
+    # The history of an address holds every transaction spending
+    # from it, so the previous transactions are not needed.
+    spent = set()
+    for tx in txs:
         for i in tx['vin']:
-            prev_out = gettx(i['txid'])
-            for po in prev_out['vout']:
-                n = po['n']
-                po = po['scriptPubKey']
-                if po['type'] == 'pubkeyhash':
-                    if po['addresses'][0] == addr:
-                        sent.append(i['txid']+":"+str(n))
-        for o in tx['vout']:
-            n = o['n']
-            o = o['scriptPubKey']
-            if o['type'] == 'pubkeyhash':
-                if o['addresses'][0] == addr:
-                    received.append(txid+":"+str(n))
+            if 'txid' in i:
+                spent.add(i['txid']+":"+str(i['vout']))
     unspent = []
-    for r in received:
-        if r not in sent:
-            d = {}
-            txid,n = r.split(":")
-            d['tx_hash'] = txid
-            d['tx_output_n'] = int(n)
-            d['value'] = int(1e8*gettx(txid)['vout'][int(n)]['value'])
-            unspent.append(d)
+    for txid,tx in zip(txids, txs):
+        for o in tx['vout']:
+            spk = o['scriptPubKey']
+            if spk['type'] == 'pubkeyhash' and spk['addresses'][0] == addr:
+                outpoint = txid+":"+str(o['n'])
+                if outpoint not in spent:
+                    # Seen once is enough
+                    spent.add(outpoint)
+                    unspent.append({'tx_hash': txid, 'tx_output_n': o['n'],
+                                    'value': JSONtoAmount(o['value'])})
     return unspent
-    # * End of blockchain.info bug workaround
+
+holdings_index = None
+def get_holdings_index():
+    # The holdings of every asset in memory, built once per run
+    # and rebuilt after an update changes them
+    global holdings_index
+    if holdings_index is None:
+        holdings_index = state.index()
+    return holdings_index
 
 def get_non_asset_funds(addr):
     unspent = get_unspent(addr)
-    asset_txids = []
-    for s in config.sections():
-        if s in reserved_sections: continue
-        for txid in configListGet(s,'txid'):
-            asset_txids.append(txid)
+    index = get_holdings_index()
     naf = []
     for u in unspent:
         txid = u['tx_hash']+":"+str(u['tx_output_n'])
-        if not txid in asset_txids:
+        if not index.is_colored(txid):
             naf.append(u)
     return naf
 
 ### End: Blockchain Inspection/Traversion code
 
+### Start: Asynchronous Blockchain Inspection code
+# Coroutine versions of the lookups above, for running several traces
+# on one asyncore event loop. Wait on them with "yield" from another
+# coroutine, or with jsonrpc.run():
+#
+#   holders = jsonrpc.run([async_get_current_holders(r) for r in roots])
+#
+# They share the transaction store, the chain index, and blockchain.info's
+# cache and rate limit with the blocking versions.
+asp = None
+ahttp = None
+
+def async_translate_bctx_to_bitcoindtx(tx_bc):
+    # Only the tx_indexes bcinfo has not seen are fetched
+    tx_indexes = [i['prev_out']['tx_index'] for i in tx_bc['inputs']]
+    known = bcinfo.known(tx_indexes)
+    missing = list(set(t for t in tx_indexes if t not in known))
+    prevs = yield [bcinfo.async_rawtx(ahttp, t) for t in missing]
+    for t,p in zip(missing, prevs):
+        known[t] = p['hash']
+    raise jsonrpc.Return(bctx_to_bitcoindtx(tx_bc, [known[t] for t in tx_indexes]))
+
+def async_gettx(txid):
+    tx = txstore.get(txid)
+    if tx is None:
+        try:
+            tx_raw = yield asp.getrawtransaction(txid)
+        except RPCErrors:
+            print "Error getting transaction "+txid+" details from bitcoind, trying blockchain.info"
+            tx_bc = yield bcinfo.async_rawtx(ahttp, txid)
+            tx = yield async_translate_bctx_to_bitcoindtx(tx_bc)
+        else:
+            tx = decode_tx(tx_raw)
+        txstore.put(txid, tx)
+    raise jsonrpc.Return(tx)
+
+def async_gettxs(txids):
+    # See gettxs
+    txs = {}
+    missing = []
+    for txid in txids:
+        if txid in txs: continue
+        txs[txid] = txstore.get(txid)
+        if txs[txid] is None:
+            missing.append(txid)
+    if missing:
+        try:
+            results = yield asp.batch([("getrawtransaction", t) for t in missing])
+        except RPCErrors:
+            results = []
+        for txid,(tx_raw,err) in zip(missing, results):
+            if err is None:
+                txs[txid] = decode_tx(tx_raw)
+                txstore.put(txid, txs[txid])
+        missing = [txid for txid in missing if txs[txid] is None]
+        for txid,tx in zip(missing, (yield [async_gettx(txid) for txid in missing])):
+            txs[txid] = tx
+    raise jsonrpc.Return([txs[txid] for txid in txids])
+
+def async_getaddresstxs(address):
+    address_info = yield bcinfo.async_address(ahttp, address)
+    raise jsonrpc.Return([tx['hash'] for tx in address_info['txs']])
+
+def async_spentby(tx_out):
+    if index_covers(tx_out):
+        raise jsonrpc.Return(chainindex.spentby(tx_out))
+    tid = tx_out.split(":")
+    tx = yield async_gettx(tid[0])
+    address = tx['vout'][int(tid[1])]['scriptPubKey']['addresses'][0]
+    tx_list = yield async_getaddresstxs(address)
+    for t,tx in zip(tx_list, (yield async_gettxs(tx_list))):
+        for i in tx['vin']:
+            if 'txid' in i and i['txid']+":"+str(i['vout']) == tx_out:
+                raise jsonrpc.Return(t)
+    raise jsonrpc.Return(None)
+
+def async_getprevoutvalues(vin):
+    values = [None]*len(vin)
+    if chainindex is not None:
+        for n in range(len(vin)):
+            o = chainindex.output(vin[n]['txid']+":"+str(vin[n]['vout']))
+            if o is not None:
+                values[n] = AmountToJSON(o[0])
+    missing = [n for n in range(len(vin)) if values[n] is None]
+    for n,tx in zip(missing, (yield async_gettxs([vin[n]['txid'] for n in missing]))):
+        values[n] = tx['vout'][vin[n]['vout']]['value']
+    raise jsonrpc.Return(values)
+
+def async_get_current_holders(root_tx_out):
+    # See iter_current_holders
+    holders = []
+    stack = [root_tx_out]
+    while stack:
+        prevout_txid = stack.pop()
+        spent_by = yield async_spentby(prevout_txid)
+        if spent_by is None:
+            txid,n = prevout_txid.split(":")
+            o = (yield async_gettx(txid))['vout'][int(n)]
+            holders.append((o['scriptPubKey']['addresses'][0],o['value'],prevout_txid))
+            continue
+        tx_data = yield async_gettx(spent_by)
+        input_values = yield async_getprevoutvalues(tx_data['vin'])
+        relevant_outputs = color_outputs(tx_data, prevout_txid, input_values)
+        stack.extend(reversed(relevant_outputs))
+    raise jsonrpc.Return(holders)
+
+def async_get_unspent(addr):
+    # See get_unspent
+    txs = yield async_getaddresstxs(addr)
+    raise jsonrpc.Return(unspent_outputs(addr, txs, (yield async_gettxs(txs))))
+### End: Asynchronous Blockchain Inspection code
+
+
 ### Start: "User-facing" methods
 def generate_holding_address():
-    # Generate an address, add it to the config file
+    # Generate an address, add it to the state store
     addr=sp.getnewaddress()
     pkey=sp.dumpprivkey(addr)
-    configListAppendValue("HoldingAddresses", "addresses", addr)
-    configListAppendValue("HoldingAddresses", "private_keys", pkey)
-    config.write(open(config_file,'w'))
+    state.add_holding_address(addr, pkey)
+    if keyring is not None:
+        keyring.add(pkey)
     return "Address added: "+addr
 
-def update_tracked_coins(assetname):
+def update_tracked_coins(assetname, jobs=1, full=False, sync_index=True):
     # Update the list of owners of a tracked coin
-    # and write to the config file
-    root_tx = configListGet(assetname, "root_tx")[0]
-    current_holders = get_current_holders(root_tx)
-    holding_addresses = []
-    holding_amounts = []
-    holding_txids = []
-    total = 0.0
-    for h in current_holders:
-        holding_addresses.append(h[0])
-        holding_amounts.append(str(h[1]))
-        holding_txids.append(h[2])
-    configListSet(assetname, "holders", holding_addresses)
-    configListSet(assetname, "amounts", holding_amounts)
-    configListSet(assetname, "txid", holding_txids)
-    config.write(open(config_file,'w'))
-
-def start_tracking_coins(assetname,txid_n):
+    # in the state store. Unless a full retrace
+    # is asked for, the trace picks up from the holders
+    # found by the last update.
+    global holdings_index
+    root_tx = state.root_tx(assetname)
+    frontier = [h[2] for h in state.holdings(assetname)]
+    if chainindex is not None and sync_index:
+        update_chain_index()
+    if full or len(frontier) == 0:
+        current_holders = get_current_holders(root_tx, jobs)
+    else:
+        current_holders = list(iter_holders_from(frontier, jobs))
+    state.set_holdings(assetname, [(a, JSONtoAmount(v), o) for a,v,o in current_holders])
+    holdings_index = None
+
+def update_all_tracked_coins(jobs=1, full=False):
+    # Update every tracked coin in one pass. The chain index
+    # is brought up to date once, and the transactions and
+    # address histories fetched for one coin are reused for
+    # the others, as coins often share funding and fee
+    # transactions.
+    global addresstxs_memo
+    if chainindex is not None:
+        update_chain_index()
+    addresstxs_memo = {}
+    try:
+        for assetname in state.assets():
+            start = time.time()
+            update_tracked_coins(assetname, jobs, full, sync_index=False)
+            print "Updated %s: %d holders in %.2fs" % (assetname, len(state.holdings(assetname)), time.time()-start)
+    finally:
+        addresstxs_memo = None
+
+def start_tracking_coins(assetname,txid_n,jobs=1):
     # Give a name of a tracked coin, together with a
     # root output that will be used to track it.
-    # Write this to the config file, and update the
+    # Write this to the state store, and update the
     # list of owners.
-    if assetname in config.sections():
+    if state.has_asset(assetname):
         return assetname+" already exists."
-    config.add_section(assetname)
-    configListSet(assetname, "root_tx", [txid_n])
-    configListSet(assetname, "holders", [])
-    configListSet(assetname, "amounts", [])
-    configListSet(assetname, "txid", [])
-    config.write(open(config_file,'w'))
-    update_tracked_coins(assetname)
+    state.add_asset(assetname, txid_n)
+    update_tracked_coins(assetname, jobs, full=True)
 
 def show_holders(assetname):
-    holders = configListGet(assetname, "holders")
-    amounts = configListGet(assetname, "amounts")
-    txids = configListGet(assetname,"txid")
-    total = 0.0
+    total = 0
     print "*** %s ***" % (assetname,)
-    for h in zip(holders,amounts,txids):
-        print h[0],h[1],h[2]
-        total += float(h[1])
-    print "** Total %s: %f **" % (assetname,total)
+    for h in state.holdings(assetname):
+        print h[0],AmountToJSON(h[1]),h[2]
+        total += h[1]
+    print "** Total %s: %f **" % (assetname,AmountToJSON(total))
 
 def show_my_holdings():
-    sections = config.sections()
-    my_holding_addresses = configListGet('HoldingAddresses', 'addresses')
-    for s in sections:
-        if s in reserved_sections: continue
-        holders = configListGet(s, "holders")
-        amounts = configListGet(s, "amounts")
-        txids = configListGet(s, "txid")
-        for h in holders:
-            if h in my_holding_addresses:
-                total_dividends = 0.0
-                for naf in get_non_asset_funds(h):
-                    total_dividends += float(naf['value'])/1e8
-                print s,amounts[holders.index(h)],"( div:",total_dividends,")",h,txids[holders.index(h)]
+    dividends = {}
+    for s,h,amount,txid in get_holdings_index().holdings_of(state.holding_addresses()):
+        if h not in dividends:
+            total_dividends = 0.0
+            for naf in get_non_asset_funds(h):
+                total_dividends += float(naf['value'])/1e8
+            dividends[h] = total_dividends
+        print s,AmountToJSON(amount),"( div:",dividends[h],")",h,txid
 
 def show_my_holding_addresses():
-    my_holding_addresses = configListGet('HoldingAddresses', 'addresses')
-    for a in my_holding_addresses:
+    for a in state.holding_addresses():
         print a
 
+def show_cache_stats():
+    stats = txstore.stats()
+    stats.update(bcinfo.stats())
+    for k in sorted(stats.keys()):
+        print k,stats[k]
+
 def show_colors():
-    sections = config.sections()
-    for s in sections:
-        if s in reserved_sections: continue
-        print s,config.get(s, 'root_tx')[0]
+    for s in state.assets():
+        print s,state.root_tx(s)
 
 def transfer_asset(sender, receivers,fee_size=None):
     address,txid,n = sender.split(":")
@@ -470,42 +751,156 @@ def transfer_asset(sender, receivers,fee_size=None):
     for l in receivers.split(","):
         address,amount = l.split(":")
         tx_outputs.append((address,int(float(amount)*1e8)))
+    fee_p_out = None
     if fee_size:
-        fee_p_out = sp.listunspent()[0]
-        in_addr = base58_check_encode(binascii.unhexlify(fee_p_out['scriptPubKey'][6:-4]))
+        fee = JSONtoAmount(fee_size)
+        fee_p_out = get_fee_pool().reserve(fee)
+        if fee_p_out is None:
+            print "No uncolored output in the wallet can pay a fee of",fee_size
+            return
         change_address = config.get("bitcoind","change_address")
-        change_amount = fee_p_out['amount']-fee_size
-        tx_input.append((fee_p_out['txid'],fee_p_out['vout'],in_addr))
-        tx_outputs.append((change_address, int(1e8*change_amount)))
-    raw_transaction = maketx(tx_input, tx_outputs)
-
-def pay_to_shareholders(assetname, wallet_acct, total_payment_amount):
-    holders = configListGet(assetname, "holders")
-    amounts = configListGet(assetname, "amounts")
-    total = 0.0
-    for a in amounts:
-        total += float(a)
-    payouts = {}
-    for h,a in zip(holders,amounts):
-        d = total_payment_amount*float(a)/total
-        payouts[h] = d
-    sp.sendmany(wallet_acct,payouts)
-    print "Payouts made:"
-    for k in payouts.keys():
-        print k,":",payouts[k]
-
-def transfer_others(transfer_other_from,transfer_other_to):
-    naf = get_non_asset_funds(transfer_other_from)
-    fee = int(1e8*0.005)
-    total_value = 0
-    inputs = []
-    for u in naf:
-        total_value += u['value']
-        i = (u['tx_hash'], u['tx_output_n'], transfer_other_from)
-        inputs.append(i)
-    outputs = [(transfer_other_to, total_value-fee)]
-    maketx(inputs,outputs,send=False)
-    print "Paid",float(total_value-fee)/1e8,"to",transfer_other_to
+        tx_input.append(fee_p_out[:3])
+        if fee_p_out[3]-fee >= payout.DustLimit:
+            tx_outputs.append((change_address, fee_p_out[3]-fee))
+    try:
+        raw_transaction = maketx(tx_input, tx_outputs)
+    except:
+        if fee_p_out is not None:
+            fee_pool.release(fee_p_out)
+        raise
+    if fee_p_out is not None:
+        fee_pool.spent(fee_p_out)
+
+def bulk_transfer(path, fee_size=None, broadcast=False):
+    # Make the asset transfers listed in a file (see bulk.py), in as
+    # few transactions as fit. With a fee, each transaction takes one
+    # of the wallet's uncolored outputs from the fee pool and pays
+    # fee_size per 1000 bytes from it. Transactions are printed, or broadcast.
+    start = time.time()
+    groups = bulk.group(bulk.read_transfers(path))
+    sources = groups.keys()
+    values = {}
+    for (txid,n,addr),tx in zip(sources, gettxs([txid for txid,n,addr in sources])):
+        values[(txid,n,addr)] = JSONtoAmount(tx['vout'][n]['value'])
+    reserve = fee_size and bulk.InputSize + payout.output_size(config.get("bitcoind","change_address")) or 0
+    txs = bulk.plan(groups, values, reserve=reserve)
+    fees = [None]*len(txs)
+    try:
+        if fee_size:
+            pool = get_fee_pool()
+            change_address = config.get("bitcoind","change_address")
+            for n,(inputs,outputs) in enumerate(txs):
+                fee = JSONtoAmount(fee_size) * ((bulk.tx_size(inputs, outputs) + reserve + 999) // 1000)
+                fees[n] = pool.reserve(fee)
+                if fees[n] is None:
+                    raise bulk.TransferError("No uncolored output left in the wallet to pay a fee of %s" % (AmountToJSON(fee),))
+                inputs.append(fees[n][:3])
+                if fees[n][3] - fee >= payout.DustLimit:
+                    outputs.append((change_address, fees[n][3] - fee))
+        k = get_keyring()
+        missing = []
+        for inputs,outputs in txs:
+            for txid,n,addr in inputs:
+                if addr not in k and addr not in missing:
+                    missing.append(addr)
+        for addr,(pkey,err) in zip(missing, sp.batch([("dumpprivkey", a) for a in missing])):
+            if err is not None:
+                raise bulk.TransferError("No private key for %s: %s" % (addr, err))
+            k.add(pkey)
+        raw = [signer.sign_tx(inputs, outputs, k) for inputs,outputs in txs]
+    except:
+        for u in fees:
+            if u is not None:
+                fee_pool.release(u)
+        raise
+    if broadcast:
+        for n,(txid,err) in enumerate(sp.batch([("sendrawtransaction", r) for r in raw])):
+            if err is not None:
+                print "Transaction %d failed: %s" % (n+1, err)
+                if fees[n] is not None:
+                    fee_pool.release(fees[n])
+            else:
+                print "Transaction %d: %s" % (n+1, txid)
+                if fees[n] is not None:
+                    fee_pool.spent(fees[n])
+    else:
+        for r,u in zip(raw, fees):
+            print r
+            if u is not None:
+                fee_pool.spent(u)
+    elapsed = time.time() - start
+    transfers = sum(len(t) for t in groups.values())
+    print "%d transfers from %d outpoints in %d transactions, %.2fs (%.1f transfers/s)" % (
+        transfers, len(groups), len(txs), elapsed, transfers / max(elapsed, 1e-6))
+
+def pay_to_shareholders(assetname, wallet_acct, total_payment_amount, dry_run=False):
+    # Pay total_payment_amount from the wallet account to the holders of
+    # an asset, in proportion to their holdings (see payout.py)
+    holdings = state.holdings(assetname)
+    payouts, dust = payout.plan(JSONtoAmount(total_payment_amount), holdings)
+    txs = payout.batches(payouts)
+    print "Payouts to %d addresses in %d transactions:" % (len(payouts), len(txs))
+    for n,b in enumerate(txs):
+        print "  Transaction %d: %d outputs, %s BTC" % (n+1, len(b), AmountToJSON(sum(v for a,v in b)))
+    if len(dust) > 0:
+        print "Left out as dust:", ", ".join(dust)
+    if dry_run:
+        for a,v in payouts:
+            print a,":",AmountToJSON(v)
+        return
+    for n,(txid,err) in enumerate(payout.send(sp, wallet_acct, txs)):
+        if err is not None:
+            print "  Transaction %d failed: %s" % (n+1, err)
+        else:
+            print "  Transaction %d: %s" % (n+1, txid)
+
+def non_asset_utxos(addr):
+    # Yield the uncolored outputs of an address as (txid, n, address,
+    # satoshis), streamed from the chain index when it covers the
+    # whole chain, or else from the address history
+    index = get_holdings_index()
+    if chainindex is not None and chainindex.base == 0:
+        update_chain_index()
+        for outpoint,value in chainindex.unspent(addr):
+            if not index.is_colored(outpoint):
+                txid,n = outpoint.split(":")
+                yield (txid, int(n), addr, value)
+    else:
+        for u in get_non_asset_funds(addr):
+            yield (u['tx_hash'], u['tx_output_n'], addr, u['value'])
+
+def transfer_others(transfer_other_from,transfer_other_to,fee_size=None,broadcast=False,per_batch=20):
+    # Sweep the bitcoins unrelated to any painted coin from an address,
+    # in transactions of bounded size paying fee_size per 1000 bytes
+    # (see consolidate.py). They are signed and printed, or broadcast,
+    # per_batch at a time.
+    fee_per_kb = JSONtoAmount(fee_size or DefaultFeePerKB)
+    k = get_keyring()
+    if transfer_other_from not in k:
+        k.add(sp.dumpprivkey(transfer_other_from))
+    txs = consolidate.plan(non_asset_utxos(transfer_other_from), transfer_other_to, fee_per_kb)
+    count, swept, paid = 0, 0, 0
+    while True:
+        planned = list(itertools.islice(txs, per_batch))
+        if len(planned) == 0:
+            break
+        raw = [signer.sign_tx(inputs, [(transfer_other_to, value)], k) for inputs,value,fee in planned]
+        if broadcast:
+            results = sp.batch([("sendrawtransaction", r) for r in raw])
+        else:
+            results = [(None, None)]*len(raw)
+        for (inputs,value,fee),r,(txid,err) in zip(planned, raw, results):
+            count += 1
+            if err is not None:
+                print "Transaction %d (%d inputs) failed: %s" % (count, len(inputs), err)
+                continue
+            if not broadcast:
+                print r
+            print "Transaction %d: swept %d inputs, paid %s (fee %s)%s" % (
+                count, len(inputs), AmountToJSON(value), AmountToJSON(fee), txid and " "+txid or "")
+            swept += len(inputs)
+            paid += value
+    print "Paid",AmountToJSON(paid),"to",transfer_other_to,"from",swept,"inputs in",count,"transactions"
 
 if __name__ == '__main__':
     # Process command-line options
@@ -514,26 +909,46 @@ if __name__ == '__main__':
     parser.add_option('-n', '--new-address', help='Create new holding address for colored coins', dest='gen_address', default=False, action='store_true')
     parser.add_option('-l', '--list-colors', help='List of names of painted coins being tracked', dest='list_colors', default=False, action='store_true')
     parser.add_option('-u', '--update-ownership', help='Update ownership info for painted coins', dest='update_name', action='store')
+    parser.add_option('--update-all', help='Update ownership info for all painted coins', dest='update_all', default=False, action='store_true')
     parser.add_option('-o', '--owners', help='Show owners of painted coins', dest="holders_name", action="store")
     parser.add_option('-m', '--my-holdings', help='Show holdings at my addresses', dest="show_holdings", action="store_true")
     parser.add_option('-a', '--holding-addresses', help='Show my holding addresses', dest="show_addresses", action="store_true")
     parser.add_option('-f', '--transfer-from', help='Asset to transfer to another address. address:txid:n', dest='transfer_from', action="store")
     parser.add_option('-t', '--transfer-to', help='Address to transfer asset to. address:amount,...', dest='transfer_to', action="store")
+    parser.add_option('--transfer-file', help='Make the asset transfers listed in a CSV (from,to,amount) or JSON lines file, with from as address:txid:n. With -w, the fee is per 1000 bytes', dest='transfer_file', action="store")
+    parser.add_option('--broadcast', help='With --transfer-file or -x, broadcast the transactions instead of printing them', dest='broadcast', default=False, action="store_true")
     parser.add_option('-d', '--pay-holders', help="Pay from your bitcoind wallet to asset holders: <asset_name>:<wallet_acctname>:<payout_amount>", dest="pay_to_holders", action="store")
+    parser.add_option('--dry-run', help="With -d, show how the payment would be split without sending it", dest="dry_run", default=False, action="store_true")
     parser.add_option('-w', '--fee', help="Pay a transaction fee from your wallet when transferring an asset: <amount>", dest="fee", action="store")
-    parser.add_option('-x', '--transfer-other-from', help='Transfer bitcoins UNRELATED to the tracked address/coins away from this address', dest="transfer_other_from", action="store")
+    parser.add_option('-x', '--transfer-other-from', help='Transfer bitcoins UNRELATED to the tracked address/coins away from this address. With -w, the fee is per 1000 bytes', dest="transfer_other_from", action="store")
     parser.add_option('-y', '--transfer-other-to', help='Transfer bitcoins UNRELATED to the tracked address/coins to this address', dest="transfer_other_to", action="store")
+    parser.add_option('-j', '--jobs', help='Number of worker threads used when tracing painted coins', dest="jobs", type="int", default=1, action="store")
+    parser.add_option('--full-retrace', help='With -u or --update-all, trace painted coins again from their root instead of from the last known holders', dest="full_retrace", default=False, action="store_true")
+    parser.add_option('-i', '--update-index', help='Bring the chain index up to date', dest="update_index", default=False, action="store_true")
+    parser.add_option('--import-blocks', help="Build the chain index from the blk*.dat files in bitcoind's blocks directory", dest="import_blocks", action="store")
+    parser.add_option('--cache-stats', help='Show transaction store hit/miss counters when done', dest="cache_stats", default=False, action="store_true")
     opts, args = parser.parse_args()
+    setup()
 
+    if opts.import_blocks or opts.update_index:
+        if chainindex is None:
+            print "Set chainindex in the [bitcoind] section to enable the index"
+        else:
+            if opts.import_blocks:
+                import_block_files(opts.import_blocks)
+            if opts.update_index:
+                update_chain_index()
     if opts.gen_address:
         print generate_holding_address()
     if opts.asset_txid_n:
         asset,txid,n = opts.asset_txid_n.split(":")
-        start_tracking_coins(asset,txid+":"+n)
+        start_tracking_coins(asset,txid+":"+n,opts.jobs)
     if opts.holders_name:
         show_holders(opts.holders_name)
     if opts.update_name:
-        update_tracked_coins(opts.update_name)
+        update_tracked_coins(opts.update_name, opts.jobs, opts.full_retrace)
+    if opts.update_all:
+        update_all_tracked_coins(opts.jobs, opts.full_retrace)
     if opts.list_colors:
         show_colors()
     if opts.show_holdings:
@@ -542,7 +957,7 @@ if __name__ == '__main__':
         show_my_holding_addresses()
     if opts.pay_to_holders:
         asset_name, wallet_acct_name, amount = opts.pay_to_holders.split(":")
-        pay_to_shareholders(asset_name, wallet_acct_name, float(amount))
+        pay_to_shareholders(asset_name, wallet_acct_name, float(amount), opts.dry_run)
     if opts.transfer_from or opts.transfer_to:
         if opts.transfer_to and opts.transfer_from:
             if opts.fee:
@@ -551,8 +966,16 @@ if __name__ == '__main__':
                 transfer_asset(opts.transfer_from, opts.transfer_to)
         else:
             print "Make sure you give both a source and destination"
+    if opts.transfer_file:
+        bulk_transfer(opts.transfer_file, opts.fee and float(opts.fee) or None, opts.broadcast)
     if opts.transfer_other_from or opts.transfer_other_to:
         if opts.transfer_other_to and opts.transfer_other_from:
-            transfer_others(opts.transfer_other_from,opts.transfer_other_to)
+            transfer_others(opts.transfer_other_from,opts.transfer_other_to,
+                            opts.fee and float(opts.fee) or None, opts.broadcast)
         else:
             print "Make sure you give both a source and destination"
+    if opts.cache_stats:
+        show_cache_stats()
+    txstore.close()
+    bcinfo.close()
+    state.close()
@@ -0,0 +1,155 @@
+"""
+blkfile.py
+~~~~~~~~~~
+Build the chain index straight from bitcoind's blk*.dat block files,
+for the initial build that takes far too long through getblock.
+
+Each file is memory-mapped and its blocks are parsed in place. Files
+hold blocks in the order they arrived, including blocks that lost a
+race, so the headers are read first to find the chain with the most
+work from the genesis block, and that chain is then indexed in height
+order. Run it against a stopped node, or one whose newest file is not
+being written to, and let ChainIndex.sync take over from there.
+
+bitcoind 28.0 and later obfuscate new block files unless started with
+-blocksxor=0; such files cannot be read here.
+"""
+
+import binascii, glob, mmap, os, struct
+from collections import OrderedDict
+from txparser import MainNet, dsha256, parse_tx, read_varint
+
+MainMagic = '\xf9\xbe\xb4\xd9'
+TestMagic = '\x0b\x11\x09\x07'
+RegTestMagic = '\xfa\xbf\xb5\xda'
+
+NullHash = '00'*32
+
+class BlockFileError(Exception):
+    pass
+
+class BlockFile(object):
+    def __init__(self, path, magic=MainMagic):
+        self.path = path
+        self.magic = magic
+        f = open(path, 'rb')
+        try:
+            if os.fstat(f.fileno()).st_size > 0:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.data = ''
+        finally:
+            f.close()
+
+    def blocks(self):
+        # Yield the offset and size of each block in the file. Files are
+        # allocated ahead of use, so zeros mark the end of the blocks.
+        data = self.data
+        pos = 0
+        while pos + 8 <= len(data):
+            magic = data[pos:pos+4]
+            if magic != self.magic:
+                if magic == '\0\0\0\0':
+                    break
+                raise BlockFileError("Bad magic at %s:%d" % (self.path, pos))
+            size = struct.unpack_from('<I', data, pos + 4)[0]
+            if pos + 8 + size > len(data):
+                # Still being written
+                break
+            yield pos + 8, size
+            pos += 8 + size
+
+    def header(self, offset):
+        return self.data[offset:offset+80]
+
+    def transactions(self, offset, network=MainNet):
+        count, pos = read_varint(self.data, offset + 80)
+        txs = []
+        for i in xrange(count):
+            tx, pos = parse_tx(self.data, pos, network)
+            txs.append(tx)
+        return txs
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+
+def work(bits):
+    # The expected number of hashes to find a block with target bits
+    exp, mantissa = bits >> 24, bits & 0x7fffff
+    if exp <= 3:
+        target = mantissa >> 8*(3 - exp)
+    else:
+        target = mantissa << 8*(exp - 3)
+    return 2**256 // (target + 1)
+
+def best_chain(headers):
+    # headers maps block hash to (previous hash, bits, ...) in the order
+    # the blocks were found. Returns the hashes of the chain with the
+    # most work from the genesis block, in height order; of chains with
+    # equal work, the one whose tip was found first wins.
+    children = {}
+    seen = {}
+    for n, (h, header) in enumerate(headers.iteritems()):
+        children.setdefault(header[0], []).append(h)
+        seen[h] = n
+    best, best_key = None, None
+    stack = [(h, work(headers[h][1])) for h in children.get(NullHash, [])]
+    while stack:
+        h, w = stack.pop()
+        key = (w, -seen[h])
+        if best_key is None or key > best_key:
+            best, best_key = h, key
+        for c in children.get(h, []):
+            stack.append((c, w + work(headers[c][1])))
+    chain = []
+    while best is not None:
+        chain.append(best)
+        best = headers[best][0]
+        if best == NullHash:
+            best = None
+    chain.reverse()
+    return chain
+
+def ingest(chainindex, blocksdir, magic=MainMagic, network=MainNet, start_height=0,
+           progress=None, commit_every=1000):
+    # Index the best chain in blocksdir's blk*.dat files, from the
+    # index's checkpoint (or start_height on a new index), first rolling
+    # back indexed blocks the files disagree with. Returns the height of
+    # the last block in the files.
+    xor = os.path.join(blocksdir, 'xor.dat')
+    if os.path.exists(xor) and open(xor, 'rb').read().strip('\0'):
+        raise BlockFileError("%s is obfuscated; restart bitcoind with -blocksxor=0 "
+                             "to write plain block files" % blocksdir)
+    files = [BlockFile(p, magic) for p in sorted(glob.glob(os.path.join(blocksdir, 'blk*.dat')))]
+    try:
+        headers = OrderedDict()
+        for n, f in enumerate(files):
+            for offset, size in f.blocks():
+                header = f.header(offset)
+                h = binascii.hexlify(dsha256(header)[::-1])
+                headers[h] = (binascii.hexlify(header[4:36][::-1]),
+                              struct.unpack_from('<I', header, 72)[0], n, offset)
+        chain = best_chain(headers)
+        top = min(chainindex.height, len(chain) - 1)
+        height = top
+        while height >= chainindex.base:
+            stored = chainindex.blockhash(height)
+            if stored is None or stored == chain[height]:
+                break
+            height -= 1
+        if height < top:
+            chainindex.rollback(height)
+        tip = len(chain) - 1
+        for height in xrange(max(chainindex.height + 1, start_height), tip + 1):
+            prev, bits, n, offset = headers[chain[height]]
+            chainindex.add_block(height, chain[height], files[n].transactions(offset, network), commit=False)
+            if height % commit_every == 0 or height == tip:
+                chainindex.commit()
+                if progress is not None:
+                    progress(height, tip)
+        return tip
+    finally:
+        for f in files:
+            f.close()
@@ -0,0 +1,195 @@
+"""
+blockchaininfo.py
+~~~~~~~~~~~~~~~~~
+Client for the blockchain.info lookups bitpaint falls back on: address
+histories, and transactions bitcoind cannot provide.
+
+blockchain.info names the transactions inputs spend from by a numeric
+tx_index rather than by hash, and each one used to cost a request of
+its own. Every tx_index seen with its hash, in any response, is kept
+in an SQLite map, so it is only ever resolved once. Those still
+unknown are fetched in parallel.
+
+Responses are kept in memory by URL: transactions for good, as they
+cannot change, address histories for max_age seconds. Requests are
+spaced out to at most rate a second, shared by every thread and by the
+coroutines (async_rawtx, async_address) that fetch with an
+AsyncHTTPClient instead of the transport.
+"""
+
+import sqlite3, threading, time
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+import jsonrpc
+
+class RateLimit(object):
+    # Spaces out calls to wait() and reserve() to at most rate a second
+    def __init__(self, rate):
+        self.interval = rate > 0 and 1.0 / rate or 0
+        self.lock = threading.Lock()
+        self.next = 0
+
+    def reserve(self):
+        # Take the next slot and return the seconds until it opens
+        self.lock.acquire()
+        try:
+            now = time.time()
+            start = max(now, self.next)
+            self.next = start + self.interval
+        finally:
+            self.lock.release()
+        return start - now
+
+    def wait(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+class BlockchainInfo(object):
+    def __init__(self, transport, path, url="http://blockchain.info", rate=5.0, jobs=4,
+                 memory_entries=2000, max_age=60):
+        self.transport = transport
+        self.url = url.rstrip('/')
+        self.limit = RateLimit(rate)
+        self.jobs = jobs
+        self.memory_entries = memory_entries
+        self.max_age = max_age
+        self.memory = OrderedDict()   # url -> (expiry or None, parsed response)
+        self.requests = 0
+        self.hits = 0
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA synchronous = OFF")
+        self.db.execute("CREATE TABLE IF NOT EXISTS tx_index ("
+                        "tx_index INTEGER PRIMARY KEY, hash TEXT)")
+        self.db.commit()
+
+    def get(self, url, max_age=None):
+        # The parsed JSON at url, from memory if it is there and not
+        # older than max_age seconds (kept for good if None)
+        data = self.cached(url)
+        if data is None:
+            self.limit.wait()
+            data = jsonrpc.loads(self.transport.get(url))
+            self.remember(url, data, max_age)
+        return data
+
+    def async_get(self, client, url, max_age=None):
+        # get() as a coroutine, fetching with client, an AsyncHTTPClient;
+        # the rate limit is waited out on a timer, so the event loop
+        # carries on meanwhile
+        data = self.cached(url)
+        if data is None:
+            yield jsonrpc.sleep(self.limit.reserve())
+            data = jsonrpc.loads((yield client.get(url)))
+            self.remember(url, data, max_age)
+        raise jsonrpc.Return(data)
+
+    def cached(self, url):
+        # The response kept for url, or None
+        self.lock.acquire()
+        try:
+            if url in self.memory:
+                expiry, data = self.memory.pop(url)
+                if expiry is None or expiry > time.time():
+                    self.memory[url] = (expiry, data)
+                    self.hits += 1
+                    return data
+            return None
+        finally:
+            self.lock.release()
+
+    def remember(self, url, data, max_age):
+        self.lock.acquire()
+        try:
+            self.requests += 1
+            self.memory[url] = (max_age is not None and time.time() + max_age or None, data)
+            if len(self.memory) > self.memory_entries:
+                self.memory.popitem(last=False)
+        finally:
+            self.lock.release()
+
+    def learn(self, txs):
+        # Record the tx_index and hash of blockchain.info transactions
+        rows = [(t['tx_index'], t['hash']) for t in txs if 'tx_index' in t and 'hash' in t]
+        if rows:
+            self.lock.acquire()
+            try:
+                with self.db:
+                    self.db.executemany("INSERT OR REPLACE INTO tx_index (tx_index, hash) "
+                                        "VALUES (?, ?)", rows)
+            finally:
+                self.lock.release()
+
+    def known(self, tx_indexes):
+        # The hashes of the tx_indexes already seen, as a dictionary
+        tx_indexes = list(set(tx_indexes))
+        found = {}
+        self.lock.acquire()
+        try:
+            for n in range(0, len(tx_indexes), 500):
+                chunk = tx_indexes[n:n+500]
+                found.update(self.db.execute(
+                    "SELECT tx_index, hash FROM tx_index WHERE tx_index IN (%s)" % ",".join("?"*len(chunk)),
+                    chunk).fetchall())
+        finally:
+            self.lock.release()
+        return found
+
+    def rawtx(self, tx):
+        # A transaction, by hash or tx_index
+        data = self.get("%s/rawtx/%s" % (self.url, tx))
+        self.learn([data])
+        return data
+
+    def address(self, address):
+        # An address and its transactions
+        data = self.get("%s/address/%s?format=json" % (self.url, address), self.max_age)
+        self.learn(data['txs'])
+        return data
+
+    def async_rawtx(self, client, tx):
+        # rawtx() as a coroutine (see async_get)
+        data = yield self.async_get(client, "%s/rawtx/%s" % (self.url, tx))
+        self.learn([data])
+        raise jsonrpc.Return(data)
+
+    def async_address(self, client, address):
+        # address() as a coroutine (see async_get)
+        data = yield self.async_get(client, "%s/address/%s?format=json" % (self.url, address), self.max_age)
+        self.learn(data['txs'])
+        raise jsonrpc.Return(data)
+
+    def hashes(self, tx_indexes):
+        # The hashes of tx_indexes, in order. Those never seen are
+        # fetched, in parallel.
+        found = self.known(tx_indexes)
+        missing = [t for t in set(tx_indexes) if t not in found]
+        if len(missing) == 1 or self.jobs <= 1:
+            txs = [self.rawtx(t) for t in missing]
+        elif missing:
+            pool = ThreadPool(min(self.jobs, len(missing)))
+            try:
+                txs = pool.map(self.rawtx, missing)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            txs = []
+        for t, tx in zip(missing, txs):
+            found[t] = tx['hash']
+        return [found[t] for t in tx_indexes]
+
+    def prevout_txids(self, tx_bc):
+        # The txids a blockchain.info transaction's inputs spend from
+        return self.hashes([i['prev_out']['tx_index'] for i in tx_bc['inputs']])
+
+    def stats(self):
+        return {'bcinfo_requests': self.requests, 'bcinfo_hits': self.hits}
+
+    def close(self):
+        self.lock.acquire()
+        try:
+            self.db.close()
+        finally:
+            self.lock.release()
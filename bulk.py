@@ -0,0 +1,102 @@
+"""
+bulk.py
+~~~~~~~
+Plan many asset transfers at once, from a file of transfers.
+
+A file lists transfers of colored coins as a source outpoint
+(address:txid:n), a destination address and an amount in BTC, either
+as CSV rows (from,to,amount; a header line is skipped) or as JSON
+lines ({"from": ..., "to": ..., "amount": ...}).
+
+Transfers from the same outpoint become one input and the outputs it
+colors, in the order they appear in the file. Whatever the transfers
+leave of the outpoint goes back to its address as colored change, so
+each input's outputs add up to its value exactly and the next input
+starts coloring where they end. The groups are then packed into
+transactions that stay under the standard size limit, keeping room for
+an input and change output paying the fee.
+"""
+
+import csv, json
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+from payout import MaxTxSize, TxOverhead, output_size
+
+# A pay-to-pubkey-hash spend with an uncompressed key
+InputSize = 180
+
+class TransferError(Exception):
+    pass
+
+def satoshis(amount):
+    # An amount in BTC, as a string or number, in satoshis. A float
+    # goes through repr(), as str() keeps only 12 significant digits.
+    if isinstance(amount, float):
+        amount = repr(amount)
+    try:
+        v = Decimal(amount)*100000000
+    except InvalidOperation:
+        raise TransferError("Invalid amount %r" % (amount,))
+    if v != v.to_integral_value() or v <= 0:
+        raise TransferError("Invalid amount %r" % (amount,))
+    return int(v)
+
+def read_transfers(path):
+    # The transfers in a file, as (address:txid:n, address, satoshis)
+    f = open(path)
+    try:
+        if path.endswith('.jsonl') or path.endswith('.json'):
+            rows = [json.loads(l, parse_float=Decimal) for l in f if l.strip()]
+            rows = [(r['from'], r['to'], r['amount']) for r in rows]
+        else:
+            rows = [r for r in csv.reader(f) if r and not r[0].startswith('#')]
+            if rows and rows[0][0].strip().lower() == 'from':
+                rows = rows[1:]
+    finally:
+        f.close()
+    transfers = []
+    for r in rows:
+        if len(r) != 3 or len(r[0].split(':')) != 3:
+            raise TransferError("Expected address:txid:n,address,amount: %r" % (r,))
+        transfers.append((r[0].strip(), r[1].strip(), satoshis(r[2])))
+    return transfers
+
+def group(transfers):
+    # Transfers by source outpoint, as an OrderedDict from
+    # (txid, n, address) to [(address, satoshis)]
+    groups = OrderedDict()
+    for source, destination, amount in transfers:
+        address, txid, n = source.split(':')
+        groups.setdefault((txid, int(n), address), []).append((destination, amount))
+    return groups
+
+def tx_size(inputs, outputs):
+    return TxOverhead + InputSize*len(inputs) + sum(output_size(a) for a, v in outputs)
+
+def plan(groups, values, max_size=MaxTxSize, reserve=InputSize + 34):
+    # Pack the groups into transactions. values maps each source
+    # (txid, n, address) to its value in satoshis. Returns a list of
+    # (inputs, outputs) with colored change included; reserve bytes
+    # are left in each for the fee input and change.
+    txs = []
+    inputs, outputs, size = [], [], TxOverhead + reserve
+    for source, transfers in groups.iteritems():
+        left = values[source] - sum(v for a, v in transfers)
+        if left < 0:
+            raise TransferError("%s:%s:%d holds %d satoshis, %d are transferred" % (
+                source[2], source[0], source[1], values[source], values[source] - left))
+        if left > 0:
+            transfers = transfers + [(source[2], left)]
+        s = InputSize + sum(output_size(a) for a, v in transfers)
+        if TxOverhead + reserve + s > max_size:
+            raise TransferError("Transfers from %s:%s:%d do not fit in one transaction" % (
+                source[2], source[0], source[1]))
+        if inputs and size + s > max_size:
+            txs.append((inputs, outputs))
+            inputs, outputs, size = [], [], TxOverhead + reserve
+        inputs.append(source)
+        outputs.extend(transfers)
+        size += s
+    if inputs:
+        txs.append((inputs, outputs))
+    return txs
@@ -0,0 +1,214 @@
+"""
+chainindex.py
+~~~~~~~~~~~~~
+Local index of bitcoind's blocks: which transaction spent each outpoint,
+and the value and address of every output, so following a coin does not
+need an address history from blockchain.info.
+
+The index follows the chain incrementally from a stored checkpoint. The
+hash of every indexed block is kept, and blocks that have left the best
+chain are rolled back before new ones are added.
+"""
+
+import sqlite3, threading
+from jsonrpc import JSONRPCException
+
+class ChainIndex(object):
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS spends ("
+                        "outpoint TEXT PRIMARY KEY, txid TEXT, height INTEGER)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS outputs ("
+                        "outpoint TEXT PRIMARY KEY, value INTEGER, address TEXT, height INTEGER)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS blocks ("
+                        "height INTEGER PRIMARY KEY, hash TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta ("
+                        "key TEXT PRIMARY KEY, value INTEGER)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS spends_height ON spends (height)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS outputs_height ON outputs (height)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS outputs_address ON outputs (address)")
+        self.db.commit()
+        self.height = self.getmeta('height', -1)
+        self.base = self.getmeta('base', -1)
+
+    def getmeta(self, key, default):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row is None and default or row[0]
+
+    def setmeta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def query(self, sql, args):
+        # Run a read-only query; lookups may come from several threads
+        self.lock.acquire()
+        try:
+            return self.db.execute(sql, args).fetchone()
+        finally:
+            self.lock.release()
+
+    def spentby(self, outpoint):
+        # Return the txid that spent outpoint ("txid:n"), or None if it
+        # was unspent as of the indexed height
+        row = self.query("SELECT txid FROM spends WHERE outpoint = ?", (outpoint,))
+        return row and row[0]
+
+    def output(self, outpoint):
+        # Return (value in satoshis, address) of an indexed output, or
+        # None if it was created below the start of the index
+        row = self.query("SELECT value, address FROM outputs WHERE outpoint = ?", (outpoint,))
+        return row and tuple(row)
+
+    def unspent(self, address, chunk=1000):
+        # Yield (outpoint, value in satoshis) of the indexed outputs to
+        # address that are unspent as of the indexed height, oldest
+        # first, reading chunk rows at a time. Only complete when the
+        # index starts at the genesis block.
+        last = (-1, '')
+        while True:
+            self.lock.acquire()
+            try:
+                rows = self.db.execute(
+                    "SELECT o.height, o.outpoint, o.value FROM outputs o "
+                    "LEFT JOIN spends s ON s.outpoint = o.outpoint "
+                    "WHERE o.address = ? AND s.outpoint IS NULL "
+                    "AND (o.height > ? OR o.height = ? AND o.outpoint > ?) "
+                    "ORDER BY o.height, o.outpoint LIMIT ?",
+                    (address, last[0], last[0], last[1], chunk)).fetchall()
+            finally:
+                self.lock.release()
+            for height, outpoint, value in rows:
+                yield outpoint, value
+            if len(rows) < chunk:
+                return
+            last = rows[-1][:2]
+
+    def blockhash(self, height):
+        row = self.query("SELECT hash FROM blocks WHERE height = ?", (height,))
+        return row and row[0]
+
+    def add_block(self, height, blockhash, txs, commit=True):
+        # Record the spends and outputs of the decoded transactions of
+        # the block at height. Bulk loads can pass commit=False and
+        # call commit() every so many blocks.
+        spends = []
+        outputs = []
+        for tx in txs:
+            for i in tx['vin']:
+                if 'txid' in i:
+                    spends.append((i['txid']+":"+str(i['vout']), tx['txid'], height))
+            for o in tx['vout']:
+                addresses = o['scriptPubKey'].get('addresses')
+                outputs.append((tx['txid']+":"+str(o['n']), long(round(o['value'] * 1e8)),
+                                addresses and addresses[0] or None, height))
+        self.lock.acquire()
+        try:
+            self.db.executemany("INSERT OR REPLACE INTO spends (outpoint, txid, height) "
+                                "VALUES (?, ?, ?)", spends)
+            self.db.executemany("INSERT OR REPLACE INTO outputs (outpoint, value, address, height) "
+                                "VALUES (?, ?, ?, ?)", outputs)
+            self.db.execute("INSERT OR REPLACE INTO blocks (height, hash) VALUES (?, ?)",
+                            (height, blockhash))
+            self.setmeta('height', height)
+            if self.base < 0:
+                self.setmeta('base', height)
+                self.base = height
+            if commit:
+                self.db.commit()
+            self.height = height
+        finally:
+            self.lock.release()
+
+    def commit(self):
+        self.lock.acquire()
+        try:
+            self.db.commit()
+        finally:
+            self.lock.release()
+
+    def rollback(self, height):
+        # Forget every block above height
+        self.lock.acquire()
+        try:
+            for table in ('spends', 'outputs', 'blocks'):
+                self.db.execute("DELETE FROM %s WHERE height > ?" % table, (height,))
+            self.setmeta('height', height)
+            self.db.commit()
+            self.height = height
+        finally:
+            self.lock.release()
+
+    def find_fork(self, rpc, tip):
+        # Return the highest indexed height whose block is still in
+        # bitcoind's best chain. Blocks indexed before hashes were kept
+        # are taken to be in it.
+        height = min(self.height, tip)
+        while height >= self.base:
+            stored = self.blockhash(height)
+            if stored is None or stored == rpc.getblockhash(height):
+                break
+            height -= 1
+        return height
+
+    def sync(self, rpc, start_height=0, progress=None):
+        # Index every block after the checkpoint (or from start_height on
+        # a new index) up to bitcoind's tip, first rolling back any blocks
+        # that a reorg has replaced. Returns the tip height.
+        tip = rpc.getblockcount()
+        if self.height >= 0:
+            fork = self.find_fork(rpc, tip)
+            if fork < self.height:
+                self.rollback(fork)
+        height = max(self.height+1, start_height)
+        while height <= tip:
+            try:
+                block = getblock(rpc, rpc.getblockhash(height))
+            except JSONRPCException:
+                # A reorg to a shorter chain leaves nothing at height;
+                # roll back to where it forked and stop at its tip
+                newtip = rpc.getblockcount()
+                if newtip >= height:
+                    raise
+                tip = newtip
+                fork = self.find_fork(rpc, tip)
+                if fork < self.height:
+                    self.rollback(fork)
+                height = max(self.height+1, start_height)
+                continue
+            prev = self.blockhash(height-1)
+            if prev is not None and block.get('previousblockhash', prev) != prev:
+                # The chain changed under us; step back and retry
+                self.rollback(self.find_fork(rpc, tip))
+                height = self.height+1
+                continue
+            self.add_block(height, block['hash'], block['tx'])
+            if progress is not None:
+                progress(height, tip)
+            height += 1
+        return tip
+
+def getblock(rpc, blockhash):
+    # Get a block with its transactions decoded. Nodes too old to decode
+    # them in getblock are asked for them with batched calls.
+    try:
+        block = rpc.getblock(blockhash, 2)
+    except JSONRPCException:
+        block = rpc.getblock(blockhash)
+    txs = block['tx']
+    if len(txs) == 0 or isinstance(txs[0], dict):
+        return block
+    raw = []
+    for n,(r,err) in enumerate(rpc.batch([("getrawtransaction", t) for t in txs])):
+        # The genesis coinbase cannot be fetched, and spends nothing
+        if err is not None and n > 0:
+            raise JSONRPCException(err)
+        if err is None:
+            raw.append(r)
+    block['tx'] = []
+    for tx,err in rpc.batch([("decoderawtransaction", r) for r in raw]):
+        if err is not None:
+            raise JSONRPCException(err)
+        block['tx'].append(tx)
+    return block
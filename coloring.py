@@ -0,0 +1,100 @@
+"""
+coloring.py
+~~~~~~~~~~~
+The ordering-based coloring rule, on integer satoshi values.
+
+Outputs are colored in order. Each input, in turn, colors the outputs
+that follow for as long as they fit in what is left of its value; an
+output that does not fit moves on to the next input, and whatever the
+previous input had left is dropped. Outputs left over when the inputs
+run out are uncolored (-1).
+
+For each input, the last output that fits is found by a binary search
+in the cumulative sums of the output values, so the work grows with the
+number of inputs rather than outputs; transactions with only a few
+outputs per input are walked directly. color_many() colors the
+transactions of a whole block at once, with NumPy when it is installed.
+"""
+
+import bisect, itertools
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def color(input_values, output_values):
+    # Return the index of the input coloring each output, or -1
+    if len(output_values) <= 2*len(input_values) + 4:
+        return color_linear(input_values, output_values)
+    cumulative = [0]
+    for v in output_values:
+        cumulative.append(cumulative[-1] + v)
+    end = len(output_values)
+    colors = [-1]*end
+    s = 0
+    for c in range(len(input_values)):
+        if s >= end:
+            break
+        e = bisect.bisect_right(cumulative, cumulative[s] + input_values[c], s, end + 1) - 1
+        colors[s:e] = [c]*(e - s)
+        s = e
+    return colors
+
+def color_linear(input_values, output_values):
+    # The rule an output at a time, for transactions with few outputs
+    # per input where searching does not pay
+    colors = [-1]*len(output_values)
+    c, left, n_in = -1, -1, len(input_values)
+    for i, v in enumerate(output_values):
+        while v > left:
+            c += 1
+            if c >= n_in:
+                return colors
+            left = input_values[c]
+        colors[i] = c
+        left -= v
+    return colors
+
+def color_many(txs):
+    # color() for a list of (input_values, output_values)
+    if numpy is None:
+        return [color(i, o) for i, o in txs]
+    return color_many_numpy(txs)
+
+def color_many_numpy(txs):
+    # All outputs share one cumulative sum, which only grows, so a
+    # search from a transaction's position lands in that transaction
+    # once clipped to its end. Each round places the boundary after
+    # every transaction's next input at once. The boundaries, taken in
+    # transaction order, only grow too, and the color of an output is
+    # the number of boundaries of its transaction at or before it.
+    if len(txs) == 0:
+        return []
+    chain = itertools.chain.from_iterable
+    n_in = numpy.fromiter([len(i) for i, o in txs], numpy.int64, len(txs))
+    n_out = numpy.fromiter([len(o) for i, o in txs], numpy.int64, len(txs))
+    inputs = numpy.fromiter(chain([i for i, o in txs]), numpy.int64, int(n_in.sum()))
+    outputs = numpy.fromiter(chain([o for i, o in txs]), numpy.int64, int(n_out.sum()))
+    cumulative = numpy.zeros(len(outputs) + 1, dtype=numpy.int64)
+    numpy.cumsum(outputs, out=cumulative[1:])
+    out_end = numpy.cumsum(n_out)
+    in_start = numpy.cumsum(n_in) - n_in
+    boundaries = numpy.empty(len(inputs), dtype=numpy.int64)
+    s = out_end - n_out
+    # Transactions with the most inputs first, so the ones still
+    # active in a round are a prefix
+    by_inputs = numpy.argsort(-n_in, kind='mergesort')
+    remaining = numpy.bincount(n_in)[::-1].cumsum()[::-1]
+    for r in range(int(n_in.max())):
+        active = by_inputs[:remaining[r+1]]
+        e = numpy.searchsorted(cumulative, cumulative[s[active]] + inputs[in_start[active] + r], 'right') - 1
+        e = numpy.minimum(e, out_end[active])
+        boundaries[in_start[active] + r] = e
+        s[active] = e
+    tx_of = numpy.repeat(numpy.arange(len(txs)), n_out)
+    colors = numpy.searchsorted(boundaries, numpy.arange(len(outputs)), 'right') - in_start[tx_of]
+    colors[colors >= n_in[tx_of]] = -1
+    colors = colors.tolist()
+    ends = out_end.tolist()
+    return [colors[e-n:e] for e, n in zip(ends, n_out.tolist())]
@@ -0,0 +1,40 @@
+"""
+consolidate.py
+~~~~~~~~~~~~~~
+Sweep the uncolored outputs of an address into another, in
+transactions of bounded size.
+
+Outputs are taken as they come from a stream, so an address with
+thousands of dividend payouts is never held in memory or put in a
+single transaction. Each transaction takes outputs until the next one
+would push it over the size limit, and pays a fee in proportion to its
+size. Outputs worth less than the fee they add are left where they are.
+"""
+
+from bulk import InputSize
+from payout import DustLimit, MaxTxSize, TxOverhead, output_size
+
+def fee_for(size, fee_per_kb):
+    # The fee in satoshis for size bytes, rounded up to whole kilobytes
+    return fee_per_kb * ((size + 999) // 1000)
+
+def plan(utxos, destination, fee_per_kb, max_size=MaxTxSize):
+    # Yield (inputs, value, fee) for each transaction sweeping utxos,
+    # an iterable of (txid, n, address, satoshis), to destination;
+    # value is what the transaction pays out after the fee.
+    base = TxOverhead + output_size(destination)
+    inputs, total = [], 0
+    for utxo in utxos:
+        if utxo[3] * 1000 < fee_per_kb * InputSize:
+            continue
+        if inputs and base + InputSize*(len(inputs) + 1) > max_size:
+            fee = fee_for(base + InputSize*len(inputs), fee_per_kb)
+            if total - fee >= DustLimit:
+                yield inputs, total - fee, fee
+            inputs, total = [], 0
+        inputs.append(utxo[:3])
+        total += utxo[3]
+    if inputs:
+        fee = fee_for(base + InputSize*len(inputs), fee_per_kb)
+        if total - fee >= DustLimit:
+            yield inputs, total - fee, fee
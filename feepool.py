@@ -0,0 +1,110 @@
+"""
+feepool.py
+~~~~~~~~~~
+The wallet's uncolored outputs, for paying transaction fees.
+
+listunspent is called once and the outputs kept in memory, ordered by
+value. A fee is paid from the smallest output that covers it, so large
+coins are not broken up for small fees, and the output is reserved
+until it is marked spent or released, so transfers made at the same
+time never pick the same one. When no output is left that covers a
+fee, listunspent is called again and its result merged in: outputs
+that are gone are dropped, new ones added, and reservations kept.
+Outputs marked spent stay out of the pool even while listunspent still
+shows them, as the transaction spending them may not be broadcast yet.
+
+Colored outputs are never handed out, nor outputs other than
+pay-to-pubkey-hash, which are all the signer can spend.
+"""
+
+import binascii, bisect, threading
+from base58 import base58_check_encode
+
+class FeePool(object):
+    def __init__(self, rpc, is_colored=lambda outpoint: False, minconf=1):
+        self.rpc = rpc
+        self.is_colored = is_colored
+        self.minconf = minconf
+        self.lock = threading.Lock()
+        self.utxos = {}      # txid:n -> (txid, n, address, satoshis)
+        self.by_value = []   # (satoshis, txid:n) of the outputs not reserved
+        self.reserved = set()
+        # Outputs spent by transactions the wallet may not have seen yet
+        self.used = set()
+        self.loaded = False
+
+    def refresh(self):
+        # Merge in the wallet's current unspent outputs
+        unspent = self.rpc.listunspent(self.minconf)
+        self.lock.acquire()
+        try:
+            current = {}
+            listed = set()
+            for u in unspent:
+                outpoint = "%s:%d" % (u['txid'], u['vout'])
+                listed.add(outpoint)
+                if not u['scriptPubKey'].startswith('76a914') or len(u['scriptPubKey']) != 50:
+                    continue
+                if self.is_colored(outpoint) or outpoint in self.used:
+                    continue
+                if outpoint in self.utxos:
+                    current[outpoint] = self.utxos[outpoint]
+                else:
+                    address = base58_check_encode(binascii.unhexlify(u['scriptPubKey'][6:46]))
+                    current[outpoint] = (u['txid'], u['vout'], address, long(round(u['amount']*1e8)))
+            self.utxos = current
+            self.used &= listed
+            self.reserved &= set(current)
+            self.by_value = sorted((v[3], o) for o, v in current.iteritems() if o not in self.reserved)
+            self.loaded = True
+        finally:
+            self.lock.release()
+
+    def take(self, amount):
+        # Reserve the smallest free output worth at least amount
+        # satoshis, or return None
+        self.lock.acquire()
+        try:
+            i = bisect.bisect_left(self.by_value, (amount, ''))
+            if i == len(self.by_value):
+                return None
+            value, outpoint = self.by_value.pop(i)
+            self.reserved.add(outpoint)
+            return self.utxos[outpoint]
+        finally:
+            self.lock.release()
+
+    def reserve(self, amount):
+        # Reserve an output worth at least amount satoshis, as
+        # (txid, n, address, satoshis), reloading the wallet's outputs
+        # if none is left. Returns None if the wallet has none.
+        if not self.loaded:
+            self.refresh()
+        utxo = self.take(amount)
+        if utxo is None:
+            self.refresh()
+            utxo = self.take(amount)
+        return utxo
+
+    def release(self, utxo):
+        # Return a reserved output to the pool, when the transaction
+        # it was meant for was not made
+        outpoint = "%s:%d" % (utxo[0], utxo[1])
+        self.lock.acquire()
+        try:
+            if outpoint in self.reserved and outpoint in self.utxos:
+                self.reserved.discard(outpoint)
+                bisect.insort(self.by_value, (self.utxos[outpoint][3], outpoint))
+        finally:
+            self.lock.release()
+
+    def spent(self, utxo):
+        # Drop a reserved output once its transaction is made
+        outpoint = "%s:%d" % (utxo[0], utxo[1])
+        self.lock.acquire()
+        try:
+            self.reserved.discard(outpoint)
+            self.utxos.pop(outpoint, None)
+            self.used.add(outpoint)
+        finally:
+            self.lock.release()
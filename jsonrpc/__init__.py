@@ -19,8 +19,10 @@
   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 """
 
-from jsonrpc.json import loads, dumps, JSONEncodeException, JSONDecodeException
+from jsonrpc.json import loads, dumps, dump, JSONEncodeException, JSONDecodeException
+from jsonrpc.transport import HTTPTransport, ConnectionPool, HTTPError
 from jsonrpc.proxy import ServiceProxy, JSONRPCException
+from jsonrpc.asyncproxy import AsyncServiceProxy, AsyncHTTPClient, Future, Task, Return, ensure_future, gather, sleep, run
 from jsonrpc.serviceHandler import ServiceMethod, ServiceHandler, ServiceMethodNotFound, ServiceException
 from jsonrpc.cgiwrapper import handleCGI
 from jsonrpc.modpywrapper import handler
\ No newline at end of file
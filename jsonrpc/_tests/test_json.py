@@ -90,6 +90,26 @@ class  TestDumps(unittest.TestCase):
     def test_FailOther(self):
         self.failUnlessRaises(jsonrpc.JSONEncodeException, lambda:jsonrpc.dumps(self))
 
+    def test_FloatKeepsPrecision(self):
+        json = jsonrpc.dumps(20999999.97690001)
+        self.assertJSON(json, u'20999999.97690001')
+
+    def test_RepeatedKeys(self):
+        json = jsonrpc.dumps([{'a':1}, {'a':2}])
+        self.assertJSON(json, u'[{"a":1},{"a":2}]')
+
+    def test_DumpWritesToFile(self):
+        class Out:
+            def __init__(self):
+                self.chunks = []
+            def write(self, chunk):
+                self.chunks.append(chunk)
+        obj = {'list': [u'\u0130', 'foo\n'] * 5000, 'n': 1}
+        out = Out()
+        jsonrpc.dump(obj, out)
+        self.assertEquals("".join(out.chunks), jsonrpc.dumps(obj).encode('utf-8'))
+        self.assert_(len(out.chunks) > 1)
+
         
         
 
@@ -182,3 +202,29 @@ class  TestLoads(unittest.TestCase):
         self.assertEquals(obj, {'s':'foobar', 'int':1234, 'float':1234.567, 'exp':1234.56e78,
                                             'negInt':-1234, 'None':None,'True':True, 'False':False,
                                             'list':[1,2,4,{}], 'dict':{'a':'b'}})
+
+    def test_LongString(self):
+        hexdata = "0100000001" + "ab"*50000
+        obj = jsonrpc.loads('{"hex":"%s"}' % hexdata)
+        self.assertEquals(obj, {"hex": hexdata})
+
+    def test_Whitespace(self):
+        obj = jsonrpc.loads(' {\n\t"a" : [ 1 ,\r\n 2 ] , "b" : { } } ')
+        self.assertEquals(obj, {'a':[1,2], 'b':{}})
+
+    def test_ExponentWithoutFraction(self):
+        obj = jsonrpc.loads('[1e3, 2E-2]')
+        self.assertEquals(obj, [1e3, 2e-2])
+
+    def test_FailBadEscape(self):
+        self.failUnlessRaises(jsonrpc.JSONDecodeException, lambda:jsonrpc.loads('"\\q"'))
+
+    def test_FailUnterminatedString(self):
+        self.failUnlessRaises(jsonrpc.JSONDecodeException, lambda:jsonrpc.loads('"foobar'))
+
+    def test_FailUnexpectedEnd(self):
+        for json in ['', '[1,', '{"a":', 'tru']:
+            self.failUnlessRaises(jsonrpc.JSONDecodeException, lambda:jsonrpc.loads(json))
+
+    def test_FailBadKeyword(self):
+        self.failUnlessRaises(jsonrpc.JSONDecodeException, lambda:jsonrpc.loads('nil'))
@@ -22,31 +22,35 @@
 import unittest
 import jsonrpc
 
-import urllib
-
-from StringIO import StringIO
-
 class  TestProxy(unittest.TestCase):
 
-    def urlopen(self, url, data):
+    def endpoint(self, url):
+        return url
+
+    def post(self, endpoint, data):
         self.postdata = data
-        return StringIO(self.respdata) 
-    
+        return self.respdata
+
     def setUp(self):
         self.postdata=""
-        self.urllib_openurl = urllib.urlopen
-        urllib.urlopen = self.urlopen
         
     def tearDown(self):
-        urllib.urlopen = self.urllib_openurl
+        pass
 
     def test_ProvidesProxyMethod(self):
-        s = jsonrpc.ServiceProxy("http://localhost/")
+        s = jsonrpc.ServiceProxy("http://localhost/", transport=self)
         self.assert_(callable(s.echo))
 
+    def test_SubProxySharesTransport(self):
+        s = jsonrpc.ServiceProxy("http://localhost/", transport=self)
+
+        self.respdata='{"result":"foobar","error":null,"id":""}'
+        self.assertEquals(s.svc.echo("foobar"), 'foobar')
+        self.assertEquals(jsonrpc.loads(self.postdata)['method'], 'svc.echo')
+
     def test_MethodCallCallsService(self):
         
-        s = jsonrpc.ServiceProxy("http://localhost/")
+        s = jsonrpc.ServiceProxy("http://localhost/", transport=self)
 
         self.respdata='{"result":"foobar","error":null,"id":""}'
         echo = s.echo("foobar")
@@ -58,4 +62,30 @@ class  TestProxy(unittest.TestCase):
             s.echo("foobar")
         except jsonrpc.JSONRPCException,e:
             self.assertEquals(e.error, "MethodNotFound")
-            
\ No newline at end of file
+
+    def test_BatchSendsOneRequest(self):
+        s = jsonrpc.ServiceProxy("http://localhost/", transport=self)
+
+        self.respdata='[{"result":"b","error":null,"id":1},{"result":"a","error":null,"id":0}]'
+        results = s.batch([("echo", "a"), ("echo", "b")])
+        self.assertEquals(jsonrpc.loads(self.postdata), [{"method":"echo", 'params':['a'], 'id':0},
+                                                         {"method":"echo", 'params':['b'], 'id':1}])
+        self.assertEquals(results, [("a", None), ("b", None)])
+
+    def test_BatchReturnsErrorsInOrder(self):
+        s = jsonrpc.ServiceProxy("http://localhost/", transport=self)
+
+        self.respdata='[{"result":null,"error":"MethodNotFound","id":0},{"result":"b","error":null,"id":1}]'
+        results = s.batch([("nosuch", "a"), ("echo", "b")])
+        self.assertEquals(results, [(None, "MethodNotFound"), ("b", None)])
+
+    def test_BatchFailsAsAWhole(self):
+        s = jsonrpc.ServiceProxy("http://localhost/", transport=self)
+
+        self.respdata='{"result":null,"error":"ParseError","id":null}'
+        self.failUnlessRaises(jsonrpc.JSONRPCException, lambda:s.batch([("echo", "a")]))
+
+    def test_EmptyBatchSendsNothing(self):
+        s = jsonrpc.ServiceProxy("http://localhost/", transport=self)
+        self.assertEquals(s.batch([]), [])
+        self.assertEquals(self.postdata, "")
@@ -43,7 +43,13 @@ EscapeCharToChar = {
         '"' : '"'}
 
 StringEscapeRE= re.compile(r'[\x00-\x19\\"/\b\f\n\r\t]')
-Digits = ['0', '1', '2','3','4','5','6','7','8','9']
+Digits = '0123456789'
+Whitespace = ' \t\r\n'
+WhitespaceRE = re.compile(r'[ \t\r\n]*')
+StringChunkRE = re.compile(r'([^"\\]*)(["\\])')
+NumberRE = re.compile(r'(-?[0-9]+)(\.[0-9]+)?([eE][-+]?[0-9]+)?')
+Keywords = [('null', None), ('true', True), ('false', False)]
+FlushParts = 4096
 
 
 class JSONEncodeException(Exception):
@@ -76,155 +82,200 @@ def escapeChar(match):
         else:
             return c
 
+def escapeString(s):
+    if StringEscapeRE.search(s) is None:
+        return s
+    return StringEscapeRE.sub(escapeChar, s)
+
 def dumps(obj):
-    return unicode("".join([part for part in dumpParts (obj)]))
+    parts = []
+    dumpParts(obj, parts, {}, None)
+    return unicode("".join(parts))
+
+def dump(obj, fp, encoding='utf-8'):
+    # Write obj to the file-like fp a chunk at a time, without building
+    # the whole document first. Chunks are encoded with encoding unless
+    # it is None.
+    def flush(parts):
+        chunk = "".join(parts)
+        del parts[:]
+        if encoding is not None and type(chunk) is UnicodeType:
+            chunk = chunk.encode(encoding)
+        fp.write(chunk)
+    parts = []
+    dumpParts(obj, parts, {}, flush)
+    flush(parts)
 
-def dumpParts (obj):
+def dumpParts(obj, parts, keys, flush):
+    # Append the JSON fragments for obj to parts. keys caches encoded
+    # dictionary keys, flush (if not None) is called with parts
+    # whenever it holds FlushParts fragments.
+    append = parts.append
     objType = type(obj)
-    if obj == None:
-       yield u'null'
-    elif objType is BooleanType:
-        if obj:
-            yield u'true'
-        else:
-            yield u'false'
+    if objType in StringTypes:
+        append('"' + escapeString(obj) + '"')
     elif objType is DictionaryType:
-        yield u'{'
+        append('{')
         isFirst=True
         for (key, value) in obj.items():
             if isFirst:
                 isFirst=False
             else:
-                yield u","
-            yield u'"' + StringEscapeRE.sub(escapeChar, key) +u'":'
-            for part in dumpParts (value):
-                yield part
-        yield u'}'
-    elif objType in StringTypes:
-        yield u'"' + StringEscapeRE.sub(escapeChar, obj) +u'"'
-
-    elif objType in [TupleType, ListType, GeneratorType]:
-        yield u'['
+                append(',')
+            encodedKey = keys.get(key)
+            if encodedKey is None:
+                encodedKey = keys[key] = '"' + escapeString(key) + '":'
+            append(encodedKey)
+            valueType = type(value)
+            if valueType in StringTypes:
+                append('"' + escapeString(value) + '"')
+            elif valueType is FloatType:
+                append(repr(value))
+            else:
+                dumpParts(value, parts, keys, flush)
+            if flush is not None and len(parts) >= FlushParts:
+                flush(parts)
+        append('}')
+    elif objType in (TupleType, ListType, GeneratorType):
+        append('[')
         isFirst=True
         for item in obj:
             if isFirst:
                 isFirst=False
             else:
-                yield u","
-            for part in dumpParts (item):
-                yield part
-        yield u']'
-    elif objType in [IntType, LongType, FloatType]:
-        yield unicode(obj)
+                append(',')
+            if type(item) in StringTypes:
+                append('"' + escapeString(item) + '"')
+            else:
+                dumpParts(item, parts, keys, flush)
+            if flush is not None and len(parts) >= FlushParts:
+                flush(parts)
+        append(']')
+    elif objType is FloatType:
+        append(repr(obj))
+    elif objType in (IntType, LongType):
+        append(str(obj))
+    elif obj is None:
+        append('null')
+    elif objType is BooleanType:
+        if obj:
+            append('true')
+        else:
+            append('false')
     else:
         raise JSONEncodeException(obj)
     
 
 def loads(s):
-    stack = []
-    chars = iter(s)
-    value = None
-    currCharIsNext=False
-
     try:
-        while(1):
-            skip = False
-            if not currCharIsNext:
-                c = chars.next()
-            while(c in [' ', '\t', '\r','\n']):
-                c = chars.next()
-            currCharIsNext=False
-            if c=='"':
-                value = ''
-                try:
-                    c=chars.next()
-                    while c != '"':
-                        if c == '\\':
-                            c=chars.next()
-                            try:
-                                value+=EscapeCharToChar[c]
-                            except KeyError:
-                                if c == 'u':
-                                    hexCode = chars.next() + chars.next() + chars.next() + chars.next()
-                                    value += unichr(int(hexCode,16))
-                                else:
-                                    raise JSONDecodeException("Bad Escape Sequence Found")
-                        else:
-                            value+=c
-                        c=chars.next()
-                except StopIteration:
-                    raise JSONDecodeException("Expected end of String")
-            elif c == '{':
-                stack.append({})
-                skip=True
-            elif c =='}':
-                value = stack.pop()
-            elif c == '[':
-                stack.append([])
-                skip=True
-            elif c == ']':
-                value = stack.pop()
-            elif c in [',',':']:
-                skip=True
-            elif c in Digits or c == '-':
-                digits=[c]
-                c = chars.next()
-                numConv = int
-                try:
-                    while c in Digits:
-                        digits.append(c)
-                        c = chars.next()
-                    if c == ".":
-                        numConv=float
-                        digits.append(c)
-                        c = chars.next()
-                        while c in Digits:
-                            digits.append(c)
-                            c = chars.next()
-                        if c.upper() == 'E':
-                            digits.append(c)
-                            c = chars.next()
-                            if c in ['+','-']:
-                                digits.append(c)
-                                c = chars.next()
-                                while c in Digits:
-                                    digits.append(c)
-                                    c = chars.next()
-                            else:
-                                raise JSONDecodeException("Expected + or -")
-                except StopIteration:
-                    pass
-                value = numConv("".join(digits))
-                currCharIsNext=True
-
-            elif c in ['t','f','n']:
-                kw = c+ chars.next() + chars.next() + chars.next()
-                if kw == 'null':
-                    value = None
-                elif kw == 'true':
-                    value = True
-                elif kw == 'fals' and chars.next() == 'e':
-                    value = False
-                else:
-                    raise JSONDecodeException('Expected Null, False or True')
-            else:
-                raise JSONDecodeException('Expected []{}," or Number, Null, False or True')
-
-            if not skip:
-                if len(stack):
-                    top = stack[-1]
-                    if type(top) is ListType:
-                        top.append(value)
-                    elif type(top) is DictionaryType:
-                        stack.append(value)
-                    elif type(top)  in StringTypes:
-                        key = stack.pop()
-                        stack[-1][key] = value
-                    else:
-                        raise JSONDecodeException("Expected dictionary key, or start of a value")
-                else:
-                    return value
-    except StopIteration:
-         raise JSONDecodeException("Unexpected end of JSON source")
+        value, end = decodeValue(s, skipWhitespace(s, 0))
+    except IndexError:
+        raise JSONDecodeException("Unexpected end of JSON source")
+    return value
+
+def skipWhitespace(s, i):
+    if s[i:i+1] in Whitespace:
+        i = WhitespaceRE.match(s, i).end()
+    return i
+
+def decodeValue(s, i):
+    # Decode the value starting at s[i]; returns (value, end)
+    c = s[i]
+    if c == '"':
+        return decodeString(s, i+1)
+    elif c == '{':
+        return decodeObject(s, i+1)
+    elif c == '[':
+        return decodeArray(s, i+1)
+    elif c in Digits or c == '-':
+        m = NumberRE.match(s, i)
+        if m is None:
+            raise JSONDecodeException('Expected []{}," or Number, Null, False or True')
+        integer, frac, exp = m.groups()
+        if frac or exp:
+            return float(m.group(0)), m.end()
+        return int(integer), m.end()
+    elif c in 'tfn':
+        for (kw, value) in Keywords:
+            if s.startswith(kw, i):
+                return value, i + len(kw)
+        for (kw, value) in Keywords:
+            if kw.startswith(s[i:]):
+                raise IndexError
+        raise JSONDecodeException('Expected Null, False or True')
+    else:
+        raise JSONDecodeException('Expected []{}," or Number, Null, False or True')
+
+def decodeString(s, i):
+    # Decode a string whose opening quote is at s[i-1]. Runs of
+    # unescaped characters are taken as a single slice.
+    chunks = []
+    while 1:
+        m = StringChunkRE.match(s, i)
+        if m is None:
+            raise JSONDecodeException("Expected end of String")
+        content, terminator = m.groups()
+        if content:
+            chunks.append(content)
+        i = m.end()
+        if terminator == '"':
+            break
+        c = s[i:i+1]
+        if c == 'u':
+            hexCode = s[i+1:i+5]
+            if len(hexCode) < 4:
+                raise JSONDecodeException("Expected end of String")
+            try:
+                chunks.append(unichr(int(hexCode, 16)))
+            except ValueError:
+                raise JSONDecodeException("Bad Escape Sequence Found")
+            i += 5
+        elif c == '':
+            raise JSONDecodeException("Expected end of String")
+        else:
+            try:
+                chunks.append(EscapeCharToChar[c])
+            except KeyError:
+                raise JSONDecodeException("Bad Escape Sequence Found")
+            i += 1
+    if len(chunks) == 1:
+        return chunks[0], i
+    return "".join(chunks), i
 
+def decodeArray(s, i):
+    arr = []
+    i = skipWhitespace(s, i)
+    if s[i] == ']':
+        return arr, i+1
+    while 1:
+        value, i = decodeValue(s, i)
+        arr.append(value)
+        i = skipWhitespace(s, i)
+        c = s[i]
+        if c == ']':
+            return arr, i+1
+        elif c != ',':
+            raise JSONDecodeException("Expected , or ]")
+        i = skipWhitespace(s, i+1)
 
+def decodeObject(s, i):
+    obj = {}
+    i = skipWhitespace(s, i)
+    if s[i] == '}':
+        return obj, i+1
+    while 1:
+        if s[i] != '"':
+            raise JSONDecodeException("Expected dictionary key, or start of a value")
+        key, i = decodeString(s, i+1)
+        i = skipWhitespace(s, i)
+        if s[i] != ':':
+            raise JSONDecodeException("Expected :")
+        value, i = decodeValue(s, skipWhitespace(s, i+1))
+        obj[key] = value
+        i = skipWhitespace(s, i)
+        c = s[i]
+        if c == '}':
+            return obj, i+1
+        elif c != ',':
+            raise JSONDecodeException("Expected , or }")
+        i = skipWhitespace(s, i+1)
@@ -19,8 +19,9 @@
   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 """
 
-import urllib
+from types import DictType
 from jsonrpc.json import dumps, loads
+from jsonrpc.transport import HTTPTransport
 
 class JSONRPCException(Exception):
     def __init__(self, rpcError):
@@ -28,22 +29,48 @@ class JSONRPCException(Exception):
         self.error = rpcError
         
 class ServiceProxy(object):
-    def __init__(self, serviceURL, serviceName=None):
+    def __init__(self, serviceURL, serviceName=None, transport=None):
         self.__serviceURL = serviceURL
         self.__serviceName = serviceName
+        if transport is None:
+            transport = HTTPTransport()
+        self.__transport = transport
 
     def __getattr__(self, name):
         if self.__serviceName != None:
             name = "%s.%s" % (self.__serviceName, name)
-        return ServiceProxy(self.__serviceURL, name)
+        return ServiceProxy(self.__serviceURL, name, self.__transport)
+
+    def __post(self, req):
+        return self.__transport.post(self.__transport.endpoint(self.__serviceURL), dumps(req))
 
     def __call__(self, *args):
-         postdata = dumps({"method": self.__serviceName, 'params': args, 'id':'jsonrpc'})
-         respdata = urllib.urlopen(self.__serviceURL, postdata).read()
+         respdata = self.__post({"method": self.__serviceName, 'params': args, 'id':'jsonrpc'})
          resp = loads(respdata)
          if resp['error'] != None:
              raise JSONRPCException(resp['error'])
          else:
              return resp['result']
+
+    def batch(self, calls):
+        # Send several calls in a single request. calls is a list of
+        # (method, param, ...) tuples; returns a (result, error) pair
+        # for each call, in the order the calls were given.
+        if len(calls) == 0:
+            return []
+        reqs = []
+        for i in range(len(calls)):
+            name = calls[i][0]
+            if self.__serviceName != None:
+                name = "%s.%s" % (self.__serviceName, name)
+            reqs.append({"method": name, 'params': calls[i][1:], 'id': i})
+        respdata = self.__post(reqs)
+        resps = loads(respdata)
+        if type(resps) is DictType:
+            raise JSONRPCException(resps['error'])
+        results = [(None, "No response")]*len(reqs)
+        for resp in resps:
+            results[resp['id']] = (resp['result'], resp['error'])
+        return results
          
 
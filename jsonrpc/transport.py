@@ -0,0 +1,213 @@
+"""
+  Copyright (c) 2007 Jan-Klaas Kollhof
+
+  This file is part of jsonrpc.
+
+  jsonrpc is free software; you can redistribute it and/or modify
+  it under the terms of the GNU Lesser General Public License as published by
+  the Free Software Foundation; either version 2.1 of the License, or
+  (at your option) any later version.
+
+  This software is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU Lesser General Public License for more details.
+
+  You should have received a copy of the GNU Lesser General Public License
+  along with this software; if not, write to the Free Software
+  Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+"""
+
+import httplib, socket, select, threading, base64, urllib, urlparse
+
+def splitURL(url):
+    # Split a URL into (scheme, host, port, path, headers), turning any
+    # user:password into a basic-auth header.
+    u = urlparse.urlsplit(url)
+    port = u.port or (u.scheme == 'https' and 443 or 80)
+    path = u.path or '/'
+    if u.query:
+        path += '?' + u.query
+    headers = {}
+    if u.username is not None:
+        auth = "%s:%s" % (urllib.unquote(u.username), urllib.unquote(u.password or ''))
+        headers['Authorization'] = "Basic " + base64.b64encode(auth)
+    return u.scheme, u.hostname, port, path, headers
+
+class HTTPError(Exception):
+    def __init__(self, url, status, data):
+        Exception.__init__(self)
+        self.url = url
+        self.status = status
+        self.data = data
+
+    def __str__(self):
+        return "HTTP %d from %s" % (self.status, self.url)
+
+
+REDIRECTS = (301, 302, 303, 307, 308)
+
+
+class ConnectionPool(object):
+    # A bounded pool of persistent HTTP/1.1 connections to one host.
+    # At most maxsize requests are in flight at once; further callers
+    # wait for a connection to be handed back.
+    def __init__(self, scheme, host, port, maxsize=4, timeout=30):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(maxsize)
+        self.lock = threading.Lock()
+        self.idle = []
+
+    def connect(self):
+        if self.scheme == 'https':
+            return httplib.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return httplib.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, body=None, headers={}):
+        # Returns (status, data, headers), with the response header
+        # names in lower case. Idle connections the server has closed
+        # are dropped before use, and a request that cannot be sent on a
+        # reused connection is sent on a new one. Once a request has gone
+        # out only a GET is sent again, as the server may have acted on
+        # anything else.
+        self.slots.acquire()
+        try:
+            conn = self.checkout()
+            if conn is not None:
+                sent = False
+                try:
+                    self.send(conn, method, path, body, headers)
+                    sent = True
+                    return self.receive(conn)
+                except socket.timeout:
+                    raise
+                except (httplib.HTTPException, socket.error):
+                    if sent and method != 'GET':
+                        raise
+            conn = self.connect()
+            self.send(conn, method, path, body, headers)
+            return self.receive(conn)
+        finally:
+            self.slots.release()
+
+    def checkout(self):
+        # An idle connection the server has not closed, or None
+        while True:
+            self.lock.acquire()
+            try:
+                if not self.idle:
+                    return None
+                conn = self.idle.pop()
+            finally:
+                self.lock.release()
+            try:
+                # Nothing is due on an idle connection; if it reads as
+                # ready, the server has closed it
+                readable = select.select([conn.sock], [], [], 0)[0]
+            except (select.error, socket.error, ValueError, TypeError):
+                readable = True
+            if not readable:
+                return conn
+            conn.close()
+
+    def send(self, conn, method, path, body, headers):
+        try:
+            conn.request(method, path, body, headers)
+        except:
+            conn.close()
+            raise
+
+    def receive(self, conn):
+        try:
+            resp = conn.getresponse()
+            data = resp.read()
+        except:
+            conn.close()
+            raise
+        if resp.will_close:
+            conn.close()
+        else:
+            self.lock.acquire()
+            try:
+                self.idle.append(conn)
+            finally:
+                self.lock.release()
+        return resp.status, data, dict(resp.getheaders())
+
+    def close(self):
+        self.lock.acquire()
+        try:
+            for conn in self.idle:
+                conn.close()
+            self.idle = []
+        finally:
+            self.lock.release()
+
+
+class HTTPTransport(object):
+    # Hands out requests to one ConnectionPool per (scheme, host, port).
+    # Safe to share between threads and between ServiceProxy instances.
+    def __init__(self, maxsize=4, timeout=30):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.pools = {}
+        self.endpoints = {}
+
+    def pool(self, scheme, host, port):
+        self.lock.acquire()
+        try:
+            key = (scheme, host, port)
+            if key not in self.pools:
+                self.pools[key] = ConnectionPool(scheme, host, port, self.maxsize, self.timeout)
+            return self.pools[key]
+        finally:
+            self.lock.release()
+
+    def parse(self, url):
+        # Split a URL into (pool, path, headers)
+        scheme, host, port, path, headers = splitURL(url)
+        return self.pool(scheme, host, port), path, headers
+
+    def endpoint(self, url):
+        # Like parse, but remembered, for URLs that are used repeatedly
+        try:
+            return self.endpoints[url]
+        except KeyError:
+            self.endpoints[url] = self.parse(url)
+            return self.endpoints[url]
+
+    def post(self, endpoint, body):
+        # JSON-RPC servers report failed calls with a 500 and the error
+        # in the body; any other status but 200 is an HTTPError
+        pool, path, headers = endpoint
+        headers = dict(headers)
+        headers['Content-Type'] = 'application/json'
+        if isinstance(body, unicode):
+            body = body.encode('utf-8')
+        status, data, h = pool.request('POST', path, body, headers)
+        if status not in (200, 500):
+            raise HTTPError("%s://%s:%d%s" % (pool.scheme, pool.host, pool.port, path), status, data)
+        return data
+
+    def get(self, url, max_redirects=5):
+        # Follows up to max_redirects redirects; any other status but
+        # 2xx is an HTTPError
+        for n in range(max_redirects + 1):
+            pool, path, headers = self.parse(url)
+            status, data, h = pool.request('GET', path, None, headers)
+            if status not in REDIRECTS or 'location' not in h:
+                break
+            if n == max_redirects:
+                raise HTTPError(url, status, data)
+            url = urlparse.urljoin(url, h['location'])
+        if not 200 <= status < 300:
+            raise HTTPError(url, status, data)
+        return data
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.close()
@@ -0,0 +1,106 @@
+"""
+payout.py
+~~~~~~~~~
+Split a dividend between the holders of an asset and pay it out.
+
+The payment is apportioned in satoshis by the largest remainder method:
+each address gets the whole satoshis of its exact share, and the
+satoshis left over go one each to the largest fractional parts, so the
+payouts add up to the payment exactly. Addresses whose payout would be
+dust are left out and the payment is apportioned again between the
+rest.
+
+Payouts are split into transactions that stay under the standard size
+limit, with room left for the inputs and change the wallet adds, and
+the sendmany calls are submitted several to a request.
+"""
+
+# Standard transactions are limited to 100000 virtual bytes
+MaxTxSize = 100000
+# Room kept in each transaction for the wallet's inputs and change
+InputReserve = 10000
+# Version, locktime and counts
+TxOverhead = 10
+# Payouts below this many satoshis are not relayed
+DustLimit = 546
+
+def output_size(address):
+    # Bytes an output paying address adds to a transaction
+    if address[:3].lower() in ('bc1', 'tb1'):
+        if len(address) <= 44:
+            return 31   # pay-to-witness-pubkey-hash
+        return 43       # pay-to-witness-script-hash and taproot
+    if address[0] in '32':
+        return 32       # pay-to-script-hash
+    return 34           # pay-to-pubkey-hash
+
+def aggregate(holdings):
+    # Sum holdings of (address, satoshis, ...) by address, in the order
+    # the addresses are first seen
+    totals = {}
+    order = []
+    for h in holdings:
+        address, amount = h[0], h[1]
+        if address not in totals:
+            totals[address] = 0
+            order.append(address)
+        totals[address] += amount
+    return [(a, totals[a]) for a in order]
+
+def apportion(total, weights):
+    # Split total satoshis in proportion to a list of integer weights.
+    # Ties between equal remainders go to the earlier weight.
+    weight = sum(weights)
+    if weight <= 0:
+        raise ValueError("Nothing to apportion between")
+    shares = []
+    remainders = []
+    for n, w in enumerate(weights):
+        q, r = divmod(total*w, weight)
+        shares.append(q)
+        remainders.append((-r, n))
+    remainders.sort()
+    for r, n in remainders[:total - sum(shares)]:
+        shares[n] += 1
+    return shares
+
+def plan(total, holdings, dust=DustLimit):
+    # Apportion total satoshis between the addresses in holdings.
+    # Returns the payouts as [(address, satoshis)] and the addresses
+    # left out as dust.
+    holders = [(a, v) for a, v in aggregate(holdings) if v > 0]
+    left_out = []
+    while holders:
+        shares = apportion(total, [v for a, v in holders])
+        kept = [h for h, s in zip(holders, shares) if s >= dust]
+        if len(kept) == len(holders):
+            return [(a, s) for (a, v), s in zip(holders, shares)], left_out
+        left_out += [a for (a, v), s in zip(holders, shares) if s < dust]
+        holders = kept
+    return [], left_out
+
+def batches(payouts, max_size=MaxTxSize, reserve=InputReserve):
+    # Split payouts into lists that each fit in one transaction
+    limit = max_size - reserve - TxOverhead
+    result = []
+    current, size = [], 0
+    for address, amount in payouts:
+        s = output_size(address)
+        if current and size + s > limit:
+            result.append(current)
+            current, size = [], 0
+        current.append((address, amount))
+        size += s
+    if current:
+        result.append(current)
+    return result
+
+def send(rpc, account, batches, calls_per_request=20):
+    # Pay each batch with a sendmany from the wallet account, several
+    # calls to a request. Returns a (txid, error) pair for each batch.
+    results = []
+    for n in range(0, len(batches), calls_per_request):
+        calls = [("sendmany", account, dict((a, float(v / 1e8)) for a, v in b))
+                 for b in batches[n:n+calls_per_request]]
+        results += rpc.batch(calls)
+    return results
@@ -0,0 +1,96 @@
+"""
+ripemd160.py
+~~~~~~~~~~~~
+RIPEMD-160, for hashing public keys into addresses. hashlib provides it
+when the OpenSSL it was built against does; otherwise a pure Python
+implementation is used, which is slow but only needed for the less
+common script types.
+"""
+
+import hashlib, struct
+
+def ripemd160(v):
+    try:
+        return hashlib.new('ripemd160', v).digest()
+    except ValueError:
+        return RIPEMD160(v).digest()
+
+def hash160(v):
+    # RIPEMD-160 of SHA-256, as used for addresses
+    return ripemd160(hashlib.sha256(v).digest())
+
+# Message word, rotation and constant for each of the 80 steps of the
+# left and right lines
+RL = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15,
+      7, 4, 13, 1, 10, 6, 15, 3, 12, 0, 9, 5, 2, 14, 11, 8,
+      3, 10, 14, 4, 9, 15, 8, 1, 2, 7, 0, 6, 13, 11, 5, 12,
+      1, 9, 11, 10, 0, 8, 12, 4, 13, 3, 7, 15, 14, 5, 6, 2,
+      4, 0, 5, 9, 7, 12, 2, 10, 14, 1, 3, 8, 11, 6, 15, 13]
+RR = [5, 14, 7, 0, 9, 2, 11, 4, 13, 6, 15, 8, 1, 10, 3, 12,
+      6, 11, 3, 7, 0, 13, 5, 10, 14, 15, 8, 12, 4, 9, 1, 2,
+      15, 5, 1, 3, 7, 14, 6, 9, 11, 8, 12, 2, 10, 0, 4, 13,
+      8, 6, 4, 1, 3, 11, 15, 0, 5, 12, 2, 13, 9, 7, 10, 14,
+      12, 15, 10, 4, 1, 5, 8, 7, 6, 2, 13, 14, 0, 3, 9, 11]
+SL = [11, 14, 15, 12, 5, 8, 7, 9, 11, 13, 14, 15, 6, 7, 9, 8,
+      7, 6, 8, 13, 11, 9, 7, 15, 7, 12, 15, 9, 11, 7, 13, 12,
+      11, 13, 6, 7, 14, 9, 13, 15, 14, 8, 13, 6, 5, 12, 7, 5,
+      11, 12, 14, 15, 14, 15, 9, 8, 9, 14, 5, 6, 8, 6, 5, 12,
+      9, 15, 5, 11, 6, 8, 13, 12, 5, 12, 13, 14, 11, 8, 5, 6]
+SR = [8, 9, 9, 11, 13, 15, 15, 5, 7, 7, 8, 11, 14, 14, 12, 6,
+      9, 13, 15, 7, 12, 8, 9, 11, 7, 7, 12, 7, 6, 15, 13, 11,
+      9, 7, 15, 11, 8, 6, 6, 14, 12, 13, 5, 14, 13, 13, 7, 5,
+      15, 5, 8, 11, 14, 14, 6, 14, 6, 9, 12, 9, 12, 5, 15, 8,
+      8, 5, 12, 9, 12, 5, 14, 6, 8, 13, 6, 5, 15, 13, 11, 11]
+KL = [0x00000000, 0x5A827999, 0x6ED9EBA1, 0x8F1BBCDC, 0xA953FD4E]
+KR = [0x50A28BE6, 0x5C4DD124, 0x6D703EF3, 0x7A6D76E9, 0x00000000]
+
+def f(j, x, y, z):
+    if j == 0:
+        return x ^ y ^ z
+    if j == 1:
+        return (x & y) | (~x & z)
+    if j == 2:
+        return (x | ~y) ^ z
+    if j == 3:
+        return (x & z) | (y & ~z)
+    return x ^ (y | ~z)
+
+def rol(x, n):
+    x &= 0xffffffff
+    return ((x << n) | (x >> (32 - n))) & 0xffffffff
+
+class RIPEMD160(object):
+    def __init__(self, v=''):
+        self.h = [0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476, 0xC3D2E1F0]
+        self.length = 0
+        self.buf = ''
+        self.update(v)
+
+    def update(self, v):
+        self.length += len(v)
+        v = self.buf + v
+        for i in range(0, len(v) - 63, 64):
+            self.compress(v[i:i+64])
+        self.buf = v[len(v) - len(v) % 64:]
+
+    def compress(self, block):
+        x = struct.unpack('<16L', block)
+        h0, h1, h2, h3, h4 = self.h
+        al, bl, cl, dl, el = ar, br, cr, dr, er = self.h
+        for j in range(80):
+            r = j >> 4
+            t = rol(al + f(r, bl, cl, dl) + x[RL[j]] + KL[r], SL[j]) + el
+            al, el, dl, cl, bl = el, dl, rol(cl, 10), bl, t & 0xffffffff
+            t = rol(ar + f(4 - r, br, cr, dr) + x[RR[j]] + KR[r], SR[j]) + er
+            ar, er, dr, cr, br = er, dr, rol(cr, 10), br, t & 0xffffffff
+        self.h = [(h1 + cl + dr) & 0xffffffff, (h2 + dl + er) & 0xffffffff,
+                  (h3 + el + ar) & 0xffffffff, (h4 + al + br) & 0xffffffff,
+                  (h0 + bl + cr) & 0xffffffff]
+
+    def digest(self):
+        h, buf, length = self.h, self.buf, self.length
+        pad = '\x80' + '\0' * ((55 - length) % 64) + struct.pack('<Q', length * 8)
+        self.update(pad)
+        result = struct.pack('<5L', *self.h)
+        self.h, self.buf, self.length = h, buf, length
+        return result
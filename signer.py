@@ -0,0 +1,318 @@
+"""
+signer.py
+~~~~~~~~~
+Build and sign transactions spending pay-to-pubkey-hash outputs in
+process, so a transaction costs one sendrawtransaction rather than a
+createrawtransaction, a dumpprivkey per unknown key and a
+signrawtransaction carrying every key over the wire.
+
+Signatures are ECDSA on secp256k1 with deterministic nonces (RFC 6979)
+and low S values, and commit to the whole transaction (SIGHASH_ALL).
+Keys are given in wallet import format and kept in a KeyRing, which
+derives each public key once.
+
+Points are kept in Jacobian coordinates, so a multiplication takes a
+single modular inverse, and multiples of the generator are added up
+from a table of its powers of two instead of being doubled each time.
+"""
+
+import binascii, hashlib, hmac, struct
+from base58 import address_to_hash160, b58decode_check, b58encode_check
+from ripemd160 import hash160
+from txparser import dsha256, segwit_decode
+
+# secp256k1: y^2 = x^3 + 7 over the field of P, with a generator G of order N
+P = 2**256 - 2**32 - 977
+N = 0xfffffffffffffffffffffffffffffffebaaedce6af48a03bbfd25e8cd0364141
+G = (0x79be667ef9dcbbac55a06295ce870b07029bfcdb2dce28d959f2815b16f81798,
+     0x483ada7726a3c4655da4fbfc0e1108a8fd17b448a68554199c47d08ffb10d4b8)
+
+SighashAll = 1
+
+class SignerError(Exception):
+    pass
+
+### Curve arithmetic, on (X, Y, Z) standing for (X/Z^2, Y/Z^3)
+def jacobian_double(p):
+    x, y, z = p
+    if y == 0:
+        return (0, 0, 0)
+    ysq = y*y % P
+    s = 4*x*ysq % P
+    m = 3*x*x % P
+    nx = (m*m - 2*s) % P
+    ny = (m*(s - nx) - 8*ysq*ysq) % P
+    nz = 2*y*z % P
+    return (nx, ny, nz)
+
+def jacobian_add(p, q):
+    if p[2] == 0:
+        return q
+    if q[2] == 0:
+        return p
+    x1, y1, z1 = p
+    x2, y2, z2 = q
+    z1sq, z2sq = z1*z1 % P, z2*z2 % P
+    u1, u2 = x1*z2sq % P, x2*z1sq % P
+    s1, s2 = y1*z2sq*z2 % P, y2*z1sq*z1 % P
+    if u1 == u2:
+        if s1 != s2:
+            return (0, 0, 0)
+        return jacobian_double(p)
+    h = u2 - u1
+    r = s2 - s1
+    hsq = h*h % P
+    hcu = hsq*h % P
+    u1hsq = u1*hsq % P
+    nx = (r*r - hcu - 2*u1hsq) % P
+    ny = (r*(u1hsq - nx) - s1*hcu) % P
+    nz = h*z1*z2 % P
+    return (nx, ny, nz)
+
+def to_affine(p):
+    if p[2] == 0:
+        return None
+    zinv = pow(p[2], P - 2, P)
+    zinvsq = zinv*zinv % P
+    return (p[0]*zinvsq % P, p[1]*zinvsq*zinv % P)
+
+GPowers = None
+
+def generator_powers():
+    # G, 2G, 4G, ... 2^255 G
+    global GPowers
+    if GPowers is None:
+        p = (G[0], G[1], 1)
+        powers = []
+        for i in range(256):
+            powers.append(p)
+            p = jacobian_double(p)
+        GPowers = powers
+    return GPowers
+
+def multiply(k, point=None):
+    # k times point (the generator by default), as an affine point
+    k %= N
+    result = (0, 0, 0)
+    if point is None:
+        powers = generator_powers()
+        i = 0
+        while k:
+            if k & 1:
+                result = jacobian_add(result, powers[i])
+            k >>= 1
+            i += 1
+    else:
+        p = (point[0], point[1], 1)
+        while k:
+            if k & 1:
+                result = jacobian_add(result, p)
+            p = jacobian_double(p)
+            k >>= 1
+    return to_affine(result)
+
+### Keys
+def encode_pubkey(point, compressed=True):
+    x, y = point
+    if compressed:
+        return chr(2 + (y & 1)) + binascii.unhexlify('%064x' % x)
+    return '\x04' + binascii.unhexlify('%064x%064x' % (x, y))
+
+def decode_pubkey(pubkey):
+    x = long(binascii.hexlify(pubkey[1:33]), 16)
+    if len(pubkey) == 65 and pubkey[0] == '\x04':
+        return (x, long(binascii.hexlify(pubkey[33:]), 16))
+    if len(pubkey) != 33 or pubkey[0] not in '\x02\x03':
+        raise SignerError("Invalid public key")
+    y = pow((x*x*x + 7) % P, (P + 1)//4, P)
+    if (y & 1) != ord(pubkey[0]) & 1:
+        y = P - y
+    return (x, y)
+
+def decode_wif(wif):
+    # The (secret, compressed, version byte) of a key in wallet import
+    # format
+    try:
+        payload = b58decode_check(wif)
+    except ValueError:
+        raise SignerError("Invalid private key checksum")
+    if len(payload) == 34 and payload[-1] == '\x01':
+        compressed = True
+    elif len(payload) == 33:
+        compressed = False
+    else:
+        raise SignerError("Invalid private key length")
+    secret = long(binascii.hexlify(payload[1:33]), 16)
+    if not 0 < secret < N:
+        raise SignerError("Private key out of range")
+    return secret, compressed, ord(payload[0])
+
+def encode_wif(secret, compressed=True, version=0x80):
+    return b58encode_check(chr(version) + binascii.unhexlify('%064x' % secret) + (compressed and '\x01' or ''))
+
+class Key(object):
+    def __init__(self, wif):
+        self.secret, self.compressed, self.version = decode_wif(wif)
+        self.pubkey = encode_pubkey(multiply(self.secret), self.compressed)
+        self.hash160 = hash160(self.pubkey)
+
+    def address(self):
+        # Pay-to-pubkey-hash address, on the network the key is for
+        return b58encode_check(chr((self.version - 0x80) & 0xff) + self.hash160)
+
+    def sign(self, digest):
+        return sign(self.secret, digest)
+
+class KeyRing(object):
+    # Keys by the hash160 of their public key, so an address finds its
+    # key whichever network it is written for
+    def __init__(self, wifs=()):
+        self.keys = {}
+        for w in wifs:
+            self.add(w)
+
+    def add(self, wif):
+        key = Key(wif)
+        self.keys[key.hash160] = key
+        return key
+
+    def get(self, address):
+        try:
+            h = address_to_hash160(address)
+        except ValueError:
+            return None
+        return self.keys.get(h)
+
+    def __contains__(self, address):
+        return self.get(address) is not None
+
+### ECDSA
+def nonce(secret, digest):
+    # RFC 6979 section 3.2, with HMAC-SHA256
+    x = binascii.unhexlify('%064x' % secret)
+    h = binascii.unhexlify('%064x' % (long(binascii.hexlify(digest), 16) % N))
+    v = '\x01'*32
+    k = '\x00'*32
+    k = hmac.new(k, v + '\x00' + x + h, hashlib.sha256).digest()
+    v = hmac.new(k, v, hashlib.sha256).digest()
+    k = hmac.new(k, v + '\x01' + x + h, hashlib.sha256).digest()
+    v = hmac.new(k, v, hashlib.sha256).digest()
+    while True:
+        v = hmac.new(k, v, hashlib.sha256).digest()
+        t = long(binascii.hexlify(v), 16)
+        if 0 < t < N:
+            return t
+        k = hmac.new(k, v + '\x00', hashlib.sha256).digest()
+        v = hmac.new(k, v, hashlib.sha256).digest()
+
+def sign(secret, digest):
+    # DER encoded signature of a 32 byte digest, with S in the lower half
+    z = long(binascii.hexlify(digest), 16)
+    k = nonce(secret, digest)
+    r = multiply(k)[0] % N
+    s = pow(k, N - 2, N)*(z + r*secret) % N
+    if s > N//2:
+        s = N - s
+    return der_encode(r, s)
+
+def verify(pubkey, digest, signature):
+    r, s = der_decode(signature)
+    if not (0 < r < N and 0 < s < N):
+        return False
+    z = long(binascii.hexlify(digest), 16)
+    w = pow(s, N - 2, N)
+    p = jacobian_add(to_jacobian(multiply(z*w % N)), to_jacobian(multiply(r*w % N, decode_pubkey(pubkey))))
+    p = to_affine(p)
+    return p is not None and p[0] % N == r
+
+def to_jacobian(point):
+    if point is None:
+        return (0, 0, 0)
+    return (point[0], point[1], 1)
+
+def der_int(n):
+    b = binascii.unhexlify('%064x' % n).lstrip('\0')
+    if not b or ord(b[0]) & 0x80:
+        b = '\0' + b
+    return '\x02' + chr(len(b)) + b
+
+def der_encode(r, s):
+    body = der_int(r) + der_int(s)
+    return '\x30' + chr(len(body)) + body
+
+def der_decode(sig):
+    if len(sig) < 8 or sig[0] != '\x30' or ord(sig[1]) != len(sig) - 2 or sig[2] != '\x02':
+        raise SignerError("Invalid DER signature")
+    lr = ord(sig[3])
+    if sig[4+lr] != '\x02' or 6 + lr + ord(sig[5+lr]) != len(sig):
+        raise SignerError("Invalid DER signature")
+    r = long(binascii.hexlify(sig[4:4+lr]), 16)
+    s = long(binascii.hexlify(sig[6+lr:]), 16)
+    return r, s
+
+### Transactions
+def push(data):
+    if len(data) < 0x4c:
+        return chr(len(data)) + data
+    return '\x4c' + chr(len(data)) + data
+
+def varint(n):
+    if n < 0xfd:
+        return chr(n)
+    elif n <= 0xffff:
+        return '\xfd' + struct.pack('<H', n)
+    return '\xfe' + struct.pack('<I', n)
+
+def p2pkh_script(h):
+    return '\x76\xa9\x14' + h + '\x88\xac'
+
+def output_script(address):
+    # The scriptPubKey paying an address, on either network
+    if address[:3].lower() in ('bc1', 'tb1', 'bcr'):
+        hrp, version, program = segwit_decode(address)
+        return chr(version and version + 0x50 or 0) + chr(len(program)) + program
+    payload = b58decode_check(address)
+    if len(payload) != 21:
+        raise ValueError("Invalid address length: %s" % (address,))
+    if ord(payload[0]) in (5, 196):
+        return '\xa9\x14' + payload[1:] + '\x87'
+    return p2pkh_script(payload[1:])
+
+def serialize_outputs(outputs):
+    # outputs: [(address, satoshis)]
+    s = [varint(len(outputs))]
+    for address, amount in outputs:
+        script = output_script(address)
+        s.append(struct.pack('<q', amount) + varint(len(script)) + script)
+    return ''.join(s)
+
+def serialize(inputs, outputs, scripts):
+    # inputs: [(txid, n, ...)]; outputs: as serialized by
+    # serialize_outputs; scripts: the scriptSig of each input
+    s = [struct.pack('<i', 1), varint(len(inputs))]
+    for i, script in zip(inputs, scripts):
+        s.append(binascii.unhexlify(i[0])[::-1] + struct.pack('<I', i[1]))
+        s.append(varint(len(script)) + script + '\xff\xff\xff\xff')
+    s.append(outputs)
+    s.append(struct.pack('<I', 0))
+    return ''.join(s)
+
+def sign_tx(inputs, outputs, keyring):
+    # Build a transaction spending the pay-to-pubkey-hash outputs in
+    # inputs, as (txid, n, address), to outputs, as (address, satoshis)
+    # in order, and sign it with keys from keyring. Returns the raw
+    # transaction as hex.
+    keys = []
+    for txid, n, address in inputs:
+        key = keyring.get(address)
+        if key is None:
+            raise SignerError("No private key for %s" % (address,))
+        keys.append(key)
+    outputs = serialize_outputs(outputs)
+    scripts = []
+    for i, key in enumerate(keys):
+        unsigned = [''] * len(inputs)
+        unsigned[i] = p2pkh_script(key.hash160)
+        digest = dsha256(serialize(inputs, outputs, unsigned) + struct.pack('<I', SighashAll))
+        scripts.append(push(key.sign(digest) + chr(SighashAll)) + push(key.pubkey))
+    return binascii.hexlify(serialize(inputs, outputs, scripts))
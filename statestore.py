@@ -0,0 +1,153 @@
+"""
+statestore.py
+~~~~~~~~~~~~~
+SQLite store of the painted coins being tracked, their current holders,
+and the holding addresses of this wallet with their private keys.
+
+Holdings are kept in satoshis, in the order the trace found them, and
+are indexed by address and by outpoint; reports look them up through a
+HoldingsIndex loaded from the store. Every change is made in a single
+transaction, so an interrupted update leaves the previous state in
+place.
+"""
+
+import sqlite3, threading
+
+class StateStore(object):
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS assets ("
+                        "name TEXT PRIMARY KEY, root_tx TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS holdings ("
+                        "asset TEXT, position INTEGER, address TEXT, amount INTEGER, outpoint TEXT, "
+                        "PRIMARY KEY (asset, position))")
+        self.db.execute("CREATE TABLE IF NOT EXISTS holding_addresses ("
+                        "address TEXT PRIMARY KEY, private_key TEXT)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS holdings_address ON holdings (address)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS holdings_outpoint ON holdings (outpoint)")
+        self.db.commit()
+
+    def query(self, sql, args=()):
+        self.lock.acquire()
+        try:
+            return self.db.execute(sql, args).fetchall()
+        finally:
+            self.lock.release()
+
+    def assets(self):
+        # Names of the tracked assets, in the order they were added
+        return [r[0] for r in self.query("SELECT name FROM assets ORDER BY rowid")]
+
+    def has_asset(self, name):
+        return len(self.query("SELECT 1 FROM assets WHERE name = ?", (name,))) > 0
+
+    def root_tx(self, name):
+        rows = self.query("SELECT root_tx FROM assets WHERE name = ?", (name,))
+        if not rows:
+            raise KeyError("Unknown asset: %s" % name)
+        return rows[0][0]
+
+    def add_asset(self, name, root_tx):
+        self.lock.acquire()
+        try:
+            with self.db:
+                self.db.execute("INSERT INTO assets (name, root_tx) VALUES (?, ?)", (name, root_tx))
+        finally:
+            self.lock.release()
+
+    def holdings(self, name):
+        # The holders of an asset as (address, amount in satoshis, txid:n)
+        return [tuple(r) for r in self.query("SELECT address, amount, outpoint FROM holdings "
+                                              "WHERE asset = ? ORDER BY position", (name,))]
+
+    def set_holdings(self, name, holdings):
+        # Replace the holders of an asset with a list of
+        # (address, amount in satoshis, txid:n)
+        rows = [(name, n, a, v, o) for n,(a,v,o) in enumerate(holdings)]
+        self.lock.acquire()
+        try:
+            with self.db:
+                self.db.execute("DELETE FROM holdings WHERE asset = ?", (name,))
+                self.db.executemany("INSERT INTO holdings (asset, position, address, amount, outpoint) "
+                                    "VALUES (?, ?, ?, ?, ?)", rows)
+        finally:
+            self.lock.release()
+
+    def index(self):
+        # A HoldingsIndex of every current holding
+        return HoldingsIndex(self.query("SELECT h.asset, h.address, h.amount, h.outpoint "
+                                        "FROM holdings h JOIN assets a ON a.name = h.asset "
+                                        "ORDER BY a.rowid, h.position"))
+
+    def holding_addresses(self):
+        return [r[0] for r in self.query("SELECT address FROM holding_addresses ORDER BY rowid")]
+
+    def private_keys(self):
+        # A dictionary with address as key and private key as value
+        return dict(self.query("SELECT address, private_key FROM holding_addresses"))
+
+    def add_holding_address(self, address, private_key):
+        self.lock.acquire()
+        try:
+            with self.db:
+                self.db.execute("INSERT OR REPLACE INTO holding_addresses (address, private_key) "
+                                "VALUES (?, ?)", (address, private_key))
+        finally:
+            self.lock.release()
+
+    def migrate(self, assets, holding_addresses):
+        # Import state kept elsewhere in one transaction. assets is a
+        # list of (name, root_tx, holdings), holding_addresses a list of
+        # (address, private_key). Assets already in the store are left
+        # alone, so an import that was interrupted can be run again.
+        self.lock.acquire()
+        try:
+            with self.db:
+                for name, root_tx, holdings in assets:
+                    if self.db.execute("SELECT 1 FROM assets WHERE name = ?", (name,)).fetchone():
+                        continue
+                    self.db.execute("INSERT INTO assets (name, root_tx) VALUES (?, ?)", (name, root_tx))
+                    self.db.executemany("INSERT INTO holdings (asset, position, address, amount, outpoint) "
+                                        "VALUES (?, ?, ?, ?, ?)",
+                                        [(name, n, a, v, o) for n,(a,v,o) in enumerate(holdings)])
+                self.db.executemany("INSERT OR IGNORE INTO holding_addresses (address, private_key) "
+                                    "VALUES (?, ?)", holding_addresses)
+        finally:
+            self.lock.release()
+
+    def close(self):
+        self.lock.acquire()
+        try:
+            self.db.close()
+        finally:
+            self.lock.release()
+
+
+class HoldingsIndex(object):
+    # An in-memory snapshot of the holdings of every asset, for reports
+    # that look up many outpoints and addresses in one run
+    def __init__(self, rows):
+        # rows: (asset, address, amount, outpoint) in asset order
+        self.rows = [tuple(r) for r in rows]
+        self.colored = set()
+        # address -> (row number, asset, amount, outpoint) of each of its
+        # holdings, so holdings_of only visits the rows it returns
+        self.by_address = {}
+        for n,(asset, address, amount, outpoint) in enumerate(self.rows):
+            self.colored.add(outpoint)
+            self.by_address.setdefault(address, []).append((n, asset, amount, outpoint))
+
+    def is_colored(self, outpoint):
+        return outpoint in self.colored
+
+    def holdings_of(self, addresses):
+        # Holdings at any of addresses, as (asset, address, amount in
+        # satoshis, txid:n) in asset order
+        found = []
+        for address in set(addresses):
+            for n, asset, amount, outpoint in self.by_address.get(address, []):
+                found.append((n, (asset, address, amount, outpoint)))
+        found.sort()
+        return [r for n,r in found]
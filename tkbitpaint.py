@@ -13,6 +13,7 @@ def MyHoldingsButton():
 def quit(x):
     tk.destroy()
 
+bitpaint.setup()
 tk = Tkinter.Tk()
 tk.bind('<Key-Escape>',quit)
 frame = Tkinter.Frame(tk, relief=RIDGE, borderwidth=2)
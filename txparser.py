@@ -0,0 +1,253 @@
+"""
+txparser.py
+~~~~~~~~~~~
+Decode raw transactions locally into the structure bitcoind's
+decoderawtransaction returns, so fetching a transaction takes one RPC
+instead of two and the decoding is not done by bitcoind.
+
+The fields bitpaint relies on are produced: txid, hash, version, size,
+vsize, weight and locktime; txid, vout, scriptSig hex, txinwitness and
+sequence (or coinbase) of each input; and value, n and a scriptPubKey
+with hex, type, reqSigs and addresses of each output. Script "asm" is
+not produced.
+
+Transactions are read in place from the raw bytes with struct; only
+scripts and hashes are copied out.
+"""
+
+import binascii, hashlib, struct
+from base58 import base58_check_encode
+from ripemd160 import hash160
+
+# (pubkey hash address version, script hash address version, bech32 prefix)
+MainNet = (0, 5, 'bc')
+TestNet = (111, 196, 'tb')
+
+class TxParseError(Exception):
+    pass
+
+def decode_tx(raw, network=MainNet):
+    # Decode a transaction given as hex, as returned by getrawtransaction
+    data = binascii.unhexlify(raw)
+    tx, pos = parse_tx(data, 0, network)
+    if pos != len(data):
+        raise TxParseError("%d bytes left over after transaction" % (len(data) - pos))
+    return tx
+
+def read_varint(data, pos):
+    n = ord(data[pos])
+    if n < 0xfd:
+        return n, pos + 1
+    elif n == 0xfd:
+        return struct.unpack_from('<H', data, pos + 1)[0], pos + 3
+    elif n == 0xfe:
+        return struct.unpack_from('<I', data, pos + 1)[0], pos + 5
+    return struct.unpack_from('<Q', data, pos + 1)[0], pos + 9
+
+def dsha256(v):
+    return hashlib.sha256(hashlib.sha256(v).digest()).digest()
+
+NullPrevout = '\0'*32
+
+def parse_tx(data, pos=0, network=MainNet):
+    # Parse the transaction starting at data[pos], returning it and the
+    # position just after it
+    try:
+        return read_tx(data, pos, network)
+    except (IndexError, struct.error):
+        raise TxParseError("Truncated transaction")
+
+def read_tx(data, pos, network):
+    start = pos
+    version = struct.unpack_from('<i', data, pos)[0]
+    pos += 4
+    segwit = data[pos] == '\0' and data[pos+1] == '\x01'
+    if segwit:
+        pos += 2
+    body = pos
+    nin, pos = read_varint(data, pos)
+    vin = []
+    for i in xrange(nin):
+        prevout = data[pos:pos+32]
+        n, slen = struct.unpack_from('<IB', data, pos + 32)
+        pos += 36
+        if slen >= 0xfd:
+            slen, pos = read_varint(data, pos)
+        else:
+            pos += 1
+        script = data[pos:pos+slen]
+        pos += slen
+        sequence = struct.unpack_from('<I', data, pos)[0]
+        pos += 4
+        if prevout == NullPrevout and n == 0xffffffff:
+            vin.append({'coinbase': binascii.hexlify(script), 'sequence': sequence})
+        else:
+            vin.append({'txid': binascii.hexlify(prevout[::-1]), 'vout': n,
+                        'scriptSig': {'hex': binascii.hexlify(script)},
+                        'sequence': sequence})
+    nout, pos = read_varint(data, pos)
+    vout = []
+    for n in xrange(nout):
+        value = struct.unpack_from('<q', data, pos)[0]
+        slen, pos = read_varint(data, pos + 8)
+        script = data[pos:pos+slen]
+        pos += slen
+        vout.append({'value': value / 1e8, 'n': n, 'scriptPubKey': script_pubkey(script, network)})
+    body_end = pos
+    if segwit:
+        for i in vin:
+            count, pos = read_varint(data, pos)
+            witness = []
+            for k in xrange(count):
+                wlen, pos = read_varint(data, pos)
+                witness.append(binascii.hexlify(data[pos:pos+wlen]))
+                pos += wlen
+            if witness:
+                i['txinwitness'] = witness
+    locktime = struct.unpack_from('<I', data, pos)[0]
+    pos += 4
+    if pos > len(data):
+        raise TxParseError("Truncated transaction")
+    full = data[start:pos]
+    if segwit:
+        stripped = full[:4] + data[body:body_end] + full[-4:]
+    else:
+        stripped = full
+    weight = len(stripped)*3 + len(full)
+    tx = {'txid': binascii.hexlify(dsha256(stripped)[::-1]),
+          'hash': binascii.hexlify(dsha256(full)[::-1]),
+          'version': version, 'size': len(full), 'vsize': (weight + 3)//4,
+          'weight': weight, 'locktime': locktime, 'vin': vin, 'vout': vout}
+    return tx, pos
+
+def script_pubkey(script, network=MainNet):
+    # Classify an output script the way bitcoind does, and extract the
+    # addresses of the standard forms
+    spk = {'hex': binascii.hexlify(script)}
+    l = len(script)
+    addresses = None
+    reqsigs = 1
+    if l == 25 and script[:3] == '\x76\xa9\x14' and script[23:] == '\x88\xac':
+        spk['type'] = 'pubkeyhash'
+        addresses = [base58_check_encode(script[3:23], network[0])]
+    elif l == 23 and script[:2] == '\xa9\x14' and script[22] == '\x87':
+        spk['type'] = 'scripthash'
+        addresses = [base58_check_encode(script[2:22], network[1])]
+    elif (l == 35 and script[:2] in ('\x21\x02', '\x21\x03') or
+          l == 67 and script[:2] in ('\x41\x04', '\x41\x06', '\x41\x07')) and script[-1] == '\xac':
+        spk['type'] = 'pubkey'
+        addresses = [base58_check_encode(hash160(script[1:-1]), network[0])]
+    elif l > 0 and script[0] == '\x6a':
+        spk['type'] = 'nulldata'
+    elif 4 <= l <= 42 and (script[0] == '\0' or '\x51' <= script[0] <= '\x60') and ord(script[1]) == l - 2:
+        version = script[0] != '\0' and ord(script[0]) - 0x50 or 0
+        program = script[2:]
+        if version == 0 and len(program) == 20:
+            spk['type'] = 'witness_v0_keyhash'
+        elif version == 0 and len(program) == 32:
+            spk['type'] = 'witness_v0_scripthash'
+        elif version == 1 and len(program) == 32:
+            spk['type'] = 'witness_v1_taproot'
+        else:
+            spk['type'] = 'witness_unknown'
+        if version > 0 or len(program) in (20, 32):
+            addresses = [segwit_address(network[2], version, program)]
+        else:
+            spk['type'] = 'nonstandard'
+    else:
+        pubkeys = multisig_pubkeys(script)
+        if pubkeys is None:
+            spk['type'] = 'nonstandard'
+        else:
+            spk['type'] = 'multisig'
+            reqsigs = ord(script[0]) - 0x50
+            addresses = [base58_check_encode(hash160(p), network[0]) for p in pubkeys]
+    if addresses is not None:
+        spk['reqSigs'] = reqsigs
+        spk['addresses'] = addresses
+    return spk
+
+def multisig_pubkeys(script):
+    # The public keys of an "m of n" OP_CHECKMULTISIG script, or None
+    l = len(script)
+    if l < 37 or script[-1] != '\xae':
+        return None
+    m, n = ord(script[0]) - 0x50, ord(script[-2]) - 0x50
+    if not (1 <= m <= n <= 16):
+        return None
+    pubkeys = []
+    pos = 1
+    while pos < l - 2:
+        size = ord(script[pos])
+        if size not in (33, 65):
+            return None
+        pubkeys.append(script[pos+1:pos+1+size])
+        pos += 1 + size
+    if pos != l - 2 or len(pubkeys) != n:
+        return None
+    return pubkeys
+
+### bech32 and bech32m (BIP 173, BIP 350) addresses for witness outputs
+Bech32Chars = 'qpzry9x8gf2tvdw0s3jn54khce6mua7l'
+Bech32Generator = [0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3]
+
+def bech32_polymod(values):
+    chk = 1
+    for v in values:
+        b = chk >> 25
+        chk = (chk & 0x1ffffff) << 5 ^ v
+        for i in range(5):
+            if (b >> i) & 1:
+                chk ^= Bech32Generator[i]
+    return chk
+
+def segwit_address(hrp, version, program):
+    # Witness version 0 uses bech32, later versions bech32m
+    data = [version]
+    acc = bits = 0
+    for c in program:
+        acc = (acc << 8) | ord(c)
+        bits += 8
+        while bits >= 5:
+            bits -= 5
+            data.append((acc >> bits) & 31)
+    if bits:
+        data.append((acc << (5 - bits)) & 31)
+    const = version and 0x2bc830a3 or 1
+    values = [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp] + data
+    polymod = bech32_polymod(values + [0]*6) ^ const
+    data += [(polymod >> 5*(5 - i)) & 31 for i in range(6)]
+    return hrp + '1' + ''.join([Bech32Chars[d] for d in data])
+
+def segwit_decode(address):
+    # The (hrp, witness version, program) of a bech32 or bech32m address;
+    # raises ValueError if it is not one
+    a = address.lower()
+    if a != address and address.upper() != address:
+        raise ValueError("Mixed case bech32 address: %s" % (address,))
+    sep = a.rfind('1')
+    if sep < 1 or len(a) - sep < 8 or len(a) > 90:
+        raise ValueError("Invalid bech32 address: %s" % (address,))
+    hrp = a[:sep]
+    try:
+        data = [Bech32Chars.index(c) for c in a[sep+1:]]
+    except ValueError:
+        raise ValueError("Invalid bech32 character in %s" % (address,))
+    values = [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp] + data
+    version = data[0]
+    if bech32_polymod(values) != (version and 0x2bc830a3 or 1):
+        raise ValueError("Invalid bech32 checksum: %s" % (address,))
+    acc = bits = 0
+    program = []
+    for d in data[1:-6]:
+        acc = (acc << 5) | d
+        bits += 5
+        if bits >= 8:
+            bits -= 8
+            program.append(chr((acc >> bits) & 255))
+    if bits >= 5 or acc & ((1 << bits) - 1):
+        raise ValueError("Invalid bech32 padding: %s" % (address,))
+    program = ''.join(program)
+    if version > 16 or not 2 <= len(program) <= 40 or version == 0 and len(program) not in (20, 32):
+        raise ValueError("Invalid witness program: %s" % (address,))
+    return hrp, version, program
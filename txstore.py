@@ -0,0 +1,151 @@
+"""
+txstore.py
+~~~~~~~~~~
+Persistent, txid-keyed store of decoded transactions with an in-memory
+LRU layer in front of it.
+
+A txid is the hash of the transaction it names, so a stored transaction
+can never go stale and entries are only ever dropped to respect the
+configured size limits. A store may be shared between threads.
+
+Hits in memory are recorded on disk too, so eviction follows use, but
+in batches of touch_batch rather than one write per hit.
+"""
+
+import sqlite3, cPickle, threading
+from collections import OrderedDict
+
+class TxStore(object):
+    def __init__(self, path, max_entries=100000, memory_entries=2000, touch_batch=500):
+        # max_entries bounds the on-disk store, memory_entries the LRU
+        # layer; a max_entries of 0 disables the on-disk limit.
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.touch_batch = touch_batch
+        self.memory = OrderedDict()
+        self.touched = {}   # txid -> use not yet written to disk
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA synchronous = OFF")
+        self.db.execute("CREATE TABLE IF NOT EXISTS txs ("
+                        "txid TEXT PRIMARY KEY, data BLOB, used INTEGER)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS txs_used ON txs (used)")
+        self.db.commit()
+        self.count, self.clock = self.db.execute(
+            "SELECT COUNT(*), IFNULL(MAX(used), 0) FROM txs").fetchone()
+
+    def _remember(self, txid, tx):
+        self.memory[txid] = tx
+        if len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def _tick(self):
+        self.clock += 1
+        return self.clock
+
+    def _write_touched(self):
+        # Record the uses of memory hits in the used column
+        if self.touched:
+            self.db.executemany("UPDATE txs SET used = ? WHERE txid = ?",
+                                [(used, txid) for txid,used in self.touched.iteritems()])
+            self.touched.clear()
+
+    def get(self, txid):
+        # Return the stored transaction, or None if it is not known
+        self.lock.acquire()
+        try:
+            try:
+                tx = self.memory.pop(txid)
+            except KeyError:
+                row = self.db.execute("SELECT data FROM txs WHERE txid = ?",
+                                      (txid,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                tx = cPickle.loads(str(row[0]))
+                self.touched[txid] = self._tick()
+                self._write_touched()
+                self.db.commit()
+                self.disk_hits += 1
+            else:
+                self.touched[txid] = self._tick()
+                if len(self.touched) >= self.touch_batch:
+                    self._write_touched()
+                    self.db.commit()
+                self.hits += 1
+            self._remember(txid, tx)
+            return tx
+        finally:
+            self.lock.release()
+
+    def put(self, txid, tx):
+        self.lock.acquire()
+        try:
+            data = buffer(cPickle.dumps(tx, cPickle.HIGHEST_PROTOCOL))
+            self.touched.pop(txid, None)
+            cur = self.db.execute("UPDATE txs SET data = ?, used = ? WHERE txid = ?",
+                                  (data, self._tick(), txid))
+            if cur.rowcount == 0:
+                self.db.execute("INSERT INTO txs (txid, data, used) VALUES (?, ?, ?)",
+                                (txid, data, self.clock))
+                self.count += 1
+                self.evict()
+            self.db.commit()
+            self._remember(txid, tx)
+        finally:
+            self.lock.release()
+
+    def fetch(self, txid, loader):
+        # Return the transaction for txid, calling loader(txid) and
+        # storing its result if it is not in the store yet. The loader
+        # runs without holding the lock, so threads fetch in parallel.
+        tx = self.get(txid)
+        if tx is None:
+            tx = loader(txid)
+            self.put(txid, tx)
+        return tx
+
+    def evict(self):
+        # Drop the least recently used entries beyond max_entries
+        if not self.max_entries or self.count <= self.max_entries:
+            return
+        excess = self.count - self.max_entries
+        self._write_touched()
+        self.db.execute("DELETE FROM txs WHERE txid IN "
+                        "(SELECT txid FROM txs ORDER BY used LIMIT ?)", (excess,))
+        self.count -= excess
+        self.evictions += excess
+
+    def clear(self):
+        self.lock.acquire()
+        try:
+            self.memory.clear()
+            self.touched.clear()
+            self.db.execute("DELETE FROM txs")
+            self.db.commit()
+            self.count = 0
+        finally:
+            self.lock.release()
+
+    def stats(self):
+        self.lock.acquire()
+        try:
+            return {'hits': self.hits, 'disk_hits': self.disk_hits,
+                    'misses': self.misses, 'evictions': self.evictions,
+                    'entries': self.count, 'memory_entries': len(self.memory)}
+        finally:
+            self.lock.release()
+
+    def close(self):
+        self.lock.acquire()
+        try:
+            self._write_touched()
+            self.db.commit()
+            self.db.close()
+        finally:
+            self.lock.release()